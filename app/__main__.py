@@ -1,7 +1,140 @@
-from .api.main import app
+import argparse
+import os
 import uvicorn
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m app", description="Run the LLM and KV Store API.")
+    parser.add_argument("--host", default=os.environ.get("KV_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("KV_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("KV_WORKERS", "1")),
+        help="Number of worker processes. Workers share kv_store.db and stay coherent through its event log.",
+    )
+    parser.add_argument("--db-url", default="sqlite:///kv_store.db", help="KV store database URL for maintenance commands.")
+    parser.add_argument(
+        "--follow",
+        metavar="PRIMARY_DB_URL",
+        default=os.environ.get("KV_FOLLOW"),
+        help="Run as a read replica of the store at this database URL (single worker only).",
+    )
+    parser.add_argument(
+        "--primary-url",
+        default=os.environ.get("KV_PRIMARY_URL"),
+        help="Base URL of the primary API that a read replica redirects writes to.",
+    )
+
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    commands.add_parser("serve", help="Run the API server (default).")
+    commands.add_parser("rebuild-search-index", help="Rebuild the full-text search index from the stored keys.")
+
+    export = commands.add_parser("export", help="Export all keys and their revisions as gzip-compressed NDJSON.")
+    export.add_argument("output", help="Output file, or - for stdout.")
+    export.add_argument("--batch-size", type=int, default=1000)
+
+    load = commands.add_parser("import", help="Bulk-load an export produced by the export command.")
+    load.add_argument("input", help="Export file (gzip-compressed or plain NDJSON).")
+    load.add_argument("--replace", action="store_true", help="Replace existing keys instead of skipping them.")
+    load.add_argument("--batch-size", type=int, default=5000)
+
+    recompress = commands.add_parser(
+        "recompress", help="Re-encode stored values and revisions with the given compression settings."
+    )
+    recompress.add_argument(
+        "--threshold",
+        type=int,
+        default=int(os.environ.get("KV_COMPRESS_THRESHOLD", "0")),
+        help="Compress values of at least this many bytes; 0 stores everything as plain JSON.",
+    )
+    recompress.add_argument("--codec", default=os.environ.get("KV_COMPRESS_CODEC", "zlib"), choices=["zlib", "zstd"])
+    recompress.add_argument("--batch-size", type=int, default=1000)
+    recompress.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages to the OS.")
+    return parser.parse_args()
+
+
+def serve(args):
+    if args.follow:
+        if args.workers > 1:
+            raise SystemExit("A read replica keeps one local copy and must run with a single worker.")
+        os.environ["KV_FOLLOW"] = args.follow
+        if args.primary_url:
+            os.environ["KV_PRIMARY_URL"] = args.primary_url
+    else:
+        # Create the schema once up front so workers don't race to create it
+        from .backend.db_setup import get_engine, init_db
+        init_db(get_engine())
+
+    if args.workers > 1:
+        uvicorn.run("app.api.main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        from .api.main import app
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
+def rebuild_search_index(args):
+    from .backend.db_setup import get_engine, init_db
+    from .backend.search_index import rebuild
+
+    engine = get_engine(args.db_url)
+    init_db(engine)
+    print(f"Indexed {rebuild(engine)} keys.")
+
+
+def export_store(args):
+    import sys
+    from .backend.bulk import export_stream
+    from .backend.db_setup import get_engine, init_db
+
+    engine = get_engine(args.db_url)
+    init_db(engine)
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    with output:
+        for chunk in export_stream(engine, batch_size=args.batch_size):
+            output.write(chunk)
+
+
+def import_store(args):
+    from .backend.bulk import import_file
+    from .backend.db_setup import get_engine, init_db
+
+    engine = get_engine(args.db_url)
+    init_db(engine)
+    with open(args.input, "rb") as fileobj:
+        counts = import_file(engine, fileobj, batch_size=args.batch_size, replace=args.replace)
+    print(
+        f"Imported {counts['keys']} keys and {counts['revisions']} revisions "
+        f"({counts['replaced']} replaced, {counts['skipped']} skipped)."
+    )
+
+
+def recompress_values(args):
+    from .backend.db_setup import get_engine, init_db
+    from .backend.value_codec import recompress, settings
+
+    settings.configure(threshold=args.threshold, codec=args.codec)
+    engine = get_engine(args.db_url)
+    init_db(engine)
+    for table, counts in recompress(engine, batch_size=args.batch_size).items():
+        print(f"{table}: {counts['rows']} rows, {counts['bytes_before']} -> {counts['bytes_after']} bytes")
+    if args.vacuum:
+        with engine.connect() as connection:
+            connection.exec_driver_sql("VACUUM")
+
+
 if __name__ == "__main__":
     import dotenv
     dotenv.load_dotenv()
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    args = parse_args()
+
+    if args.command == "rebuild-search-index":
+        rebuild_search_index(args)
+    elif args.command == "export":
+        export_store(args)
+    elif args.command == "import":
+        import_store(args)
+    elif args.command == "recompress":
+        recompress_values(args)
+    else:
+        serve(args)
@@ -0,0 +1,201 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from fastapi import HTTPException, Request
+
+
+class RoutePolicy:
+    """
+    Limits for one class of routes.
+
+    :param rate: Requests per second each principal may sustain.
+    :param burst: Requests a principal may make at once before being rate limited.
+    :param concurrency: Requests of this class running at once in this process.
+    :param max_queue: Requests that may wait for a running slot; more are shed immediately.
+    :param queue_timeout: Seconds a request waits for a slot before being shed.
+    """
+
+    def __init__(self, rate: float, burst: int, concurrency: int, max_queue: int = 0, queue_timeout: float = 0.0):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+
+# Reads get most of the threadpool (40 threads by default) and LLM calls only a few,
+# so slow LLM requests can never occupy the threads reads need
+DEFAULT_POLICIES = {
+    "kv_read": RoutePolicy(rate=100, burst=200, concurrency=24, max_queue=64, queue_timeout=1.0),
+    "kv_write": RoutePolicy(rate=20, burst=50, concurrency=6, max_queue=32, queue_timeout=2.0),
+    "llm": RoutePolicy(rate=0.5, burst=5, concurrency=4, max_queue=4, queue_timeout=1.0),
+}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """
+        Take a token if one is available.
+
+        :return: 0 if a token was taken, otherwise the seconds until one will be.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Pool:
+    """Concurrency slots of one route class, created lazily on the running event loop."""
+
+    def __init__(self, policy: RoutePolicy):
+        self.policy = policy
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.running = 0
+        self.waiting = 0
+
+
+class AdmissionController:
+    """
+    Per-principal token-bucket rate limits and per-class concurrency pools.
+
+    Requests over a principal's rate are rejected with 429; requests that find
+    their class's pool full (and its short queue full or too slow) are shed with
+    503. Both carry Retry-After, so overload is answered in microseconds instead
+    of piling up in the threadpool. Limits apply per worker process.
+    """
+
+    def __init__(self, policies: Optional[Dict[str, RoutePolicy]] = None, max_principals: int = 10000):
+        """
+        :param policies: Route class name to policy; DEFAULT_POLICIES if omitted.
+        :param max_principals: Buckets kept per class; the least recently used are dropped.
+        """
+        self.policies = policies or DEFAULT_POLICIES
+        self.max_principals = max_principals
+        self._buckets: Dict[str, "OrderedDict[str, TokenBucket]"] = {name: OrderedDict() for name in self.policies}
+        self._pools = {name: _Pool(policy) for name, policy in self.policies.items()}
+        self._counts = {name: {"admitted": 0, "throttled": 0, "shed": 0} for name in self.policies}
+        self._lock = threading.Lock()
+
+    def check_rate(self, route_class: str, principal: str) -> float:
+        """
+        Charge one request to a principal's bucket for a route class.
+
+        :return: 0 if allowed, otherwise the seconds to wait before retrying.
+        """
+        policy = self.policies[route_class]
+        with self._lock:
+            buckets = self._buckets[route_class]
+            bucket = buckets.get(principal)
+            if bucket is None:
+                bucket = buckets[principal] = TokenBucket(policy.rate, policy.burst)
+                if len(buckets) > self.max_principals:
+                    buckets.popitem(last=False)
+            else:
+                buckets.move_to_end(principal)
+            retry_after = bucket.take()
+            if retry_after:
+                self._counts[route_class]["throttled"] += 1
+            return retry_after
+
+    async def acquire(self, route_class: str) -> bool:
+        """
+        Take a running slot for a route class, waiting briefly if the policy allows.
+
+        :return: False if the request should be shed.
+        """
+        pool = self._pools[route_class]
+        if pool.semaphore is None:
+            pool.semaphore = asyncio.Semaphore(pool.policy.concurrency)
+        if pool.semaphore.locked():
+            if pool.waiting >= pool.policy.max_queue or not pool.policy.queue_timeout:
+                return self._shed(route_class)
+            pool.waiting += 1
+            try:
+                await asyncio.wait_for(pool.semaphore.acquire(), pool.policy.queue_timeout)
+            except asyncio.TimeoutError:
+                return self._shed(route_class)
+            finally:
+                pool.waiting -= 1
+        else:
+            await pool.semaphore.acquire()
+        pool.running += 1
+        self._counts[route_class]["admitted"] += 1
+        return True
+
+    def release(self, route_class: str):
+        pool = self._pools[route_class]
+        pool.running -= 1
+        pool.semaphore.release()
+
+    def _shed(self, route_class: str) -> bool:
+        self._counts[route_class]["shed"] += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            name: {**self._counts[name], "running": pool.running, "waiting": pool.waiting}
+            for name, pool in self._pools.items()
+        }
+
+
+def principal_of(request: Request) -> str:
+    """
+    Identify who a request counts against: the user in a valid bearer token,
+    otherwise the client address (for the unauthenticated read routes).
+    """
+    from .auth.jwt_utils import decode_access_token
+
+    authorization = request.headers.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        try:
+            email = decode_access_token(authorization.split(" ", 1)[1]).get("sub")
+        except HTTPException:
+            email = None
+        if email:
+            return f"user:{email}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def admission(get_controller: Callable[[], Optional[AdmissionController]], route_class: str):
+    """
+    Build a route dependency that admits requests of `route_class` through the
+    controller returned by `get_controller` (None disables admission control).
+    """
+
+    async def admit(request: Request):
+        controller = get_controller()
+        if controller is None:
+            yield
+            return
+        retry_after = controller.check_rate(route_class, principal_of(request))
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        if not await controller.acquire(route_class):
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy, try again later",
+                headers={"Retry-After": str(math.ceil(controller.policies[route_class].queue_timeout) or 1)},
+            )
+        try:
+            yield
+        finally:
+            controller.release(route_class)
+
+    return admit
@@ -1,13 +1,199 @@
-from ..llm.llm_processor import LLMProcessor
-from ..backend.kv_store import KVStore
+from fastapi import Depends
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Union
+from .admission import DEFAULT_POLICIES, AdmissionController, RoutePolicy, admission
+from ..backend.kv_store import KVStore, invalidate_reads
 from ..backend.db_setup import get_session, get_engine, init_db
+from ..backend.event_bus import EventBus
+from ..backend.expiry import ExpirySweeper
+from ..backend.group_commit import GroupCommitWriter
+from ..backend.jobs import JobRunner
+from ..backend.key_index import KeyIndex
+from ..backend.replication import Follower, LocalPrimarySource
 import os
 
-def get_llm_processor() -> LLMProcessor:
-    return LLMProcessor(api_type="gemini", api_key=os.environ.get("GEMINI_API_KEY"), model_name="models/gemini-1.5-flash")
+if TYPE_CHECKING:
+    from ..llm.llm_processor import LLMProcessor
+    from ..llm.nlp_processor import NLPProcessor
 
-def get_kv_store() -> KVStore:
-    engine = get_engine()
+
+DEFAULT_LLM_PROVIDERS = "gemini:models/gemini-1.5-flash"
+LLM_API_KEY_ENV = {"gemini": "GEMINI_API_KEY", "openai": "OPENAI_API_KEY"}
+
+
+@lru_cache(maxsize=None)
+def get_llm_processor() -> "LLMProcessor":
+    """
+    Build the LLM stack once per process and reuse it (and its HTTP connection pool).
+    LangChain and the provider SDK are only imported on first use.
+
+    LLM_PROVIDERS is a comma-separated list of "api_type:model_name" entries; with more
+    than one, requests are routed between them (LLM_HEDGE=1 enables hedged requests).
+    """
+    from ..llm.llm_connector import LLMConnector
+    from ..llm.llm_processor import LLMProcessor
+    from ..llm.llm_router import LLMRouter
+
+    connectors = []
+    for entry in os.environ.get("LLM_PROVIDERS", DEFAULT_LLM_PROVIDERS).split(","):
+        api_type, model_name = entry.strip().split(":", 1)
+        api_key = os.environ.get(LLM_API_KEY_ENV.get(api_type.lower(), ""))
+        connectors.append(LLMConnector(api_type=api_type, api_key=api_key, model_name=model_name))
+
+    if len(connectors) == 1:
+        return LLMProcessor(connector=connectors[0])
+    return LLMProcessor(connector=LLMRouter(connectors, hedge=os.environ.get("LLM_HEDGE") == "1"))
+
+@lru_cache(maxsize=None)
+def get_nlp_processor() -> "NLPProcessor":
+    """
+    Build the spaCy-based command parser once per process.
+    NLP_BATCH_SIZE and NLP_PROCESSES tune batched parsing.
+    """
+    from ..llm.nlp_processor import NLPProcessor
+
+    return NLPProcessor(
+        model=os.environ.get("NLP_MODEL", "en_core_web_sm"),
+        batch_size=int(os.environ.get("NLP_BATCH_SIZE", "256")),
+        n_process=int(os.environ.get("NLP_PROCESSES", "1")),
+    )
+
+@lru_cache(maxsize=None)
+def get_kv_engine():
+    """
+    Create the KV store engine and its tables once per process. In follower mode
+    (KV_FOLLOW set) this is the local copy, KV_REPLICA_DB_URL.
+    """
+    if os.environ.get("KV_FOLLOW"):
+        engine = get_engine(os.environ.get("KV_REPLICA_DB_URL", "sqlite:///kv_replica.db"))
+    else:
+        engine = get_engine()
     init_db(engine)
-    session = get_session(engine)
-    return KVStore(session)
\ No newline at end of file
+    return engine
+
+def get_kv_store():
+    session = get_session(get_kv_engine())
+    try:
+        yield KVStore(session)
+    finally:
+        session.close()
+
+@lru_cache(maxsize=None)
+def get_group_writer() -> GroupCommitWriter:
+    """
+    Start the group-commit writer. KV_GROUP_COMMIT_MAX_BATCH and
+    KV_GROUP_COMMIT_DELAY_MS bound the size and wait of each group.
+    """
+    return GroupCommitWriter(
+        get_kv_engine(),
+        max_batch=int(os.environ.get("KV_GROUP_COMMIT_MAX_BATCH", "256")),
+        max_delay=float(os.environ.get("KV_GROUP_COMMIT_DELAY_MS", "2")) / 1000,
+    )
+
+def get_kv_writer(kv_store: KVStore = Depends(get_kv_store)) -> Union[KVStore, GroupCommitWriter]:
+    """
+    Return what inserts, updates and deletes go through: the request's KVStore, or
+    the shared group-commit writer when KV_GROUP_COMMIT=1.
+    """
+    if os.environ.get("KV_GROUP_COMMIT") == "1":
+        return get_group_writer()
+    return kv_store
+
+@lru_cache(maxsize=None)
+def get_event_bus() -> EventBus:
+    """
+    Tail the shared mutation log so changes made by other worker processes
+    invalidate this process's read caches.
+    """
+    engine = get_kv_engine()
+    bus = EventBus(engine)
+    bus.subscribe(lambda events: invalidate_reads(engine))
+    return bus
+
+@lru_cache(maxsize=None)
+def get_key_index() -> Optional[KeyIndex]:
+    """
+    Load the trigram index of existing keys and keep it current from the event log.
+
+    Returns None on a read replica (KV_FOLLOW): LLM requests are sent to the primary,
+    and the index would only follow the replica's copy while this process polls
+    its event bus, so key context is disabled there instead of risking a stale index.
+    """
+    if get_follower() is not None:
+        return None
+    engine = get_kv_engine()
+    key_index = KeyIndex()
+    # Subscribe first, so no change between the load and the subscription is missed
+    get_event_bus().subscribe(lambda events: key_index.apply_events(engine, events))
+    key_index.load(engine)
+    return key_index
+
+@lru_cache(maxsize=None)
+def get_job_runner() -> JobRunner:
+    """
+    Start the background pool for POST /llm/jobs. LLM_JOB_WORKERS sets how many jobs
+    run at once and LLM_JOB_QUEUE how many may wait.
+    """
+    from .llm_control import run_control_job
+
+    return JobRunner(
+        get_kv_engine(),
+        run_control_job,
+        workers=int(os.environ.get("LLM_JOB_WORKERS", "4")),
+        max_queue=int(os.environ.get("LLM_JOB_QUEUE", "64")),
+    )
+
+@lru_cache(maxsize=None)
+def get_expiry_sweeper() -> ExpirySweeper:
+    """
+    Delete expired keys in bounded batches. KV_SWEEP_BATCH_SIZE sets the batch size.
+    """
+    return ExpirySweeper(get_kv_engine(), batch_size=int(os.environ.get("KV_SWEEP_BATCH_SIZE", "500")))
+
+@lru_cache(maxsize=None)
+def get_follower() -> Optional[Follower]:
+    """
+    Return the replication follower, or None unless this process is a read replica.
+
+    KV_FOLLOW is the database URL of the primary's store, which the follower
+    snapshots and tails; KV_FOLLOWER_MAX_LAG (seconds) bounds how stale reads may be.
+    """
+    primary_db_url = os.environ.get("KV_FOLLOW")
+    if not primary_db_url:
+        return None
+    return Follower(
+        LocalPrimarySource(get_engine(primary_db_url)),
+        get_kv_engine(),
+        batch_size=int(os.environ.get("KV_FOLLOWER_BATCH_SIZE", "500")),
+        max_lag=float(os.environ.get("KV_FOLLOWER_MAX_LAG", "5")),
+    )
+
+@lru_cache(maxsize=None)
+def get_admission_controller() -> Optional[AdmissionController]:
+    """
+    Build the admission controller, or None if ADMISSION=0.
+
+    Each route class can be tuned with ADMISSION_<CLASS> (e.g. ADMISSION_LLM) set to
+    "rate,burst,concurrency[,max_queue,queue_timeout]".
+    """
+    if os.environ.get("ADMISSION") == "0":
+        return None
+    policies = {}
+    for name, default in DEFAULT_POLICIES.items():
+        override = os.environ.get(f"ADMISSION_{name.upper()}")
+        if override:
+            fields = override.split(",")
+            policies[name] = RoutePolicy(
+                rate=float(fields[0]),
+                burst=int(fields[1]),
+                concurrency=int(fields[2]),
+                max_queue=int(fields[3]) if len(fields) > 3 else default.max_queue,
+                queue_timeout=float(fields[4]) if len(fields) > 4 else default.queue_timeout,
+            )
+        else:
+            policies[name] = default
+    return AdmissionController(policies)
+
+def admit(route_class: str):
+    """Route dependency applying admission control for "kv_read", "kv_write" or "llm" routes."""
+    return Depends(admission(get_admission_controller, route_class))
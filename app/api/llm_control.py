@@ -0,0 +1,112 @@
+from typing import Any, Dict, List
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from .dependencies import get_key_index, get_kv_engine, get_llm_processor
+from ..backend.db_setup import get_session
+from ..backend.key_index import suggest_action_keys
+from ..backend.kv_store import KVStore
+from ..llm.json_repair import validate_actions
+import os
+
+
+def execute_control_kv(user_prompt: str, llm_processor, kv_store: KVStore) -> List[Dict[str, Any]]:
+    """
+    Turn a natural language request into KV actions with the LLM and perform them.
+
+    The prompt is sent with the existing keys it most likely refers to (up to
+    LLM_KEY_CONTEXT of them, 0 disables this). Actions on keys that do not exist
+    are still performed on the key the LLM returned (and fail), with the nearest
+    existing key in their result as "suggested_key".
+    There is no key index on a read replica, so prompts are sent without key context there.
+
+    :param user_prompt: The user's request.
+    :param llm_processor: The LLMProcessor to query.
+    :param kv_store: The store the actions are performed on.
+    :return: The result of each action.
+    :raises HTTPException: If the LLM fails or returns no actions.
+    """
+    key_context = int(os.environ.get("LLM_KEY_CONTEXT", "10"))
+    key_index = get_key_index() if key_context else None
+
+    # Process the prompt with LLM
+    if key_index is not None:
+        candidates = key_index.candidates(user_prompt, k=key_context)
+        llm_response = llm_processor.generate_response(
+            template_name="kv_context",
+            raw_prompt=user_prompt,
+            context={"Existing keys": ", ".join(candidates) if candidates else "(none match this request)"},
+            force_json=True,
+            validator=validate_actions,
+        )
+    else:
+        llm_response = llm_processor.generate_response(
+            template_name="default",  # Use a pre-defined template for LLM queries
+            raw_prompt=user_prompt,
+            context=None,
+            force_json=True,
+            validator=validate_actions,
+        )
+
+    if llm_response["status"] != "success":
+        raise HTTPException(
+            status_code=500, detail="Failed to process the prompt via LLM"
+        )
+
+    # Extract actions from the LLM response
+    actions = llm_response["data"]
+    if not actions:
+        raise HTTPException(
+            status_code=400, detail="No actions found in the LLM response"
+        )
+    if key_index is not None:
+        actions = suggest_action_keys(actions, key_index)
+
+    # Perform actions on KV store
+    results = []
+    for action in actions:
+        action_type = action.get("action")
+        key = action.get("key")
+        value = action.get("value")
+
+        if action_type == "insert":
+            result = kv_store.insert(key, value)
+            results.append(result)
+        elif action_type == "update":
+            result = kv_store.update(key, value)
+            results.append(result)
+        elif action_type == "delete":
+            result = kv_store.delete(key)
+            results.append(result)
+        elif action_type == "get":
+            result = kv_store.get(key)
+            results.append(result)
+        elif action_type == "get_revisions":
+            result = kv_store.get_revisions(key)
+            results.append(result)
+        else:
+            results.append(
+                {
+                    "status": "error",
+                    "message": f"Unsupported action type '{action_type}'",
+                }
+            )
+        if "suggested_key" in action:
+            results[-1] = {**results[-1], "suggested_key": action["suggested_key"]}
+
+    # Return the result summary
+    return results
+
+
+def run_control_job(request: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Job handler for POST /llm/jobs: run a control-kv request on a background thread.
+    The results are made JSON-compatible (e.g. revision timestamps become ISO
+    strings) so they can be stored with the job.
+    """
+    session = get_session(get_kv_engine())
+    try:
+        return jsonable_encoder(execute_control_kv(request["prompt"], get_llm_processor(), KVStore(session)))
+    except HTTPException as e:
+        raise RuntimeError(e.detail) from e
+    finally:
+        session.close()
@@ -1,12 +1,121 @@
-from fastapi import FastAPI
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from .routes import kv_router, llm_router
 from .auth import auth_router
+from .dependencies import (
+    get_event_bus,
+    get_expiry_sweeper,
+    get_follower,
+    get_group_writer,
+    get_job_runner,
+    get_key_index,
+    get_kv_engine,
+    get_llm_processor,
+)
 from .ws_manager import WebSocketManager
+import os
+
+EVENT_POLL_INTERVAL = float(os.environ.get("KV_EVENT_POLL_INTERVAL", "0.05"))
+SWEEP_INTERVAL = float(os.environ.get("KV_SWEEP_INTERVAL", "1.0"))
+
+# A read replica serves these from its local copy and redirects everything else to the primary
+REPLICA_READ_PATHS = {"/kv/get", "/kv/get_revisions", "/kv/get_all_pairs"}
+REPLICA_LOCAL_PATHS = {"/status", "/kv/stats", "/docs", "/redoc", "/openapi.json"}
+
+
+async def relay_events():
+    """
+    Tail the mutation log (written by every worker) and push changes to this
+    worker's WebSocket subscribers.
+    """
+    bus = get_event_bus()
+    while True:
+        try:
+            events = await run_in_threadpool(bus.poll)
+            for change in events:
+                await ws_manager.broadcast(json.dumps({"type": "kv_change", **change}))
+        except Exception as e:
+            print(f"Event relay error: {e}")
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+
+async def sweep_expired_keys():
+    """
+    Periodically delete expired keys. Every worker sweeps; a key is only ever
+    deleted by one of them.
+    """
+    sweeper = get_expiry_sweeper()
+    while True:
+        try:
+            await run_in_threadpool(sweeper.sweep)
+        except Exception as e:
+            print(f"Expiry sweep error: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+
+async def follow_primary():
+    """
+    Keep a read replica's local copy current by tailing the primary's mutation log.
+    Expired keys are swept by the primary and arrive here as events.
+    """
+    follower = get_follower()
+    while True:
+        try:
+            await run_in_threadpool(follower.poll)
+        except Exception as e:
+            print(f"Replication error: {e}")
+        await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+
+async def notify_job_finished(job: dict):
+    """
+    Tell this worker's WebSocket subscribers that a background LLM job finished;
+    the result itself is only served to its owner by GET /llm/jobs/{id}.
+    """
+    await ws_manager.broadcast(json.dumps({"type": "llm_job", "id": job["id"], "status": job["status"]}))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up shared resources on startup so the first request does not pay for them.
+    Set LLM_WARMUP=1 to also build the LLM stack (and import its SDK) and load the
+    key index used for LLM prompts (primary only) at startup.
+    A read replica (KV_FOLLOW) bootstraps its local copy before serving; the
+    primary starts the LLM job pool, which fails jobs a previous run left unfinished.
+    """
+    await run_in_threadpool(get_kv_engine)
+    if os.environ.get("LLM_WARMUP") == "1":
+        await run_in_threadpool(get_llm_processor)
+        await run_in_threadpool(get_key_index)
+    follower = get_follower()
+    if follower is not None:
+        await run_in_threadpool(follower.bootstrap)
+    await run_in_threadpool(get_event_bus)
+    relay = asyncio.create_task(relay_events())
+    maintenance = asyncio.create_task(follow_primary() if follower is not None else sweep_expired_keys())
+    if follower is None:
+        loop = asyncio.get_running_loop()
+        job_runner = await run_in_threadpool(get_job_runner)
+        job_runner.subscribe(lambda job: asyncio.run_coroutine_threadsafe(notify_job_finished(job), loop))
+    yield
+    relay.cancel()
+    maintenance.cancel()
+    if get_job_runner.cache_info().currsize:
+        await run_in_threadpool(get_job_runner().close)
+    if get_group_writer.cache_info().currsize:
+        await run_in_threadpool(get_group_writer().close)
+
 
 app = FastAPI(
     title="LLM and KV Store API",
     description="API for managing KV store and LLM queries with role-based access.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Register routers
@@ -14,12 +123,66 @@ app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(kv_router, prefix="/kv", tags=["KV Store"])
 app.include_router(llm_router, prefix="/llm", tags=["LLM"])
 
+@app.middleware("http")
+async def replica_routing(request: Request, call_next):
+    """
+    On a read replica, serve the supported reads while replication lag is within
+    KV_FOLLOWER_MAX_LAG (reporting it in X-Replication-Lag) and redirect every
+    other request to the primary at KV_PRIMARY_URL.
+
+    Writes should be sent to the primary directly: HTTP clients drop the
+    Authorization header when following a redirect to another host, so only
+    KVClient/AsyncKVClient created with `primary_url` follow it with their token.
+    """
+    follower = get_follower()
+    path = request.url.path
+    if follower is None or path in REPLICA_LOCAL_PATHS:
+        return await call_next(request)
+    if path in REPLICA_READ_PATHS:
+        lag = follower.lag()
+        if lag > follower.max_lag:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Replica is too far behind the primary"},
+                headers={"Retry-After": "1"},
+            )
+        response = await call_next(request)
+        response.headers["X-Replication-Lag"] = f"{lag:.3f}"
+        return response
+    primary_url = os.environ.get("KV_PRIMARY_URL")
+    if not primary_url:
+        return JSONResponse(status_code=503, content={"detail": "Read-only replica; send this request to the primary"})
+    location = primary_url.rstrip("/") + path + (f"?{request.url.query}" if request.url.query else "")
+    # 307 keeps the method and body, so writes are replayed against the primary
+    return RedirectResponse(location, status_code=307)
+
 # WebSocket manager (global instance)
 ws_manager = WebSocketManager()
 
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """
+    Subscribe to KV changes made by any worker process.
+    """
+    await ws_manager.connect(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        await ws_manager.disconnect(websocket)
+
 @app.get("/status", tags=["Status"])
 async def status():
     """
     API health check endpoint.
     """
-    return {"status": "ok", "message": "API is running."}
+    follower = get_follower()
+    if follower is None:
+        return {"status": "ok", "message": "API is running.", "pid": os.getpid()}
+    return {
+        "status": "ok",
+        "message": "API is running.",
+        "pid": os.getpid(),
+        "role": "replica",
+        "replication": follower.stats(),
+    }
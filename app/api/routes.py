@@ -1,31 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, List, Optional
 from .auth import get_current_user
+from .llm_control import execute_control_kv
 import json
-from .dependencies import get_llm_processor, get_kv_store
-from ..backend.kv_store import KVStore
+import tempfile
+from .dependencies import (
+    admit,
+    get_admission_controller,
+    get_event_bus,
+    get_follower,
+    get_group_writer,
+    get_job_runner,
+    get_kv_engine,
+    get_kv_store,
+    get_kv_writer,
+    get_llm_processor,
+    get_nlp_processor,
+)
+from ..backend import bulk
+from ..backend.kv_store import KVStore, expiry_stats, read_flights
+from ..backend.jobs import QueueFull
+from ..llm.json_repair import repair_stats
 
-kv_router = APIRouter()
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+
+class _OrjsonResponse(Response):
+    """JSON response rendered with orjson, which also encodes datetimes natively."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+FastJSONResponse = _OrjsonResponse if orjson is not None else JSONResponse
+
+kv_router = APIRouter(default_response_class=FastJSONResponse)
 llm_router = APIRouter()
 
+# Uploaded imports are kept in memory up to this size, then spooled to disk
+IMPORT_SPOOL_BYTES = 16 * 1024 * 1024
+
+# Commands parsed per /llm/parse-commands request; larger batches are rejected with 422
+MAX_PARSE_COMMANDS = 1000
+
 
 class KVRequest(BaseModel):
     key: str
-    value: Optional[str] = None
+    value: Any = Field(None, description="Any JSON value; objects can be queried through JSON path indexes.")
+    ttl: Optional[float] = Field(None, gt=0, description="Seconds until the key expires.")
+    expected_version: Optional[int] = Field(None, description="Only update if the key is at this version.")
+
+
+class ParseCommandsRequest(BaseModel):
+    commands: List[str] = Field(..., max_length=MAX_PARSE_COMMANDS)
 
 
-@kv_router.post("/insert")
+class JobRequest(BaseModel):
+    prompt: str
+
+
+class IndexRequest(BaseModel):
+    path: str
+
+
+class QueryPredicate(BaseModel):
+    path: str
+    op: str = "eq"
+    value: Any
+
+
+class KVQueryRequest(BaseModel):
+    where: List[QueryPredicate]
+    limit: int = Field(100, ge=1, le=1000)
+    offset: int = Field(0, ge=0)
+
+
+@kv_router.post("/insert", dependencies=[admit("kv_write")])
 def insert_kv(
     data: KVRequest,
     user=Depends(get_current_user),
-    kv_store: KVStore = Depends(get_kv_store),
+    kv_store: KVStore = Depends(get_kv_writer),
 ):
     print(user)
     if not user["is_admin"]:
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    output = kv_store.insert(data.key, data.value)
+    output = kv_store.insert(data.key, data.value, ttl=data.ttl)
     
     if output["status"] == "error":
         raise HTTPException(status_code=400, detail=output["message"])
@@ -33,50 +101,189 @@ def insert_kv(
     return output
 
 
-@kv_router.put("/update")
+@kv_router.put("/update", dependencies=[admit("kv_write")])
 def update_kv(
     data: KVRequest,
     user=Depends(get_current_user),
-    kv_store: KVStore = Depends(get_kv_store),
+    kv_store: KVStore = Depends(get_kv_writer),
 ):
     print(user)
     if not user["is_admin"]:
         raise HTTPException(status_code=403, detail="Admin access required")
-    output = kv_store.update(data.key, data.value)
+    output = kv_store.update(data.key, data.value, ttl=data.ttl, expected_version=data.expected_version)
+    if output["status"] == "conflict":
+        raise HTTPException(status_code=409, detail=output["message"])
     if output["status"] == "error":
         raise HTTPException(status_code=400, detail=output["message"])
     return output
 
-@kv_router.delete("/delete")
+@kv_router.delete("/delete", dependencies=[admit("kv_write")])
 def delete_kv(
-    key: str, user=Depends(get_current_user), kv_store: KVStore = Depends(get_kv_store)
+    key: str,
+    expected_version: Optional[int] = None,
+    user=Depends(get_current_user),
+    kv_store: KVStore = Depends(get_kv_writer),
 ):
     if not user["is_admin"]:
         raise HTTPException(status_code=403, detail="Admin access required")
-    output = kv_store.delete(key)
+    output = kv_store.delete(key, expected_version=expected_version)
+    if output["status"] == "conflict":
+        raise HTTPException(status_code=409, detail=output["message"])
     if output["status"] == "error":
         raise HTTPException(status_code=400, detail=output["message"])
     return output
 
-@kv_router.get("/get")
-def get_kv(key: str, kv_store: KVStore = Depends(get_kv_store)):
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header (a list of possibly weak ETags, or *) against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+@kv_router.get("/get", dependencies=[admit("kv_read")])
+def get_kv(
+    key: str,
+    lean: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    kv_store: KVStore = Depends(get_kv_store),
+):
+    """
+    Get a key's value. With `lean`, only the data is returned. Send the ETag back
+    in If-None-Match to get an empty 304 while the value is unchanged.
+    """
+    if if_none_match is not None:
+        etag = kv_store.etag(key)
+        if etag is not None and _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
     result = kv_store.get(key)
     if result["status"] == "error":
         raise HTTPException(status_code=404, detail=result["message"])
-    return {"status": "success", "data": result["data"], "message": f"Key: {result['data']['key']} Value: {result['data']['value']}"}
+    data = result["data"]
+    if lean:
+        content = data
+    else:
+        content = {"status": "success", "data": data, "message": f"Key '{data['key']}' retrieved successfully."}
+    # Returned directly so the value is serialized once, without a jsonable_encoder pass
+    return FastJSONResponse(content, headers={"ETag": result["etag"]})
 
-@kv_router.get("/get_revisions")
+@kv_router.get("/get_revisions", dependencies=[admit("kv_read")])
 def get_kv_revs(key: str, kv_store: KVStore = Depends(get_kv_store)):
     result = kv_store.get_revisions(key)
     if result["status"] == "error":
         raise HTTPException(status_code=404, detail=result["message"])
     return {"status": "success", "data": result["data"]}
 
-@kv_router.get("/get_all_pairs")
+@kv_router.get("/get_all_pairs", dependencies=[admit("kv_read")])
 def get_all_kv(kv_store: KVStore = Depends(get_kv_store)):
     return kv_store.get_all_key_values()
 
-@llm_router.post("/raw/query")
+@kv_router.get("/search", dependencies=[admit("kv_read")])
+def search_kv(
+    q: str,
+    prefix: bool = True,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    kv_store: KVStore = Depends(get_kv_store),
+):
+    """
+    Full-text search over keys and values with ranking, prefix matching and pagination.
+    """
+    result = kv_store.search(q, prefix=prefix, limit=limit, offset=offset)
+    if result["status"] == "error":
+        raise HTTPException(status_code=503, detail=result["message"])
+    return result
+
+@kv_router.get("/indexes", dependencies=[admit("kv_read")])
+def list_indexes(kv_store: KVStore = Depends(get_kv_store)):
+    return kv_store.list_indexes()
+
+@kv_router.post("/indexes", dependencies=[admit("kv_write")])
+def create_index(
+    data: IndexRequest, user=Depends(get_current_user), kv_store: KVStore = Depends(get_kv_store)
+):
+    """
+    Declare a secondary index on a JSON path inside values (e.g. "region" or "db.port")
+    and backfill it, so /kv/query can filter on that path.
+    """
+    if not user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    output = kv_store.create_index(data.path)
+    if output["status"] == "error":
+        raise HTTPException(status_code=400, detail=output["message"])
+    return output
+
+@kv_router.delete("/indexes", dependencies=[admit("kv_write")])
+def drop_index(path: str, user=Depends(get_current_user), kv_store: KVStore = Depends(get_kv_store)):
+    if not user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    output = kv_store.drop_index(path)
+    if output["status"] == "error":
+        raise HTTPException(status_code=404, detail=output["message"])
+    return output
+
+@kv_router.post("/query", dependencies=[admit("kv_read")])
+def query_kv(data: KVQueryRequest, kv_store: KVStore = Depends(get_kv_store)):
+    """
+    Find keys whose values match all predicates, e.g. {"where": [{"path": "region", "op": "eq", "value": "eu"}]}.
+    Only indexed paths can be queried; anything else is rejected instead of scanning the table.
+    """
+    predicates = [predicate.model_dump() for predicate in data.where]
+    result = kv_store.query(predicates, limit=data.limit, offset=data.offset)
+    if result["status"] == "error":
+        raise HTTPException(status_code=400, detail=result["message"])
+    return result
+
+@kv_router.get("/export", dependencies=[admit("kv_write")])
+def export_kv(user=Depends(get_current_user)):
+    """
+    Stream all keys and their revisions as gzip-compressed NDJSON.
+    """
+    if not user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return StreamingResponse(
+        bulk.export_stream(get_kv_engine()),
+        media_type="application/gzip",
+        headers={"Content-Disposition": 'attachment; filename="kv_export.ndjson.gz"'},
+    )
+
+@kv_router.post("/import", dependencies=[admit("kv_write")])
+async def import_kv(request: Request, replace: bool = False, user=Depends(get_current_user)):
+    """
+    Bulk-load an export sent as the request body. Existing keys are skipped unless `replace` is set.
+    """
+    if not user["is_admin"]:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        upload.seek(0)
+        try:
+            counts = await run_in_threadpool(bulk.import_file, get_kv_engine(), upload, replace=replace)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "data": counts}
+
+@kv_router.get("/stats")
+def kv_stats():
+    """
+    Report how often concurrent identical reads were coalesced into one query,
+    how many keys expired, how far this worker has tailed the cross-process event log,
+    how writes were grouped into commits (with KV_GROUP_COMMIT=1) and how many
+    requests admission control let through, throttled or shed. On a read replica,
+    also report its replication position and lag.
+    """
+    data = {"coalescing": read_flights.stats(), "expiry": expiry_stats.snapshot()}
+    if get_event_bus.cache_info().currsize:
+        data["events"] = get_event_bus().stats()
+    if get_group_writer.cache_info().currsize:
+        data["group_commit"] = get_group_writer().stats()
+    if get_admission_controller():
+        data["admission"] = get_admission_controller().stats()
+    if get_follower():
+        data["replication"] = get_follower().stats()
+    return {"status": "success", "data": data}
+
+@llm_router.post("/raw/query", dependencies=[admit("llm")])
 def raw_query(prompt: str, user=Depends(get_current_user)):
     if not user["is_admin"]:
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -86,14 +293,46 @@ def raw_query(prompt: str, user=Depends(get_current_user)):
     return {"message": "LLM queried successfully"}
 
 
-@llm_router.post("/control-kv")
-async def control_kv(
+@llm_router.get("/stats")
+def llm_stats():
+    """
+    Report how often LLM JSON output was clean, repaired locally or re-prompted,
+    per-provider routing statistics once the LLM stack is built, and the background
+    job queue's depth, wait and run times.
+    """
+    data = {"json_repair": repair_stats.snapshot()}
+    if get_llm_processor.cache_info().currsize:
+        data["coalescing"] = get_llm_processor().flights.stats()
+        connector = get_llm_processor().connector
+        if hasattr(connector, "stats"):
+            data["routing"] = connector.stats()
+    if get_job_runner.cache_info().currsize:
+        data["jobs"] = get_job_runner().stats()
+    return {"status": "success", "data": data}
+
+
+@llm_router.post("/parse-commands", dependencies=[admit("llm")])
+def parse_commands(
+    data: ParseCommandsRequest,
+    user=Depends(get_current_user),
+    nlp_processor=Depends(get_nlp_processor),
+):
+    """
+    Parse many natural language commands into action/key/value in one batched spaCy pass
+    (at most MAX_PARSE_COMMANDS per request).
+    """
+    return {"status": "success", "data": nlp_processor.extract_many(data.commands)}
+
+
+@llm_router.post("/control-kv", dependencies=[admit("llm")])
+def control_kv(
     request: dict,
     llm_processor=Depends(get_llm_processor),
     kv_store: KVStore = Depends(get_kv_store), 
 ):
     """
-    HTTP endpoint for controlling the KV store through LLM.
+    HTTP endpoint for controlling the KV store through LLM (see execute_control_kv).
+    POST /llm/jobs runs the same request in the background.
     """
     # Validate the input data
     if "prompt" not in request:
@@ -101,57 +340,47 @@ async def control_kv(
             status_code=400, detail="Request must contain a 'prompt' field"
         )
 
-    user_prompt = request["prompt"]
+    return execute_control_kv(request["prompt"], llm_processor, kv_store)
 
-    # Process the prompt with LLM
-    llm_response = llm_processor.generate_response(
-        template_name="default",  # Use a pre-defined template for LLM queries
-        raw_prompt=user_prompt,
-        context=None,
-        force_json=True,
-    )
 
-    if llm_response["status"] != "success":
-        raise HTTPException(
-            status_code=500, detail="Failed to process the prompt via LLM"
-        )
+def _job_owner(user: dict) -> str:
+    # Same form as admission.principal_of for a signed-in user
+    return f"user:{user['email']}"
 
-    # Extract actions from the LLM response
-    actions = llm_response["data"]
-    if not actions:
+
+@llm_router.post("/jobs", status_code=202, dependencies=[admit("llm")])
+def submit_job(
+    data: JobRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, description="Resubmitting the same key returns the first job."),
+    job_runner=Depends(get_job_runner),
+    user=Depends(get_current_user),
+):
+    """
+    Queue a control-kv request and return its job at once; poll GET /llm/jobs/{id}
+    for the result, or listen on /ws for an "llm_job" message when it finishes.
+    Jobs belong to the signed-in user: a client address could be shared (a proxy
+    or NAT), which would expose results and idempotency keys to other clients.
+    """
+    try:
+        job, created = job_runner.submit({"prompt": data.prompt}, _job_owner(user), idempotency_key)
+    except QueueFull:
         raise HTTPException(
-            status_code=400, detail="No actions found in the LLM response"
+            status_code=503, detail="Job queue is full, try again later", headers={"Retry-After": "1"}
         )
+    response.headers["Location"] = f"/llm/jobs/{job['id']}"
+    if not created:
+        response.status_code = 200
+    return {"status": "success", "data": job}
+
 
-    # Perform actions on KV store
-    results = []
-    for action in actions:
-        action_type = action.get("action")
-        key = action.get("key")
-        value = action.get("value")
-
-        if action_type == "insert":
-            result = kv_store.insert(key, value)
-            results.append(result)
-        elif action_type == "update":
-            result = kv_store.update(key, value)
-            results.append(result)
-        elif action_type == "delete":
-            result = kv_store.delete(key)
-            results.append(result)
-        elif action_type == "get":
-            result = kv_store.get(key)
-            results.append(result)
-        elif action_type == "get_revisions":
-            result = kv_store.get_revisions(key)
-            results.append(result)
-        else:
-            results.append(
-                {
-                    "status": "error",
-                    "message": f"Unsupported action type '{action_type}'",
-                }
-            )
-
-    # Return the result summary
-    return results
+@llm_router.get("/jobs/{job_id}", dependencies=[admit("kv_read")])
+def get_job(job_id: str, job_runner=Depends(get_job_runner), user=Depends(get_current_user)):
+    """
+    Return a job's status and, once it has finished, its results or error.
+    Jobs are only visible to the user who submitted them.
+    """
+    job = job_runner.get(job_id, owner=_job_owner(user))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"status": "success", "data": job}
@@ -21,11 +21,15 @@ class WebSocketManager:
         """
         Remove a WebSocket connection.
         """
-        self.active_connections.remove(websocket)
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
 
     async def broadcast(self, message: str):
         """
-        Send a message to all connected WebSocket clients.
+        Send a message to all connected WebSocket clients, dropping any that have gone away.
         """
-        for connection in self.active_connections:
-            await connection.send_text(message)
+        for connection in list(self.active_connections):
+            try:
+                await connection.send_text(message)
+            except Exception:
+                await self.disconnect(connection)
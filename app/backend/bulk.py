@@ -0,0 +1,253 @@
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import sessionmaker
+from .db_setup import KeyValue, KeyValueEvent, KeyValueRevision
+from .kv_store import invalidate_reads, live_filter
+from . import json_index, search_index
+
+EXPORT_FORMAT = "kv-export"
+EXPORT_VERSION = 1
+
+# Compressed output is yielded in chunks of roughly this size
+_CHUNK_SIZE = 64 * 1024
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _records(connection, entries) -> List[Dict[str, Any]]:
+    """Build export records (with revision history) for rows of key_value_store."""
+    ids = [entry.id for entry in entries]
+    revisions: Dict[int, List[Dict[str, Any]]] = {}
+    for revision in connection.execute(
+        select(KeyValueRevision)
+        .where(KeyValueRevision.key_value_id.in_(ids))
+        .order_by(KeyValueRevision.key_value_id, KeyValueRevision.revision_number)
+    ):
+        revisions.setdefault(revision.key_value_id, []).append({
+            "revision_number": revision.revision_number,
+            "value": revision.value,
+            "created_at": _timestamp(revision.created_at),
+        })
+    return [
+        {
+            "key": entry.key,
+            "value": entry.value,
+            "version": entry.version,
+            "expires_at": _timestamp(entry.expires_at),
+            "created_at": _timestamp(entry.created_at),
+            "updated_at": _timestamp(entry.updated_at),
+            "revisions": revisions.get(entry.id, []),
+        }
+        for entry in entries
+    ]
+
+
+def export_records(engine, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """
+    Yield a header record, then one record per live key with its revision history.
+    Keys are read in id order, `batch_size` at a time, so memory use does not
+    grow with the size of the store.
+
+    :param engine: The KV store engine.
+    :param batch_size: Number of keys read per query.
+    """
+    yield {"format": EXPORT_FORMAT, "version": EXPORT_VERSION, "exported_at": datetime.utcnow().isoformat()}
+    last_id = 0
+    with engine.connect() as connection:
+        while True:
+            entries = connection.execute(
+                select(KeyValue).where(KeyValue.id > last_id, live_filter()).order_by(KeyValue.id).limit(batch_size)
+            ).all()
+            if not entries:
+                return
+            yield from _records(connection, entries)
+            last_id = entries[-1].id
+
+
+def records_for_keys(connection, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Return the export records of the given live keys (missing or expired keys are left out).
+    """
+    entries = connection.execute(select(KeyValue).where(KeyValue.key.in_(keys), live_filter())).all()
+    return {record["key"]: record for record in _records(connection, entries)}
+
+
+def export_stream(engine, batch_size: int = 1000, compresslevel: int = 6) -> Iterator[bytes]:
+    """
+    Stream the store as gzip-compressed NDJSON (see export_records).
+
+    :param engine: The KV store engine.
+    :param batch_size: Number of keys read per query.
+    :param compresslevel: gzip compression level (1-9).
+    :return: An iterator of compressed chunks, suitable for a file or a streaming response.
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    buffer = []
+    buffered = 0
+    for record in export_records(engine, batch_size):
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        buffer.append(line)
+        buffered += len(line)
+        if buffered >= _CHUNK_SIZE:
+            chunk = compressor.compress(b"".join(buffer))
+            buffer, buffered = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(b"".join(buffer)) + compressor.flush()
+
+
+def read_records(fileobj: BinaryIO) -> Iterator[Dict[str, Any]]:
+    """
+    Read an export (gzip-compressed or plain NDJSON) from a seekable binary file.
+
+    :raises ValueError: If the file is not a KV store export or a line is not valid JSON.
+    """
+    compressed = fileobj.read(2) == b"\x1f\x8b"
+    fileobj.seek(0)
+    # GzipFile would take its mode from the wrapped file, e.g. "w+b" for a temporary file
+    stream = gzip.GzipFile(fileobj=fileobj, mode="rb") if compressed else fileobj
+    try:
+        header = json.loads(stream.readline() or b"null")
+    except (OSError, ValueError):
+        header = None
+    if not isinstance(header, dict) or header.get("format") != EXPORT_FORMAT:
+        raise ValueError("Not a KV store export.")
+    if header.get("version") != EXPORT_VERSION:
+        raise ValueError(f"Unsupported export version {header.get('version')}.")
+    line_number = 1
+    try:
+        for line in stream:
+            line_number += 1
+            if line.strip():
+                yield json.loads(line)
+    except OSError as e:  # truncated or corrupt gzip data
+        raise ValueError(f"Export is corrupt after line {line_number}: {e}") from e
+    except ValueError as e:
+        raise ValueError(f"Line {line_number} is not valid JSON: {e}") from e
+
+
+def import_records(engine, records: Iterable[Dict[str, Any]], batch_size: int = 5000, replace: bool = False) -> Dict[str, int]:
+    """
+    Bulk-load exported records. Keys and revisions are inserted with executemany,
+    one transaction per `batch_size` keys; the search and JSON path indexes are
+    rebuilt once at the end instead of being maintained row by row.
+
+    :param engine: The KV store engine.
+    :param records: Records as produced by export_records (without the header).
+    :param batch_size: Number of keys per transaction.
+    :param replace: If True, existing keys are replaced (with their history); otherwise they are skipped.
+    :return: Counts of imported keys and revisions, and of skipped or replaced keys.
+    :raises ValueError: If a record is malformed. Batches committed before it stay
+        imported, and are indexed and announced like a complete import.
+    """
+    counts = {"keys": 0, "revisions": 0, "skipped": 0, "replaced": 0}
+    batch: List[Dict[str, Any]] = []
+    try:
+        for number, record in enumerate(records, 1):
+            if not _is_key_record(record):
+                raise ValueError(f"Record {number} is not a key record.")
+            batch.append(record)
+            if len(batch) >= batch_size:
+                _import_batch(engine, batch, replace, counts)
+                batch = []
+        if batch:
+            _import_batch(engine, batch, replace, counts)
+    except ValueError as e:
+        raise ValueError(f"{e} {counts['keys']} keys were imported before it.") from e
+    finally:
+        # Batches committed before a failure must still be indexed and announced
+        if counts["keys"]:
+            _finish_import(engine)
+    return counts
+
+
+def _is_key_record(record: Any) -> bool:
+    if not isinstance(record, dict) or not isinstance(record.get("key"), str) or "value" not in record:
+        return False
+    revisions = record.get("revisions", [])
+    return isinstance(revisions, list) and all(
+        isinstance(revision, dict) and "revision_number" in revision and "value" in revision for revision in revisions
+    )
+
+
+def _finish_import(engine):
+    with sessionmaker(bind=engine)() as session:
+        json_index.rebuild(session)
+        session.add(KeyValueEvent(key="*", action="import", origin=str(os.getpid())))
+        session.commit()
+        if search_index.search_available(session):
+            search_index.rebuild(engine)
+    invalidate_reads(engine)
+
+
+def import_file(engine, fileobj: BinaryIO, batch_size: int = 5000, replace: bool = False) -> Dict[str, int]:
+    """Import an export file; see read_records and import_records."""
+    return import_records(engine, read_records(fileobj), batch_size=batch_size, replace=replace)
+
+
+def _import_batch(engine, batch: List[Dict[str, Any]], replace: bool, counts: Dict[str, int]):
+    # Later records for the same key win
+    records = {record["key"]: record for record in batch}
+    with engine.begin() as connection:
+        existing = dict(connection.execute(select(KeyValue.key, KeyValue.id).where(KeyValue.key.in_(list(records)))).all())
+        if existing and replace:
+            ids = list(existing.values())
+            connection.execute(delete(KeyValueRevision).where(KeyValueRevision.key_value_id.in_(ids)))
+            connection.execute(delete(KeyValue).where(KeyValue.id.in_(ids)))
+            counts["replaced"] += len(ids)
+        elif existing:
+            for key in existing:
+                del records[key]
+            counts["skipped"] += len(existing)
+        if not records:
+            return
+
+        inserted_revisions = insert_records(connection, list(records.values()))
+    counts["keys"] += len(records)
+    counts["revisions"] += inserted_revisions
+
+
+def insert_records(connection, records: List[Dict[str, Any]]) -> int:
+    """
+    Insert export records (keys that do not exist yet) and their revisions with executemany.
+
+    :return: The number of revisions inserted.
+    """
+    now = datetime.utcnow()
+    connection.execute(insert(KeyValue), [
+        {
+            "key": record["key"],
+            "value": record["value"],
+            "version": record.get("version") or 1,
+            "expires_at": _parse_timestamp(record.get("expires_at")),
+            "created_at": _parse_timestamp(record.get("created_at")) or now,
+            "updated_at": _parse_timestamp(record.get("updated_at")) or now,
+        }
+        for record in records
+    ])
+    keys = [record["key"] for record in records]
+    ids = dict(connection.execute(select(KeyValue.key, KeyValue.id).where(KeyValue.key.in_(keys))).all())
+    revisions = [
+        {
+            "key_value_id": ids[record["key"]],
+            "revision_number": revision["revision_number"],
+            "value": revision["value"],
+            "created_at": _parse_timestamp(revision.get("created_at")) or now,
+        }
+        for record in records
+        for revision in record.get("revisions", [])
+    ]
+    if revisions:
+        connection.execute(insert(KeyValueRevision), revisions)
+    return len(revisions)
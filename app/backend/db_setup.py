@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine, Column, String, DateTime, JSON, Integer, ForeignKey, func
+from sqlalchemy import create_engine, event, inspect, Column, String, DateTime, Integer, Float, ForeignKey, Index, JSON, UniqueConstraint, func
+from sqlalchemy.schema import CreateColumn
+from .value_codec import EncodedJSON
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 Base = declarative_base()
@@ -7,24 +9,132 @@ class KeyValue(Base):
     __tablename__ = "key_value_store"
     id = Column(Integer, primary_key=True, autoincrement=True)
     key = Column(String, unique=True, nullable=False)
-    value = Column(JSON, nullable=False)
+    value = Column(EncodedJSON, nullable=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # UTC; NULL means the key never expires. Indexed so the sweeper reads expired keys in order
+    expires_at = Column(DateTime, nullable=True, index=True)
+    # Bumped by every update; updates and deletes only apply if it is unchanged since the row was read
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
 
 class KeyValueRevision(Base):
     __tablename__ = "key_value_revisions"
     id = Column(Integer, primary_key=True, autoincrement=True)
     key_value_id = Column(Integer, ForeignKey("key_value_store.id"), nullable=False)
     revision_number = Column(Integer, nullable=False)
-    value = Column(JSON, nullable=False)
+    value = Column(EncodedJSON, nullable=False)
     created_at = Column(DateTime, default=func.now())
 
+class KeyValueIndex(Base):
+    """A declared secondary index on a JSON path inside values (e.g. "region" or "db.port")."""
+    __tablename__ = "key_value_indexes"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path = Column(String, unique=True, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+
+class KeyValueIndexEntry(Base):
+    """
+    Side table holding the scalar found at an indexed path for each key.
+    Numbers and booleans go in value_num, strings in value_str, so range
+    predicates compare like with like.
+    """
+    __tablename__ = "key_value_index_entries"
+    __table_args__ = (
+        Index("ix_kv_index_entries_num", "index_id", "value_num"),
+        Index("ix_kv_index_entries_str", "index_id", "value_str"),
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    index_id = Column(Integer, ForeignKey("key_value_indexes.id"), nullable=False)
+    key_value_id = Column(Integer, ForeignKey("key_value_store.id"), nullable=False, index=True)
+    value_num = Column(Float, nullable=True)
+    value_str = Column(String, nullable=True)
+
+class KeyValueEvent(Base):
+    """
+    Append-only log of KV mutations, tailed by every worker process to keep
+    caches coherent and to relay changes to WebSocket subscribers.
+    """
+    __tablename__ = "key_value_events"
+    __table_args__ = {"sqlite_autoincrement": True}  # ids are never reused after pruning
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    key = Column(String, nullable=False)
+    action = Column(String, nullable=False)
+    origin = Column(String, nullable=True)
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+class LLMJob(Base):
+    """
+    A background /llm/control-kv request and its outcome. Shared by all worker
+    processes, so any of them can report on a job.
+    """
+    __tablename__ = "llm_jobs"
+    __table_args__ = (UniqueConstraint("owner", "idempotency_key"),)
+    id = Column(String, primary_key=True)
+    # Who submitted the job; idempotency keys are scoped to them
+    owner = Column(String, nullable=False)
+    idempotency_key = Column(String, nullable=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded or failed
+    request = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    # Process that queued the job; unfinished jobs of processes that are gone are failed on startup
+    worker_pid = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=func.now(), index=True)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
 # Database setup
 def get_engine(db_url="sqlite:///kv_store.db"):
-    return create_engine(db_url)
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _enable_wal)
+    return engine
+
+def _enable_wal(dbapi_connection, connection_record):
+    """Use WAL so readers in other worker processes don't block on writers."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
 
 def init_db(engine):
     Base.metadata.create_all(engine)
+    added = _add_missing_columns(engine)
+    if ("key_value_store", "version") in added:
+        # Revisions used to be numbered 1..n; continue from there
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "UPDATE key_value_store SET version = 1 + "
+                "(SELECT COUNT(*) FROM key_value_revisions WHERE key_value_id = key_value_store.id)"
+            )
+
+def _add_missing_columns(engine):
+    """
+    Add columns (and their indexes) introduced after a database was created,
+    since create_all only creates missing tables.
+
+    :return: The added (table, column) names.
+    """
+    inspector = inspect(engine)
+    added_columns = set()
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            added = [column for column in table.columns if column.name not in existing]
+            for column in added:
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+            for index in table.indexes:
+                if any(column in added for column in index.columns):
+                    index.create(connection, checkfirst=True)
+            added_columns.update((table.name, column.name) for column in added)
+    return added_columns
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_table(target, connection, **kw):
+    """Create the full-text search table alongside the regular tables (if FTS5 is available)."""
+    from .search_index import create_search_table
+    create_search_table(connection)
 
 # Session maker
 def get_session(engine):
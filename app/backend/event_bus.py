@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+from .db_setup import KeyValueEvent
+
+
+class EventBus:
+    """
+    Cross-process change notification backed by the `key_value_events` table.
+
+    Every KVStore mutation appends an event in the same transaction as the change.
+    Each worker process tails the table with `poll()` and hands new events to its
+    subscribers (cache invalidation, WebSocket relays, ...). Because the log lives
+    in the shared SQLite database, no extra daemon is needed to run several workers.
+    """
+
+    def __init__(self, engine, batch_size: int = 1000, retention_seconds: float = 300.0, prune_every: int = 200):
+        """
+        Initialize the bus at the current end of the log.
+
+        :param engine: The KV store engine.
+        :param batch_size: Maximum number of events read per poll.
+        :param retention_seconds: Events older than this are pruned.
+        :param prune_every: Prune old events once every this many polls.
+        """
+        self.Session = sessionmaker(bind=engine)
+        self.batch_size = batch_size
+        self.retention_seconds = retention_seconds
+        self.prune_every = prune_every
+        self.subscribers: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self.polls = 0
+        self.delivered = 0
+        self._lock = threading.Lock()
+
+        with self.Session() as session:
+            self.last_seen = session.query(func.max(KeyValueEvent.id)).scalar() or 0
+
+    def subscribe(self, callback: Callable[[List[Dict[str, Any]]], None]):
+        """
+        Register a callback that receives each batch of new events.
+        """
+        self.subscribers.append(callback)
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """
+        Read events appended since the last poll and dispatch them to subscribers.
+
+        :return: The new events, oldest first.
+        """
+        with self._lock:
+            with self.Session() as session:
+                rows = (
+                    session.query(KeyValueEvent)
+                    .filter(KeyValueEvent.id > self.last_seen)
+                    .order_by(KeyValueEvent.id)
+                    .limit(self.batch_size)
+                    .all()
+                )
+                events = [
+                    {"id": row.id, "key": row.key, "action": row.action, "origin": row.origin}
+                    for row in rows
+                ]
+            if events:
+                self.last_seen = events[-1]["id"]
+                self.delivered += len(events)
+
+            self.polls += 1
+            if self.polls % self.prune_every == 0:
+                self.prune()
+
+        if events:
+            for callback in self.subscribers:
+                callback(events)
+        return events
+
+    def prune(self) -> int:
+        """
+        Delete events older than the retention window.
+
+        :return: The number of events deleted.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        with self.Session() as session:
+            deleted = session.query(KeyValueEvent).filter(KeyValueEvent.created_at < cutoff).delete()
+            session.commit()
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        return {"last_seen": self.last_seen, "polls": self.polls, "delivered": self.delivered}
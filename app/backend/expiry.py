@@ -0,0 +1,42 @@
+import threading
+from sqlalchemy.orm import sessionmaker
+from .kv_store import KVStore, expiry_stats
+
+
+class ExpirySweeper:
+    """
+    Deletes expired keys in the background.
+
+    Each sweep deletes at most `max_batches` batches of `batch_size` keys, one short
+    transaction per batch, so writers are never blocked for long and a large backlog
+    of expired keys is worked off over several sweeps. Reads already treat expired
+    keys as missing, so sweeping only reclaims space.
+    """
+
+    def __init__(self, engine, batch_size: int = 500, max_batches: int = 20):
+        """
+        :param engine: The KV store engine.
+        :param batch_size: Maximum number of keys deleted per transaction.
+        :param max_batches: Maximum number of batches per sweep.
+        """
+        self.Session = sessionmaker(bind=engine)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._lock = threading.Lock()
+
+    def sweep(self) -> int:
+        """
+        Delete expired keys until none are left or the batch budget is spent.
+
+        :return: The number of keys deleted.
+        """
+        swept = 0
+        with self._lock, self.Session() as session:
+            store = KVStore(session)
+            for _ in range(self.max_batches):
+                deleted = store.sweep_expired(self.batch_size)
+                swept += deleted
+                if deleted < self.batch_size:
+                    break
+        expiry_stats.record_sweep(swept)
+        return swept
@@ -0,0 +1,173 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from .db_setup import get_engine
+from .kv_store import KVStore, invalidate_reads
+
+
+class _GroupedKVStore(KVStore):
+    """
+    A KVStore whose mutations run inside a SAVEPOINT of a shared group transaction:
+    "committing" releases the savepoint, rolling back only undoes that one mutation.
+    """
+
+    savepoint = None
+
+    def _commit(self):
+        self.session.flush()
+        self.savepoint.commit()
+
+    def _rollback(self):
+        self.savepoint.rollback()
+        self.savepoint = self.session.begin_nested()
+
+
+class _Write:
+    __slots__ = ("operation", "args", "kwargs", "future")
+
+    def __init__(self, operation: str, args: tuple, kwargs: dict):
+        self.operation = operation
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+def _begin_immediate(connection):
+    # Take the write lock when the group starts, so no statement in it can hit SQLITE_BUSY
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN instead
+    dbapi_connection.isolation_level = None
+
+
+class GroupCommitWriter:
+    """
+    Write-behind group commit for KV mutations.
+
+    Callers submit inserts, updates and deletes from any thread and block until
+    their write is durable. A single writer thread drains the queue and applies
+    everything that arrived within `max_delay` seconds (up to `max_batch`
+    operations) in one transaction, so a burst of small writes costs one commit
+    (and one fsync) instead of one per write. Each operation runs in its own
+    SAVEPOINT, so a failing one (e.g. a duplicate key) does not affect the rest
+    of its group.
+
+    The writer uses its own engine on the same database; in-memory SQLite
+    databases are therefore not supported.
+    """
+
+    def __init__(self, engine, max_batch: int = 256, max_delay: float = 0.002):
+        """
+        :param engine: The KV store engine that readers use.
+        :param max_batch: Maximum number of operations committed together.
+        :param max_delay: Seconds to wait for more operations after the first one of a group.
+        """
+        self.bind = engine
+        self.engine = get_engine(engine.url)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _disable_pysqlite_transactions)
+            event.listen(self.engine, "begin", _begin_immediate)
+        self.Session = sessionmaker(bind=self.engine)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self.groups = 0
+        self.operations = 0
+        self.largest_group = 0
+        self._queue: "queue.Queue[Optional[_Write]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="kv-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: str, *args, **kwargs) -> Future:
+        """
+        Queue a KVStore mutation ("insert", "update" or "delete").
+
+        :return: A future resolved with the operation's result once its group is committed.
+        """
+        if operation not in ("insert", "update", "delete"):
+            raise ValueError(f"Unsupported operation '{operation}'.")
+        write = _Write(operation, args, kwargs)
+        self._queue.put(write)
+        return write.future
+
+    def insert(self, key: str, value: dict, ttl: Optional[float] = None):
+        return self.submit("insert", key, value, ttl=ttl).result()
+
+    def update(self, key: str, value: dict, ttl: Optional[float] = None, expected_version: Optional[int] = None):
+        return self.submit("update", key, value, ttl=ttl, expected_version=expected_version).result()
+
+    def delete(self, key: str, expected_version: Optional[int] = None):
+        return self.submit("delete", key, expected_version=expected_version).result()
+
+    def close(self):
+        """Commit everything queued so far and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+        self.engine.dispose()
+
+    def _run(self):
+        while True:
+            write = self._queue.get()
+            if write is None:
+                return
+            group = [write]
+            stopping = False
+            deadline = time.monotonic() + self.max_delay
+            while len(group) < self.max_batch:
+                try:
+                    write = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if write is None:
+                    stopping = True
+                    break
+                group.append(write)
+            self._commit_group(group)
+            if stopping:
+                return
+
+    def _commit_group(self, group: List[_Write]):
+        results: List[Any] = []
+        try:
+            with self.Session() as session:
+                store = _GroupedKVStore(session)
+                for write in group:
+                    store.savepoint = session.begin_nested()
+                    try:
+                        results.append(getattr(store, write.operation)(*write.args, **write.kwargs))
+                        if store.savepoint.is_active:
+                            store.savepoint.commit()
+                    except Exception as e:
+                        if store.savepoint.is_active:
+                            store.savepoint.rollback()
+                        results.append(e)
+                session.commit()
+        except Exception as e:
+            for write in group:
+                write.future.set_exception(e)
+            return
+
+        invalidate_reads(self.bind)
+        self.groups += 1
+        self.operations += len(group)
+        self.largest_group = max(self.largest_group, len(group))
+        for write, result in zip(group, results):
+            if isinstance(result, Exception):
+                write.future.set_exception(result)
+            else:
+                write.future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "groups": self.groups,
+            "operations": self.operations,
+            "largest_group": self.largest_group,
+            "average_group": self.operations / self.groups if self.groups else 0.0,
+            "queued": self._queue.qsize(),
+        }
@@ -0,0 +1,327 @@
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from .db_setup import LLMJob
+
+UNFINISHED = ("queued", "running")
+
+
+class QueueFull(Exception):
+    """The job queue is at capacity; the caller should retry later."""
+
+
+class _Timing:
+    """Count, mean and maximum of a duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "mean_seconds": round(self.total / self.count, 4) if self.count else 0.0,
+            "max_seconds": round(self.max, 4),
+        }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _job_dict(job: LLMJob) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+class JobRunner:
+    """
+    Runs submitted jobs on a fixed pool of background threads and stores their
+    state and results in the `llm_jobs` table.
+
+    Submitting returns at once with the job's id; the outcome is read back with
+    `get` (from any worker process, since it comes from the database). The queue
+    is bounded: once `max_queue` jobs are waiting, `submit` raises QueueFull
+    instead of letting work pile up. A job submitted again with the same owner and
+    idempotency key returns the existing job instead of running twice.
+    """
+
+    def __init__(
+        self,
+        engine,
+        handler: Callable[[Dict[str, Any]], Any],
+        workers: int = 4,
+        max_queue: int = 64,
+        retention_seconds: float = 86400.0,
+    ):
+        """
+        :param engine: The KV store engine (jobs are stored alongside the keys).
+        :param handler: Runs a job's request and returns its JSON-serializable result; an exception fails the job.
+        :param workers: Number of jobs run at once.
+        :param max_queue: Number of jobs that may wait for a worker.
+        :param retention_seconds: Finished jobs older than this are deleted.
+        """
+        self.Session = sessionmaker(bind=engine)
+        self.handler = handler
+        self.max_queue = max_queue
+        self.retention_seconds = retention_seconds
+        self.subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.running = 0
+        self.wait_time = _Timing()
+        self.run_time = _Timing()
+        self._queue: "queue.Queue[Optional[Tuple[str, Dict[str, Any], float]]]" = queue.Queue()
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+        self.recover()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"llm-job-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        Register a callback that receives each job once it has finished. It is
+        called on the worker thread that ran the job.
+        """
+        self.subscribers.append(callback)
+
+    def submit(self, request: Dict[str, Any], owner: str, idempotency_key: Optional[str] = None) -> Tuple[Dict[str, Any], bool]:
+        """
+        Store a job and queue it.
+
+        :param request: The job's input, passed to the handler.
+        :param owner: Who submitted the job.
+        :param idempotency_key: Optional client-chosen key; resubmitting it returns the first job.
+        :return: The job and whether it was created by this call.
+        :raises QueueFull: If `max_queue` jobs are already waiting.
+        """
+        if idempotency_key is not None:
+            existing = self._find(owner, idempotency_key)
+            if existing is not None:
+                with self._lock:
+                    self.deduplicated += 1
+                return existing, False
+
+        with self._lock:
+            if self._reserved >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{self._reserved} jobs are already waiting.")
+            self._reserved += 1
+
+        job_id = uuid.uuid4().hex
+        with self.Session() as session:
+            job = LLMJob(
+                id=job_id,
+                owner=owner,
+                idempotency_key=idempotency_key,
+                status="queued",
+                request=request,
+                worker_pid=os.getpid(),
+            )
+            session.add(job)
+            try:
+                session.commit()
+            except IntegrityError:
+                # A concurrent submission (possibly in another worker) stored this key first
+                session.rollback()
+                with self._lock:
+                    self._reserved -= 1
+                    self.deduplicated += 1
+                return self._find(owner, idempotency_key), False
+            created = _job_dict(job)
+
+        with self._lock:
+            self.submitted += 1
+        self._queue.put((job_id, request, time.monotonic()))
+        return created, True
+
+    def _find(self, owner: str, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        with self.Session() as session:
+            job = session.scalars(
+                select(LLMJob).where(LLMJob.owner == owner, LLMJob.idempotency_key == idempotency_key)
+            ).first()
+            return _job_dict(job) if job is not None else None
+
+    def get(self, job_id: str, owner: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return a job, or None if it does not exist (or belongs to someone other than `owner`).
+        """
+        with self.Session() as session:
+            job = session.get(LLMJob, job_id)
+            if job is None or (owner is not None and job.owner != owner):
+                return None
+            return _job_dict(job)
+
+    def recover(self) -> int:
+        """
+        Fail unfinished jobs queued by processes that no longer run; their queue was lost
+        with them. Called when the runner starts, before it queues anything.
+
+        :return: The number of jobs failed.
+        """
+        with self.Session() as session:
+            pids = session.scalars(
+                select(LLMJob.worker_pid).where(LLMJob.status.in_(UNFINISHED)).distinct()
+            ).all()
+            # This process has queued nothing yet, so jobs under its pid are from an earlier
+            # process that had the same pid (common after a container restart)
+            gone = [pid for pid in pids if pid is not None and (pid == os.getpid() or not _pid_alive(pid))]
+            stale = LLMJob.worker_pid.in_(gone)
+            if None in pids:
+                stale = stale | LLMJob.worker_pid.is_(None)
+            elif not gone:
+                return 0
+            failed = session.execute(
+                update(LLMJob)
+                .where(LLMJob.status.in_(UNFINISHED), stale)
+                .values(status="failed", error="Interrupted by a server restart.", finished_at=datetime.utcnow())
+            ).rowcount
+            session.commit()
+            return failed
+
+    def prune(self) -> int:
+        """
+        Delete finished jobs older than the retention window.
+
+        :return: The number of jobs deleted.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        with self.Session() as session:
+            deleted = (
+                session.query(LLMJob)
+                .filter(LLMJob.status.notin_(UNFINISHED), LLMJob.finished_at < cutoff)
+                .delete(synchronize_session=False)
+            )
+            session.commit()
+        return deleted
+
+    def close(self):
+        """Stop the workers: running jobs finish, jobs still waiting are failed."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                with self._lock:
+                    self._reserved -= 1
+                self._update(item[0], status="failed", error="Cancelled by a server shutdown.", finished_at=datetime.utcnow())
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job_id, request, queued_at = item
+            started = time.monotonic()
+            with self._lock:
+                self._reserved -= 1
+                self.running += 1
+                self.wait_time.record(started - queued_at)
+
+            try:
+                job, error = self._execute(job_id, request)
+            except Exception as e:
+                # The job's state could not be stored at all (e.g. "database is locked");
+                # it is left for recover() and this worker moves on to the next job
+                print(f"Job {job_id} error: {e}")
+                job, error = None, str(e) or type(e).__name__
+            with self._lock:
+                self.running -= 1
+                if error is None:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+                prune = (self.succeeded + self.failed) % 100 == 0
+            if prune:
+                try:
+                    self.prune()
+                except Exception as e:
+                    print(f"Job prune error: {e}")
+            if job is None:
+                continue
+            for callback in self.subscribers:
+                try:
+                    callback(job)
+                except Exception as e:
+                    print(f"Job callback error: {e}")
+
+    def _execute(self, job_id: str, request: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+        """Run one job and store its outcome; return the stored job and its error, if any."""
+        started = time.monotonic()
+        try:
+            self._update(job_id, status="running", started_at=datetime.utcnow())
+            result, error = self.handler(request), None
+        except Exception as e:
+            result, error = None, str(e) or type(e).__name__
+        with self._lock:
+            self.run_time.record(time.monotonic() - started)
+
+        try:
+            if error is None:
+                return self._update(job_id, status="succeeded", result=result, finished_at=datetime.utcnow()), None
+            return self._update(job_id, status="failed", error=error, finished_at=datetime.utcnow()), error
+        except Exception as e:
+            # A handler that broke its contract (a result that is not JSON-serializable),
+            # or a transient database error; either way the job must not stay "running"
+            job = self._update(job_id, status="failed", error=f"Could not store the result: {e}", finished_at=datetime.utcnow())
+            return job, job["error"]
+
+    def _update(self, job_id: str, **values) -> Dict[str, Any]:
+        with self.Session() as session:
+            job = session.get(LLMJob, job_id)
+            for name, value in values.items():
+                setattr(job, name, value)
+            session.commit()
+            return _job_dict(job)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self._reserved,
+                "running": self.running,
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "wait": self.wait_time.snapshot(),
+                "run": self.run_time.snapshot(),
+            }
@@ -0,0 +1,188 @@
+from typing import Any, Dict, List, Sequence, Tuple
+from sqlalchemy import delete, insert, select
+from .db_setup import KeyValue, KeyValueIndex, KeyValueIndexEntry
+
+OPERATORS = {
+    "eq": lambda column, value: column == value,
+    "ne": lambda column, value: column != value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+}
+
+_MISSING = object()
+
+
+def parse_path(path: str) -> List[str]:
+    """
+    Split a JSON path like "db.port" (a leading "$." is accepted) into its segments.
+
+    :param path: The dotted path.
+    :return: The path segments.
+    :raises ValueError: If the path is empty or has empty segments.
+    """
+    if path.startswith("$."):
+        path = path[2:]
+    segments = path.split(".")
+    if not path or any(not segment for segment in segments):
+        raise ValueError(f"Invalid JSON path '{path}'.")
+    return segments
+
+
+def normalize_path(path: str) -> str:
+    """Return the canonical form of a path, as stored in key_value_indexes."""
+    return ".".join(parse_path(path))
+
+
+def extract(value: Any, segments: List[str]) -> Any:
+    """
+    Return the scalar at a path inside a JSON value, or _MISSING if there is none.
+    Numeric segments index into lists.
+    """
+    for segment in segments:
+        if isinstance(value, dict) and segment in value:
+            value = value[segment]
+        elif isinstance(value, list) and segment.isdigit() and int(segment) < len(value):
+            value = value[int(segment)]
+        else:
+            return _MISSING
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return _MISSING
+
+
+def _columns(scalar: Any) -> Dict[str, Any]:
+    if isinstance(scalar, str):
+        return {"value_num": None, "value_str": scalar}
+    return {"value_num": float(scalar), "value_str": None}
+
+
+def declared_indexes(session) -> List[Tuple[int, str]]:
+    """Return (id, path) for every declared index."""
+    return session.execute(select(KeyValueIndex.id, KeyValueIndex.path)).all()
+
+
+def index_value(session, key_value_id: int, value: Any):
+    """
+    Replace the index entries of a key for its new value, in the session's transaction.
+    """
+    indexes = declared_indexes(session)
+    if not indexes:
+        return
+    remove(session, key_value_id)
+    rows = []
+    for index_id, path in indexes:
+        scalar = extract(value, parse_path(path))
+        if scalar is not _MISSING:
+            rows.append({"index_id": index_id, "key_value_id": key_value_id, **_columns(scalar)})
+    if rows:
+        session.execute(insert(KeyValueIndexEntry), rows)
+
+
+def remove(session, key_value_id: int):
+    """Delete all index entries of a key, in the session's transaction."""
+    session.query(KeyValueIndexEntry).filter(KeyValueIndexEntry.key_value_id == key_value_id).delete(
+        synchronize_session=False
+    )
+
+
+def create_index(session, path: str, batch_size: int = 5000) -> int:
+    """
+    Declare an index on a JSON path and backfill it from existing values.
+
+    :param session: A database session (the caller commits).
+    :param path: The JSON path to index.
+    :param batch_size: Number of keys read per backfill batch.
+    :return: The number of keys that have a value at the path.
+    """
+    index = KeyValueIndex(path=normalize_path(path))
+    session.add(index)
+    session.flush()
+    return _backfill(session, index.id, index.path, batch_size)
+
+
+def _backfill(session, index_id: int, path: str, batch_size: int) -> int:
+    segments = parse_path(path)
+    indexed = 0
+    last_id = 0
+    while True:
+        rows = session.execute(
+            select(KeyValue.id, KeyValue.value).where(KeyValue.id > last_id).order_by(KeyValue.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        entries = []
+        for row in rows:
+            scalar = extract(row.value, segments)
+            if scalar is not _MISSING:
+                entries.append({"index_id": index_id, "key_value_id": row.id, **_columns(scalar)})
+        if entries:
+            session.execute(insert(KeyValueIndexEntry), entries)
+        indexed += len(entries)
+        last_id = rows[-1].id
+    return indexed
+
+
+def rebuild(session, batch_size: int = 5000) -> int:
+    """
+    Recompute the entries of every declared index, e.g. after a bulk import (the caller commits).
+
+    :return: The number of index entries written.
+    """
+    session.execute(delete(KeyValueIndexEntry))
+    return sum(_backfill(session, index_id, path, batch_size) for index_id, path in declared_indexes(session))
+
+
+def drop_index(session, path: str) -> bool:
+    """
+    Drop a declared index and its entries (the caller commits).
+
+    :return: False if no index exists for the path.
+    """
+    index = session.query(KeyValueIndex).filter(KeyValueIndex.path == normalize_path(path)).first()
+    if index is None:
+        return False
+    session.query(KeyValueIndexEntry).filter(KeyValueIndexEntry.index_id == index.id).delete(synchronize_session=False)
+    session.delete(index)
+    return True
+
+
+def query(session, predicates: List[Dict[str, Any]], limit: int = 100, offset: int = 0, filters: Sequence = ()):
+    """
+    Find keys whose values satisfy all predicates, using only declared indexes.
+
+    :param session: A database session.
+    :param predicates: Dicts with "path", "op" (eq, ne, lt, lte, gt, gte) and "value".
+    :param limit: Maximum number of keys returned.
+    :param offset: Number of keys to skip, in key order.
+    :param filters: Additional conditions on KeyValue (e.g. excluding expired keys).
+    :return: The matching KeyValue rows (key order) and whether more exist.
+    :raises ValueError: If a predicate is malformed or its path is not indexed.
+    """
+    if not predicates:
+        raise ValueError("At least one predicate is required.")
+    indexes = {path: index_id for index_id, path in declared_indexes(session)}
+
+    statement = select(KeyValue).where(*filters)
+    for predicate in predicates:
+        path = normalize_path(predicate.get("path", ""))
+        if path not in indexes:
+            raise ValueError(f"Path '{path}' is not indexed; declare an index on it before querying.")
+        op = predicate.get("op", "eq")
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator '{op}'.")
+        value = predicate.get("value")
+        if not isinstance(value, (str, int, float, bool)):
+            raise ValueError(f"Predicate on '{path}' needs a string, number or boolean value.")
+
+        columns = _columns(value)
+        column = KeyValueIndexEntry.value_str if columns["value_str"] is not None else KeyValueIndexEntry.value_num
+        compared = columns["value_str"] if columns["value_str"] is not None else columns["value_num"]
+        matching = select(KeyValueIndexEntry.key_value_id).where(
+            KeyValueIndexEntry.index_id == indexes[path], OPERATORS[op](column, compared)
+        )
+        statement = statement.where(KeyValue.id.in_(matching))
+
+    rows = session.execute(statement.order_by(KeyValue.key).limit(limit + 1).offset(offset)).scalars().all()
+    return rows[:limit], len(rows) > limit
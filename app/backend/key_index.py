@@ -0,0 +1,172 @@
+import heapq
+import re
+import threading
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from .db_setup import KeyValue
+from .kv_store import live_filter
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """
+    Trigrams of each alphanumeric token of `text`, padded like pg_trgm ("  ab" ... "ab ")
+    so short tokens and word boundaries count too. Case and punctuation are ignored,
+    so "user.profile" and "User profile" share all their trigrams.
+    """
+    grams: Set[str] = set()
+    for token in _TOKEN.findall(text.lower()):
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class KeyIndex:
+    """
+    In-memory trigram index over the existing keys, used to tell the LLM which keys
+    a prompt probably refers to and to suggest keys for names it gets slightly wrong.
+
+    It is kept current from the event log (see `apply_events`), so mutations made
+    by any worker process reach every process's index.
+    """
+
+    def __init__(self, max_postings: int = 2000):
+        """
+        :param max_postings: Trigrams shared by more keys than this are too common to
+            pick candidates with; they still count when candidates are scored.
+        """
+        self.max_postings = max_postings
+        self._grams: Dict[str, FrozenSet[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._grams)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._grams
+
+    def add(self, key: str):
+        with self._lock:
+            self._add(key)
+
+    def _add(self, key: str):
+        if key in self._grams:
+            return
+        grams = trigrams(key)
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str):
+        with self._lock:
+            grams = self._grams.pop(key, None)
+            for gram in grams or ():
+                keys = self._postings[gram]
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def load(self, engine) -> int:
+        """
+        Replace the index with the live keys of the store.
+
+        :return: The number of keys indexed.
+        """
+        with engine.connect() as connection:
+            keys = connection.execute(select(KeyValue.key).where(live_filter())).scalars()
+            with self._lock:
+                self._grams.clear()
+                self._postings.clear()
+                for key in keys:
+                    self._add(key)
+            return len(self._grams)
+
+    def apply_events(self, engine, events: Iterable[Dict[str, Any]]):
+        """
+        Apply a batch from the event log: inserts add keys, deletes and expiries
+        remove them, and a bulk import reloads everything.
+        """
+        for event in events:
+            if event["action"] == "import":
+                self.load(engine)
+            elif event["action"] == "insert":
+                self.add(event["key"])
+            elif event["action"] in ("delete", "expire"):
+                self.remove(event["key"])
+
+    def _shared(self, grams: FrozenSet[str]) -> Dict[str, int]:
+        # Count shared trigrams per key, skipping trigrams that almost every key has
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            keys = self._postings.get(gram)
+            if keys and len(keys) <= self.max_postings:
+                for key in keys:
+                    counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def candidates(self, text: str, k: int = 10, min_score: float = 0.5) -> List[str]:
+        """
+        Find the keys a piece of text (e.g. a prompt) most likely mentions.
+
+        :param text: The text to match keys against.
+        :param k: Maximum number of keys returned.
+        :param min_score: Minimum fraction of a key's trigrams that must occur in the text.
+        :return: Up to `k` keys, best match first.
+        """
+        grams = trigrams(text)
+        with self._lock:
+            shortlist = heapq.nlargest(4 * k, ((count, key) for key, count in self._shared(grams).items()))
+            scored = []
+            for _, key in shortlist:
+                key_grams = self._grams[key]
+                score = len(key_grams & grams) / len(key_grams)
+                if score >= min_score:
+                    scored.append((score, -len(key), key))
+        return [key for _, _, key in heapq.nlargest(k, scored)]
+
+    def similar(self, key: str, k: int = 2) -> List[Tuple[str, float]]:
+        """
+        Return up to `k` existing keys ranked by trigram (Jaccard) similarity to `key`,
+        most similar first, with their similarity.
+        """
+        grams = trigrams(key)
+        with self._lock:
+            if key in self._grams:
+                return [(key, 1.0)]
+            shortlist = heapq.nlargest(16, ((count, candidate) for candidate, count in self._shared(grams).items()))
+            scored = []
+            for _, candidate in shortlist:
+                candidate_grams = self._grams[candidate]
+                shared = len(grams & candidate_grams)
+                scored.append((shared / (len(grams) + len(candidate_grams) - shared), candidate))
+        return [(candidate, similarity) for similarity, candidate in heapq.nlargest(k, scored)]
+
+    def nearest(self, key: str, min_similarity: float = 0.5) -> Optional[str]:
+        """
+        Return the existing key closest to `key` (itself if it exists), or None if
+        no key has a trigram similarity of at least `min_similarity`.
+        """
+        best = self.similar(key, k=1)
+        if not best or best[0][1] < min_similarity:
+            return None
+        return best[0][0]
+
+
+def suggest_action_keys(actions: List[Dict[str, Any]], key_index: KeyIndex, min_similarity: float = 0.5) -> List[Dict[str, Any]]:
+    """
+    Attach the nearest existing key as "suggested_key" to actions on keys that do
+    not exist (everything but inserts). The action's own key is never changed:
+    keys are case-sensitive and a similar key is often a different record (user_2
+    and user_3), so acting on a guess could read, update or delete the wrong one.
+    """
+    suggested = []
+    for action in actions:
+        key = action.get("key")
+        if action.get("action") != "insert" and isinstance(key, str) and key not in key_index:
+            nearest = key_index.nearest(key, min_similarity)
+            if nearest is not None:
+                action = {**action, "suggested_key": nearest}
+        suggested.append(action)
+    return suggested
@@ -1,54 +1,231 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func, or_, select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from .db_setup import KeyValue, KeyValueRevision
+from sqlalchemy.orm.exc import StaleDataError
+from .db_setup import KeyValue, KeyValueEvent, KeyValueIndexEntry, KeyValueRevision
+from .single_flight import SingleFlight
+from . import json_index, search_index
+
+# Concurrent identical reads (across all KVStore instances in the process) share one query
+read_flights = SingleFlight()
+
+# Bumped on every mutation so reads issued after a write never join a flight started before it
+_generations = {}
+_generations_lock = threading.Lock()
+
+
+def invalidate_reads(bind):
+    """
+    Start a new read generation for a database, e.g. after a mutation.
+
+    :param bind: The engine the mutation was made through.
+    """
+    with _generations_lock:
+        _generations[bind] = _generations.get(bind, 0) + 1
+
+
+class ExpiryStats:
+    """Counts keys found expired on read and keys deleted by the expiry sweeper."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.expired_reads = 0
+        self.swept = 0
+        self.sweeps = 0
+
+    def record_expired_read(self):
+        with self._lock:
+            self.expired_reads += 1
+
+    def record_sweep(self, swept: int):
+        with self._lock:
+            self.sweeps += 1
+            self.swept += swept
+
+    def snapshot(self):
+        with self._lock:
+            return {"expired_reads": self.expired_reads, "swept": self.swept, "sweeps": self.sweeps}
+
+
+expiry_stats = ExpiryStats()
+
+
+def _expires_at(ttl: Optional[float]) -> Optional[datetime]:
+    return datetime.utcnow() + timedelta(seconds=ttl) if ttl is not None else None
+
+
+def _is_expired(entry: KeyValue) -> bool:
+    return entry.expires_at is not None and entry.expires_at <= datetime.utcnow()
+
+
+def make_etag(entry_id: int, version: int) -> str:
+    """
+    ETag of a key's value. Includes the row id, so a key that was deleted and
+    re-created never reuses an ETag.
+    """
+    return f'"{entry_id}.{version}"'
+
+
+def live_filter():
+    """SQL condition matching keys that have not expired."""
+    return or_(KeyValue.expires_at.is_(None), KeyValue.expires_at > datetime.utcnow())
+
 
 class KVStore:
     def __init__(self, session: Session):
         self.session = session
 
-    def insert(self, key: str, value: dict):
-        """Insert a new key-value pair."""
+    def _coalesced(self, operation: str, key: str, fn):
+        """
+        Run a read through the shared single-flight group. Mutations must never use this.
+        """
+        bind = self.session.get_bind()
+        return read_flights.do((bind, _generations.get(bind, 0), operation, key), fn)
+
+    def _record_event(self, key: str, action: str):
+        """Append a mutation to the event log in the current transaction."""
+        self.session.add(KeyValueEvent(key=key, action=action, origin=str(os.getpid())))
+
+    def _commit(self):
+        """Commit the session and invalidate in-flight reads for this database."""
+        self.session.commit()
+        invalidate_reads(self.session.get_bind())
+
+    def _rollback(self):
+        """Discard the current mutation."""
+        self.session.rollback()
+
+    def _live_entry(self, key: str) -> Optional[KeyValue]:
+        """Return the entry for a key as currently stored, or None if it is missing or expired."""
+        entry = self.session.query(KeyValue).filter(KeyValue.key == key).populate_existing().first()
+        if entry is not None and _is_expired(entry):
+            expiry_stats.record_expired_read()
+            return None
+        return entry
+
+    def _remove(self, entry: KeyValue, action: str):
+        """Delete an entry with its revisions and index entries, in the current transaction."""
+        self.session.query(KeyValueRevision).filter(KeyValueRevision.key_value_id == entry.id).delete()
+        search_index.remove_entry(self.session, entry.id)
+        json_index.remove(self.session, entry.id)
+        self.session.delete(entry)
+        self._record_event(entry.key, action)
+
+    def insert(self, key: str, value: dict, ttl: Optional[float] = None):
+        """
+        Insert a new key-value pair. With `ttl` (seconds), the key expires after that time.
+        """
         try:
-            entry = KeyValue(key=key, value=value)
+            # An expired key that has not been swept yet is replaced
+            stale = self.session.query(KeyValue).filter(KeyValue.key == key).first()
+            if stale is not None and _is_expired(stale):
+                self._remove(stale, "expire")
+                self.session.flush()
+
+            entry = KeyValue(key=key, value=value, expires_at=_expires_at(ttl))
             self.session.add(entry)
-            self.session.commit()
-            return {"status": "success", "message": f"Key '{key}' inserted successfully."}
+            self.session.flush()
+            search_index.index_entry(self.session, entry.id, key, value)
+            json_index.index_value(self.session, entry.id, value)
+            self._record_event(key, "insert")
+            self._commit()
+            return {"status": "success", "message": f"Key '{key}' inserted successfully.", "version": 1}
         except IntegrityError:
-            self.session.rollback()
+            self._rollback()
             return {"status": "error", "message": f"Key '{key}' already exists."}
 
-    def update(self, key: str, value: dict):
-        """Update an existing key-value pair and track revisions."""
-        entry = self.session.query(KeyValue).filter(KeyValue.key == key).first()
+    def _conflict(self, key: str, expected_version: int):
+        entry = self._live_entry(key)
         if not entry:
             return {"status": "error", "message": f"Key '{key}' does not exist."}
+        return {
+            "status": "conflict",
+            "message": f"Key '{key}' is at version {entry.version}, not {expected_version}.",
+            "version": entry.version,
+        }
 
-        # Create a new revision
-        revision_number = (
-            self.session.query(KeyValueRevision)
-            .filter(KeyValueRevision.key_value_id == entry.id)
-            .count() + 1
-        )
-        revision = KeyValueRevision(
-            key_value_id=entry.id, revision_number=revision_number, value=entry.value
-        )
-        self.session.add(revision)
+    def update(self, key: str, value: dict, ttl: Optional[float] = None, expected_version: Optional[int] = None):
+        """
+        Update an existing key-value pair and track revisions.
+        With `ttl` (seconds) the expiry is reset to that time from now, otherwise it is kept.
 
-        # Update the current value
-        entry.value = value
-        self.session.commit()
-        return {"status": "success", "message": f"Key '{key}' updated successfully."}
+        The row is written with a single `UPDATE ... WHERE version = :read_version`.
+        With `expected_version` the update fails with a "conflict" status unless the key
+        is at that version; without it, a concurrent update is retried on the new value.
+        """
+        while True:
+            entry = self._live_entry(key)
+            if not entry:
+                return {"status": "error", "message": f"Key '{key}' does not exist."}
+            if expected_version is not None and entry.version != expected_version:
+                return self._conflict(key, expected_version)
+
+            # Keep the superseded value as a revision numbered by its version
+            revision = KeyValueRevision(key_value_id=entry.id, revision_number=entry.version, value=entry.value)
+            self.session.add(revision)
+
+            # Update the current value
+            entry.value = value
+            entry.updated_at = func.now()
+            if ttl is not None:
+                entry.expires_at = _expires_at(ttl)
+            try:
+                self.session.flush()
+            except StaleDataError:
+                self._rollback()
+                if expected_version is not None:
+                    return self._conflict(key, expected_version)
+                continue
+            break
+
+        version = entry.version
+        search_index.index_entry(self.session, entry.id, key, value)
+        json_index.index_value(self.session, entry.id, value)
+        self._record_event(key, "update")
+        self._commit()
+        return {"status": "success", "message": f"Key '{key}' updated successfully.", "version": version}
 
     def get(self, key: str):
-        """Retrieve the value for a given key."""
-        entry = self.session.query(KeyValue).filter(KeyValue.key == key).first()
+        """Retrieve the value for a given key. Concurrent identical calls are coalesced."""
+        return self._coalesced("get", key, lambda: self._get(key))
+
+    def _get(self, key: str):
+        entry = self._live_entry(key)
         if not entry:
             return {"status": "error", "message": f"Key '{key}' does not exist."}
-        return {"status": "success", "message": f"Key {entry.key} Value: {entry.value}","data": {"key": entry.key, "value": entry.value}}
+        data = {"key": entry.key, "value": entry.value, "version": entry.version}
+        if entry.expires_at is not None:
+            data["expires_at"] = entry.expires_at.isoformat()
+        return {
+            "status": "success",
+            "message": f"Key '{key}' retrieved successfully.",
+            "data": data,
+            "etag": make_etag(entry.id, entry.version),
+        }
+
+    def etag(self, key: str) -> Optional[str]:
+        """
+        Return the ETag of a key's current value without loading the value,
+        or None if the key is missing or expired.
+        """
+        return self._coalesced("etag", key, lambda: self._etag(key))
+
+    def _etag(self, key: str) -> Optional[str]:
+        row = self.session.execute(
+            select(KeyValue.id, KeyValue.version).where(KeyValue.key == key, live_filter())
+        ).first()
+        return make_etag(row.id, row.version) if row else None
 
     def get_revisions(self, key: str):
-        """Retrieve all revisions for a given key."""
-        entry = self.session.query(KeyValue).filter(KeyValue.key == key).first()
+        """Retrieve all revisions for a given key. Concurrent identical calls are coalesced."""
+        return self._coalesced("get_revisions", key, lambda: self._get_revisions(key))
+
+    def _get_revisions(self, key: str):
+        entry = self._live_entry(key)
         if not entry:
             return {"status": "error", "message": f"Key '{key}' does not exist."}
 
@@ -66,24 +243,137 @@ class KVStore:
             ],
         }
 
-    def delete(self, key: str):
-        """Delete a key-value pair."""
-        entry = self.session.query(KeyValue).filter(KeyValue.key == key).first()
-        if not entry:
-            return {"status": "error", "message": f"Key '{key}' does not exist."}
-        
-        # Delete associated revisions
-        self.session.query(KeyValueRevision).filter(KeyValueRevision.key_value_id == entry.id).delete()
+    def delete(self, key: str, expected_version: Optional[int] = None):
+        """
+        Delete a key-value pair. With `expected_version`, only if the key is at that version.
+        """
+        while True:
+            entry = self._live_entry(key)
+            if not entry:
+                return {"status": "error", "message": f"Key '{key}' does not exist."}
+            if expected_version is not None and entry.version != expected_version:
+                return self._conflict(key, expected_version)
 
-        # Delete the main entry
-        self.session.delete(entry)
-        self.session.commit()
+            # Delete the main entry with its revisions, search and secondary index entries
+            self._remove(entry, "delete")
+            try:
+                self.session.flush()
+            except StaleDataError:
+                self._rollback()
+                if expected_version is not None:
+                    return self._conflict(key, expected_version)
+                continue
+            break
+        self._commit()
         return {"status": "success", "message": f"Key '{key}' deleted successfully."}
 
     def get_all_key_values(self):
         """Retrieve all key-value pairs."""
-        entries = self.session.query(KeyValue).all()
+        entries = self.session.query(KeyValue).filter(live_filter()).all()
         return {
             "status": "success",
             "data": [{"key": entry.key, "value": entry.value} for entry in entries],
-        }
\ No newline at end of file
+        }
+
+    def search(self, query: str, prefix: bool = True, limit: int = 20, offset: int = 0):
+        """Full-text search over keys and values, best matches first."""
+        if not search_index.search_available(self.session):
+            return {"status": "error", "message": "Full-text search is not available for this database."}
+
+        found = search_index.search(self.session, query, prefix=prefix, limit=limit, offset=offset)
+        ids = [result["id"] for result in found["results"]]
+        entries = {entry.id: entry for entry in self.session.query(KeyValue).filter(KeyValue.id.in_(ids), live_filter())}
+        return {
+            "status": "success",
+            "data": [
+                {
+                    "key": entries[result["id"]].key,
+                    "value": entries[result["id"]].value,
+                    "rank": result["rank"],
+                    "snippet": result["snippet"],
+                }
+                for result in found["results"]
+                if result["id"] in entries
+            ],
+            "has_more": found["has_more"],
+        }
+
+    def create_index(self, path: str):
+        """Declare a secondary index on a JSON path inside values and backfill it."""
+        try:
+            indexed = json_index.create_index(self.session, path)
+            self.session.commit()
+        except ValueError as e:
+            self.session.rollback()
+            return {"status": "error", "message": str(e)}
+        except IntegrityError:
+            self.session.rollback()
+            return {"status": "error", "message": f"Path '{path}' is already indexed."}
+        return {"status": "success", "message": f"Index on '{path}' created ({indexed} keys indexed)."}
+
+    def drop_index(self, path: str):
+        """Drop a secondary index on a JSON path."""
+        try:
+            dropped = json_index.drop_index(self.session, path)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        if not dropped:
+            return {"status": "error", "message": f"Path '{path}' is not indexed."}
+        self.session.commit()
+        return {"status": "success", "message": f"Index on '{path}' dropped."}
+
+    def list_indexes(self):
+        """List the JSON paths with a secondary index."""
+        return {"status": "success", "data": [path for _, path in json_index.declared_indexes(self.session)]}
+
+    def query(self, predicates: list, limit: int = 100, offset: int = 0):
+        """Find key-value pairs by equality/range predicates on indexed JSON paths."""
+        try:
+            entries, has_more = json_index.query(
+                self.session, predicates, limit=limit, offset=offset, filters=[live_filter()]
+            )
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        return {
+            "status": "success",
+            "data": [{"key": entry.key, "value": entry.value} for entry in entries],
+            "has_more": has_more,
+        }
+
+    def sweep_expired(self, batch_size: int = 500) -> int:
+        """
+        Delete up to `batch_size` expired keys in one short transaction, oldest expiry first.
+        The expired keys are found through the index on expires_at, never by scanning.
+
+        :return: The number of keys deleted.
+        """
+        expired = (
+            select(KeyValue.id)
+            .where(KeyValue.expires_at <= datetime.utcnow())
+            .order_by(KeyValue.expires_at)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        # Select and delete in one statement, so keys renewed meanwhile are never deleted
+        rows = self.session.execute(
+            delete(KeyValue)
+            .where(KeyValue.id.in_(expired))
+            .returning(KeyValue.id, KeyValue.key)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not rows:
+            self.session.rollback()
+            return 0
+
+        ids = [row.id for row in rows]
+        self.session.execute(
+            delete(KeyValueRevision).where(KeyValueRevision.key_value_id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        self.session.execute(
+            delete(KeyValueIndexEntry).where(KeyValueIndexEntry.key_value_id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        for row in rows:
+            search_index.remove_entry(self.session, row.id)
+            self._record_event(row.key, "expire")
+        self._commit()
+        return len(rows)
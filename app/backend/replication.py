@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from .bulk import export_records, insert_records, records_for_keys
+from .db_setup import KeyValue, KeyValueEvent, KeyValueIndexEntry, KeyValueRevision
+from .kv_store import invalidate_reads
+from . import json_index, search_index
+
+
+class LogTruncated(Exception):
+    """The events a follower still needs have been pruned from the primary's log."""
+
+
+class LocalPrimarySource:
+    """
+    Reads the primary's snapshot, mutation log and current records straight from
+    its database (a file on the same host). This stands in for a network transport:
+    a remote source only has to provide the same four methods.
+    """
+
+    def __init__(self, engine):
+        """
+        :param engine: Engine of the primary's KV store.
+        """
+        self.engine = engine
+
+    def head(self) -> int:
+        """Return the id of the newest event ever appended to the primary's log."""
+        with self.engine.connect() as connection:
+            return self._head(connection)
+
+    def _head(self, connection) -> int:
+        if self.engine.dialect.name == "sqlite":
+            # sqlite_sequence still knows the last id when every event has been pruned
+            head = connection.exec_driver_sql(
+                "SELECT seq FROM sqlite_sequence WHERE name = ?", (KeyValueEvent.__tablename__,)
+            ).scalar()
+        else:
+            head = connection.execute(select(func.max(KeyValueEvent.id))).scalar()
+        return head or 0
+
+    def changes(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Return up to `limit` events appended after event `after`, oldest first.
+
+        :raises LogTruncated: If some of those events have already been pruned.
+        """
+        query = (
+            select(KeyValueEvent.id, KeyValueEvent.key, KeyValueEvent.action, KeyValueEvent.origin)
+            .where(KeyValueEvent.id > after)
+            .order_by(KeyValueEvent.id)
+            .limit(limit)
+        )
+        with self.engine.connect() as connection:
+            rows = connection.execute(query).all()
+            if not rows and self._head(connection) > after:
+                # Either events were pruned or one was committed since the query; the
+                # head was read after that commit, so a second query settles it
+                rows = connection.execute(query).all()
+                if not rows:
+                    raise LogTruncated(f"Events after {after} are no longer in the primary's log.")
+        # Event ids are never reused, so a hole right after `after` means pruned events
+        if rows and rows[0].id > after + 1:
+            raise LogTruncated(f"Events after {after} are no longer in the primary's log.")
+        return [{"id": row.id, "key": row.key, "action": row.action, "origin": row.origin} for row in rows]
+
+    def records(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the current export records of the given keys; deleted or expired keys are left out."""
+        with self.engine.connect() as connection:
+            return records_for_keys(connection, keys)
+
+    def snapshot(self) -> Iterator[Dict[str, Any]]:
+        """Yield an export record for every live key."""
+        records = export_records(self.engine)
+        next(records)  # header
+        yield from records
+
+
+class Follower:
+    """
+    Keeps a local copy of a primary KV store for serving reads.
+
+    The copy is bootstrapped from a snapshot, then kept current by tailing the
+    primary's sequenced mutation log: for each batch of events the follower
+    re-reads the current state of the keys they touched and replaces its local
+    rows (with their revision history) in one transaction. Applying a key's
+    state instead of replaying the operation makes every step idempotent, so
+    events seen twice (e.g. after a snapshot taken while writes were running)
+    are harmless. The replaced rows' search and JSON path index entries are
+    rewritten in the same transaction, and the applied events are appended to
+    the local log, so this process's caches and WebSocket subscribers follow along.
+
+    If the follower falls behind the primary's event retention, or the primary
+    runs a bulk import (which is logged as a single event), it bootstraps again.
+    The new snapshot replaces the copy atomically; until then the old copy is
+    served for as long as its lag allows.
+    """
+
+    def __init__(self, source, engine, batch_size: int = 500, max_lag: float = 5.0):
+        """
+        :param source: Where the primary's data comes from, e.g. a LocalPrimarySource.
+        :param engine: Engine of the local copy.
+        :param batch_size: Maximum number of events applied per poll.
+        :param max_lag: Replication lag in seconds beyond which the copy should not serve reads.
+        """
+        self.source = source
+        self.engine = engine
+        self.batch_size = batch_size
+        self.max_lag = max_lag
+        self.position = 0
+        self.caught_up_at: Optional[float] = None
+        self.bootstraps = 0
+        self.applied = 0
+        self._lock = threading.Lock()
+
+    def bootstrap(self):
+        """Replace the local copy with a snapshot of the primary."""
+        with self._lock:
+            self._bootstrap()
+
+    def _bootstrap(self):
+        started = time.monotonic()
+        # Events appended while the snapshot is read are applied again by the next poll
+        position = self.source.head()
+        # The copy is replaced in a single transaction, so reads keep seeing the previous
+        # copy until the new one is complete. That copy still matches the primary as of
+        # caught_up_at, so the lag check keeps deciding whether it may be served.
+        with self.engine.begin() as connection:
+            connection.execute(delete(KeyValueIndexEntry))
+            connection.execute(delete(KeyValueRevision))
+            connection.execute(delete(KeyValue))
+            batch: List[Dict[str, Any]] = []
+            for record in self.source.snapshot():
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    insert_records(connection, batch)
+                    batch = []
+            if batch:
+                insert_records(connection, batch)
+            with Session(bind=connection) as session:
+                json_index.rebuild(session)
+                session.flush()
+            connection.execute(insert(KeyValueEvent), [{"key": "*", "action": "import", "origin": str(os.getpid())}])
+        with Session(bind=self.engine) as session:
+            rebuild_search = search_index.search_available(session)
+        if rebuild_search:
+            search_index.rebuild(self.engine)
+        invalidate_reads(self.engine)
+        self.position = position
+        self.caught_up_at = started
+        self.bootstraps += 1
+
+    def poll(self) -> int:
+        """
+        Apply the next batch of the primary's events.
+
+        :return: The number of events applied.
+        """
+        with self._lock:
+            started = time.monotonic()
+            try:
+                events = self.source.changes(self.position, self.batch_size)
+            except LogTruncated:
+                self._bootstrap()
+                return 0
+            if any(event["action"] == "import" for event in events):
+                self._bootstrap()
+                return 0
+            if events:
+                self._apply(events)
+                self.position = events[-1]["id"]
+                self.applied += len(events)
+            if len(events) < self.batch_size:
+                # Everything the primary had committed when this poll started is applied
+                self.caught_up_at = started
+            return len(events)
+
+    def _apply(self, events: List[Dict[str, Any]]):
+        keys = list(dict.fromkeys(event["key"] for event in events))
+        records = self.source.records(keys)
+        with Session(bind=self.engine) as session, session.begin():
+            connection = session.connection()
+            ids = connection.execute(select(KeyValue.id).where(KeyValue.key.in_(keys))).scalars().all()
+            if ids:
+                connection.execute(delete(KeyValueIndexEntry).where(KeyValueIndexEntry.key_value_id.in_(ids)))
+                connection.execute(delete(KeyValueRevision).where(KeyValueRevision.key_value_id.in_(ids)))
+                connection.execute(delete(KeyValue).where(KeyValue.id.in_(ids)))
+                # Row ids can be reused, so a stale search entry could later match another key
+                for key_value_id in ids:
+                    search_index.remove_entry(session, key_value_id)
+            if records:
+                insert_records(connection, list(records.values()))
+                for row in connection.execute(
+                    select(KeyValue.id, KeyValue.key, KeyValue.value).where(KeyValue.key.in_(list(records)))
+                ):
+                    search_index.index_entry(session, row.id, row.key, row.value)
+                    json_index.index_value(session, row.id, row.value)
+            connection.execute(insert(KeyValueEvent), [
+                {"key": event["key"], "action": event["action"], "origin": event["origin"]} for event in events
+            ])
+        invalidate_reads(self.engine)
+
+    def lag(self) -> float:
+        """
+        Seconds since the local copy was last known to match the primary; reads
+        reflect every write the primary committed at least this long ago.
+        Infinite before the first bootstrap.
+        """
+        if self.caught_up_at is None:
+            return float("inf")
+        return time.monotonic() - self.caught_up_at
+
+    def stats(self) -> Dict[str, Any]:
+        lag = self.lag()
+        return {
+            "position": self.position,
+            "lag_seconds": round(lag, 3) if lag != float("inf") else None,
+            "max_lag_seconds": self.max_lag,
+            "applied": self.applied,
+            "bootstraps": self.bootstraps,
+        }
@@ -0,0 +1,179 @@
+import json
+from typing import Any, Dict, Iterator, List
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+from .db_setup import KeyValue
+
+SEARCH_TABLE = "key_value_search"
+
+# Rows share their rowid with key_value_store.id so entries can be replaced and deleted directly
+CREATE_SEARCH_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+    "USING fts5(key, content, tokenize='unicode61')"
+)
+
+# Matches in the key weigh more than matches in the value
+_RANK = f"bm25({SEARCH_TABLE}, 10.0, 1.0)"
+
+_available = {}
+
+
+def create_search_table(connection) -> bool:
+    """
+    Create the FTS5 table if SQLite supports it.
+
+    :param connection: A SQLAlchemy connection.
+    :return: True if the search table exists afterwards.
+    """
+    if connection.dialect.name != "sqlite":
+        return False
+    try:
+        connection.exec_driver_sql(CREATE_SEARCH_TABLE)
+    except OperationalError:
+        # SQLite built without FTS5: search is unavailable, everything else works
+        return False
+    _available[connection.engine] = True
+    return True
+
+
+def search_available(session) -> bool:
+    """
+    Return True if the database behind the session has the search table (cached per engine).
+    """
+    bind = session.get_bind()
+    if bind not in _available:
+        if bind.dialect.name != "sqlite":
+            _available[bind] = False
+        else:
+            _available[bind] = session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": SEARCH_TABLE},
+            ).first() is not None
+    return _available[bind]
+
+
+def flatten_value(value: Any) -> str:
+    """
+    Flatten a JSON value into searchable text: object keys and scalar values, space separated.
+
+    :param value: The stored JSON value.
+    :return: The text to index.
+    """
+    return " ".join(_flatten(value))
+
+
+def _flatten(value: Any) -> Iterator[str]:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield str(key)
+            yield from _flatten(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _flatten(item)
+    elif value is not None:
+        yield value if isinstance(value, str) else json.dumps(value)
+
+
+def index_entry(session, entry_id: int, key: str, value: Any):
+    """
+    Add or replace the search entry for a key in the session's transaction.
+    """
+    if not search_available(session):
+        return
+    session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": entry_id})
+    session.execute(
+        text(f"INSERT INTO {SEARCH_TABLE} (rowid, key, content) VALUES (:id, :key, :content)"),
+        {"id": entry_id, "key": key, "content": flatten_value(value)},
+    )
+
+
+def remove_entry(session, entry_id: int):
+    """
+    Remove the search entry for a key in the session's transaction.
+    """
+    if search_available(session):
+        session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": entry_id})
+
+
+def build_match_query(query: str, prefix: bool = True) -> str:
+    """
+    Turn free text into an FTS5 MATCH expression.
+
+    Every whitespace-separated term is quoted (so hostnames and dotted keys are
+    matched as token phrases rather than parsed as FTS5 syntax) and all terms must
+    match. With `prefix`, each term also matches tokens that start with it.
+
+    :param query: The user's search text.
+    :param prefix: If True, match term prefixes.
+    :return: The MATCH expression, or an empty string if the query has no terms.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' + ("*" if prefix else "") for term in query.split()]
+    return " ".join(terms)
+
+
+def search(session, query: str, prefix: bool = True, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+    """
+    Rank keys whose name or value matches the query.
+
+    :param session: A database session.
+    :param query: The search text.
+    :param prefix: If True, match term prefixes.
+    :param limit: Maximum number of results.
+    :param offset: Number of results to skip (for pagination).
+    :return: The matching rows (best first) and whether more results exist.
+    """
+    match = build_match_query(query, prefix)
+    if not match:
+        return {"results": [], "has_more": False}
+    rows = session.execute(
+        text(
+            f"SELECT {SEARCH_TABLE}.rowid AS id, {_RANK} AS rank, "
+            f"snippet({SEARCH_TABLE}, 1, '[', ']', '...', 12) AS snippet "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match "
+            "ORDER BY rank LIMIT :limit OFFSET :offset"
+        ),
+        {"match": match, "limit": limit + 1, "offset": offset},
+    ).all()
+    return {
+        "results": [{"id": row.id, "rank": row.rank, "snippet": row.snippet} for row in rows[:limit]],
+        "has_more": len(rows) > limit,
+    }
+
+
+def rebuild(engine, batch_size: int = 5000) -> int:
+    """
+    Recreate the search index from key_value_store, e.g. for databases created
+    before search existed.
+
+    :param engine: The KV store engine.
+    :param batch_size: Number of rows indexed per statement batch.
+    :return: The number of keys indexed.
+    """
+    indexed = 0
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+        _available.pop(engine, None)
+        if not create_search_table(connection):
+            raise RuntimeError("This SQLite build does not support FTS5.")
+
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(KeyValue.id, KeyValue.key, KeyValue.value)
+                .where(KeyValue.id > last_id)
+                .order_by(KeyValue.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            batch: List[Dict[str, Any]] = [
+                {"id": row.id, "key": row.key, "content": flatten_value(row.value)} for row in rows
+            ]
+            connection.execute(
+                text(f"INSERT INTO {SEARCH_TABLE} (rowid, key, content) VALUES (:id, :key, :content)"),
+                batch,
+            )
+            indexed += len(batch)
+            last_id = rows[-1].id
+    return indexed
+
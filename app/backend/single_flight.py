@@ -0,0 +1,77 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """
+    An in-flight call whose result is shared with every caller that joined it.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight,
+    further callers with the same key wait for it and receive its result (or
+    exception) instead of running their own.
+
+    Only idempotent reads should go through a SingleFlight. Results are shared,
+    not copied, so callers must treat them as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Run `fn` unless an identical call is already in flight, in which case wait for it.
+
+        :param key: Identifies identical calls.
+        :param fn: The call to run if this caller is the first for the key.
+        :return: The result of the (possibly shared) call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return how many calls ran and how many were served by joining an in-flight call.
+        """
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesced_rate": self.coalesced / total if total else 0.0,
+            }
@@ -0,0 +1,167 @@
+import json
+import os
+import zlib
+from typing import Any, Dict, Optional
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.types import Text, TypeDecorator
+
+try:
+    import msgpack
+except ImportError:  # optional: values are serialized as JSON instead
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional: only zlib is available
+    zstandard = None
+
+# Encoded values start with MAGIC, a codec byte and a serializer byte. Plain JSON text never
+# starts with MAGIC, so rows written before compression existed keep decoding as JSON.
+MAGIC = b"KV\x00"
+CODECS = {"zlib": 1, "zstd": 2}
+SERIALIZERS = {"json": 1, "msgpack": 2}
+
+
+class CodecSettings:
+    """
+    How values are stored. Values whose serialized form is at least `threshold` bytes
+    are compressed with `codec`; a threshold of 0 disables compression.
+    """
+
+    def __init__(self, threshold: int = 0, codec: str = "zlib", level: Optional[int] = None):
+        self.configure(threshold, codec, level)
+
+    def configure(self, threshold: int = 0, codec: str = "zlib", level: Optional[int] = None):
+        """
+        :param threshold: Minimum serialized size in bytes for a value to be compressed (0 disables compression).
+        :param codec: "zlib" or "zstd" (requires the zstandard package).
+        :param level: Compression level; the codec's default if omitted.
+        :raises ValueError: If the codec is unknown or not installed.
+        """
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec '{codec}'.")
+        if codec == "zstd" and zstandard is None:
+            raise ValueError("The zstd codec requires the zstandard package.")
+        self.threshold = threshold
+        self.codec = codec
+        self.level = level
+        self.serializer = "msgpack" if msgpack is not None else "json"
+
+
+settings = CodecSettings(
+    threshold=int(os.environ.get("KV_COMPRESS_THRESHOLD", "0")),
+    codec=os.environ.get("KV_COMPRESS_CODEC", "zlib"),
+)
+
+
+def _dumps_json(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+def encode(value: Any) -> Any:
+    """
+    Encode a value for storage: JSON text, or MAGIC-prefixed compressed bytes if it is large.
+    """
+    text = _dumps_json(value)
+    if not settings.threshold or len(text) < settings.threshold:
+        return text
+
+    if settings.serializer == "msgpack":
+        payload = msgpack.packb(value, use_bin_type=True)
+    else:
+        payload = text.encode()
+    if settings.codec == "zstd":
+        compressed = zstandard.ZstdCompressor(level=settings.level or 3).compress(payload)
+    else:
+        compressed = zlib.compress(payload, settings.level if settings.level is not None else 6)
+    return MAGIC + bytes([CODECS[settings.codec], SERIALIZERS[settings.serializer]]) + compressed
+
+
+def decode(stored: Any) -> Any:
+    """
+    Decode a stored value: JSON text (written with or without compression enabled) or encoded bytes.
+    """
+    if isinstance(stored, memoryview):
+        stored = stored.tobytes()
+    if isinstance(stored, bytes) and stored.startswith(MAGIC):
+        codec, serializer = stored[len(MAGIC)], stored[len(MAGIC) + 1]
+        payload = stored[len(MAGIC) + 2:]
+        if codec == CODECS["zstd"]:
+            if zstandard is None:
+                raise ValueError("Value is compressed with zstd, but the zstandard package is not installed.")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            payload = zlib.decompress(payload)
+        if serializer == SERIALIZERS["msgpack"]:
+            if msgpack is None:
+                raise ValueError("Value is encoded with msgpack, but the msgpack package is not installed.")
+            return msgpack.unpackb(payload, raw=False)
+        return json.loads(payload)
+    if isinstance(stored, (int, float)):
+        # Columns created as JSON have numeric affinity, so SQLite stores "3" as the number 3
+        return stored
+    return json.loads(stored)
+
+
+class EncodedJSON(TypeDecorator):
+    """
+    A JSON column that transparently compresses large values (see `settings`).
+
+    Small values are stored as JSON text, exactly like the plain JSON type, so
+    existing databases keep working and can be recompressed in place.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode(value)
+
+
+def recompress(engine, batch_size: int = 1000) -> Dict[str, Dict[str, int]]:
+    """
+    Re-encode every stored value and revision with the current settings, e.g. after
+    enabling compression (or to decompress everything with a threshold of 0).
+
+    :param engine: The KV store engine.
+    :param batch_size: Number of rows rewritten per transaction.
+    :return: Per table, the number of rows and the stored bytes before and after.
+    """
+    from .db_setup import KeyValue, KeyValueRevision
+
+    report = {}
+    for model in (KeyValue, KeyValueRevision):
+        table = model.__table__
+        with engine.connect() as connection:
+            before = _stored_bytes(connection, table)
+        rows = 0
+        last_id = 0
+        while True:
+            with engine.begin() as connection:
+                batch = connection.execute(
+                    select(table.c.id, table.c.value).where(table.c.id > last_id).order_by(table.c.id).limit(batch_size)
+                ).all()
+                if not batch:
+                    break
+                connection.execute(
+                    update(table).where(table.c.id == bindparam("row_id")).values(value=bindparam("new_value", type_=EncodedJSON())),
+                    [{"row_id": row.id, "new_value": row.value} for row in batch],
+                )
+            rows += len(batch)
+            last_id = batch[-1].id
+        with engine.connect() as connection:
+            after = _stored_bytes(connection, table)
+        report[table.name] = {"rows": rows, "bytes_before": before, "bytes_after": after}
+    return report
+
+
+def _stored_bytes(connection, table) -> int:
+    # length() of a BLOB is its size in bytes; cast text to a BLOB to count bytes too
+    return connection.exec_driver_sql(
+        f"SELECT COALESCE(SUM(LENGTH(CAST(value AS BLOB))), 0) FROM {table.name}"
+    ).scalar()
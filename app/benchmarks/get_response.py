@@ -0,0 +1,63 @@
+"""
+Measure /kv/get response size and latency for a large value.
+
+Usage (from the repository root):
+
+    python -m app.benchmarks.get_response [--services 800] [--requests 300]
+
+Runs the API in-process against a scratch database holding one config document
+with `--services` entries, then reports bytes and p50 latency per request for the
+full response, the lean response and a conditional GET answered with 304.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", type=int, default=800)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The API opens kv_store.db in the working directory
+        os.chdir(workdir)
+        from fastapi.testclient import TestClient
+        from ..api.dependencies import get_kv_store
+        from ..api.main import app
+
+        value = {
+            "services": [
+                {"name": f"svc-{i}", "host": f"node-{i}.eu.example.com", "port": 8080 + i % 7, "tags": ["a", "b"]}
+                for i in range(args.services)
+            ]
+        }
+        with TestClient(app) as client:
+            store = next(get_kv_store())
+            store.insert("bench.big", value)
+            etag = client.get("/kv/get", params={"key": "bench.big"}).headers["ETag"]
+
+            cases = [
+                ("full", {"key": "bench.big"}, {}),
+                ("lean", {"key": "bench.big", "lean": True}, {}),
+                ("if-none-match", {"key": "bench.big"}, {"If-None-Match": etag}),
+            ]
+            for label, params, headers in cases:
+                timings = []
+                for _ in range(args.requests):
+                    start = time.perf_counter()
+                    response = client.get("/kv/get", params=params, headers=headers)
+                    timings.append((time.perf_counter() - start) * 1000)
+                print(
+                    f"{label:>14}: HTTP {response.status_code}  {len(response.content):7d} bytes"
+                    f"  p50 {statistics.median(timings):6.2f} ms"
+                )
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Measure how fast the key index finds candidate keys for a prompt and suggests
+keys for misspelled ones, and how much smaller the prompt context is than a full key list.
+
+Usage (from the repository root):
+
+    python -m app.benchmarks.key_resolution [--keys 100000] [--repeat 200]
+
+Indexes `--keys` synthetic keys in memory (no database needed), then times
+KeyIndex.candidates for typical /llm/control-kv prompts and KeyIndex.nearest
+for near-miss key names.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from ..backend.key_index import KeyIndex
+
+REGIONS = ["eu", "us", "ap", "sa", "af"]
+SERVICES = ["payments", "checkout", "ledger", "search", "auth", "billing", "inventory", "shipping"]
+SETTINGS = ["timeout", "replicas", "max_connections", "feature_flag", "log_level", "owner"]
+
+PROMPTS = [
+    "set the checkout eu instance 1234 timeout to 30 seconds",
+    "delete the billing ap owner for instance 77",
+    "update payments us instance 4242 log level to debug and replicas to 3",
+    "what is the inventory sa max connections for instance 9001",
+]
+NEAR_MISSES = ["checkout.eu.instance1234.timeouts", "billing_ap_instance77_owner", "payment.us.instance4242.log_level"]
+
+
+def time_call(label: str, repeat: int, call):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+    print(f"{label:>52}: p50 {statistics.median(timings):8.1f} us  p95 {p95:8.1f} us  -> {result}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    keys = [
+        f"{rng.choice(SERVICES)}.{rng.choice(REGIONS)}.instance{i}.{rng.choice(SETTINGS)}"
+        for i in range(args.keys)
+    ]
+    # Make sure the keys the prompts talk about exist
+    keys += [
+        "checkout.eu.instance1234.timeout",
+        "billing.ap.instance77.owner",
+        "payments.us.instance4242.log_level",
+        "payments.us.instance4242.replicas",
+        "inventory.sa.instance9001.max_connections",
+    ]
+
+    key_index = KeyIndex()
+    start = time.perf_counter()
+    for key in keys:
+        key_index.add(key)
+    print(f"indexed {len(key_index)} keys in {time.perf_counter() - start:.1f} s")
+
+    for prompt in PROMPTS:
+        candidates = key_index.candidates(prompt, k=args.k)
+        time_call(f"candidates({prompt[:40]!r})", args.repeat, lambda: len(key_index.candidates(prompt, k=args.k)))
+    print(
+        f"context size: {len(', '.join(candidates))} bytes for {len(candidates)} candidates "
+        f"vs {len(', '.join(keys))} bytes for the full key list"
+    )
+    for key in NEAR_MISSES:
+        time_call(f"nearest({key!r})", args.repeat, lambda: key_index.nearest(key))
+
+
+if __name__ == "__main__":
+    main()
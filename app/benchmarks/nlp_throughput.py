@@ -0,0 +1,84 @@
+"""
+Compare single-text and batched NLPProcessor parsing throughput.
+
+Usage (from the repository root, requires spaCy and en_core_web_sm):
+
+    python -m app.benchmarks.nlp_throughput [--commands 3000] [--batch-sizes 64 256 1024] [--processes 1 2]
+
+The model is loaded (and warmed up) before timing, so the numbers reflect parsing
+only. The single-text baseline runs a full pipeline (including the parser) per call,
+as extract_action_key_value did before batching was added.
+"""
+import argparse
+import random
+import time
+
+from ..llm.nlp_processor import NLPProcessor
+
+_TEMPLATES = [
+    "Insert key {key} with value {value}",
+    "Update the field {key} to value {value}",
+    "Please delete key {key}",
+    "Set identifier {key} with data {value} for Acme Corp",
+    "Change the entry for key {key} to {value}",
+]
+
+
+def make_commands(count: int, seed: int = 7):
+    """
+    Generate synthetic KV commands.
+    """
+    rng = random.Random(seed)
+    return [
+        rng.choice(_TEMPLATES).format(key=f"service{rng.randint(1, 500)}.timeout", value=rng.randint(1, 10_000))
+        for _ in range(count)
+    ]
+
+
+def time_call(label: str, count: int, fn):
+    start = time.perf_counter()
+    results = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>36}: {elapsed:7.2f} s  {count / elapsed:9.0f} commands/s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commands", type=int, default=3000)
+    parser.add_argument("--model", default="en_core_web_sm")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[64, 256, 1024])
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2])
+    args = parser.parse_args()
+
+    import spacy
+
+    commands = make_commands(args.commands)
+    processor = NLPProcessor(model=args.model)
+    processor.extract_many(commands[:10])
+    full_pipeline = spacy.load(args.model)
+    full_pipeline(commands[0])
+
+    def single_full_pipeline():
+        return [processor._extract_from_doc(full_pipeline(text)) for text in commands]
+
+    baseline = time_call("single, full pipeline", len(commands), single_full_pipeline)
+    time_call(
+        "single, unused components disabled",
+        len(commands),
+        lambda: [processor.extract_action_key_value(text) for text in commands],
+    )
+    for n_process in args.processes:
+        for batch_size in args.batch_sizes:
+            results = time_call(
+                f"batched, batch={batch_size}, procs={n_process}",
+                len(commands),
+                lambda: processor.extract_many(commands, batch_size=batch_size, n_process=n_process),
+            )
+            mismatches = sum(a != b for a, b in zip(baseline, results))
+            if mismatches:
+                print(f"{'':>36}  warning: {mismatches} results differ from the baseline")
+
+
+if __name__ == "__main__":
+    main()
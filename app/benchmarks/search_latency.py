@@ -0,0 +1,91 @@
+"""
+Measure /kv/search latency on a large store.
+
+Usage (from the repository root):
+
+    python -m app.benchmarks.search_latency [--keys 1000000] [--db /tmp/search_bench.db] [--repeat 50]
+
+Builds a scratch database with `--keys` synthetic config entries (hostnames,
+regions, feature flags), indexes it with the same rebuild used by
+`python -m app rebuild-search-index`, then times KVStore.search for common,
+rare, prefix and paginated queries. An existing --db is reused as is.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import insert
+
+from ..backend.db_setup import KeyValue, get_engine, get_session, init_db
+from ..backend.kv_store import KVStore
+from ..backend.search_index import rebuild
+
+REGIONS = ["eu", "us", "ap", "sa", "af"]
+SERVICES = ["payments", "checkout", "ledger", "search", "auth", "billing", "inventory", "shipping"]
+
+
+def build(engine, keys: int, batch_size: int = 50_000):
+    rng = random.Random(42)
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        for offset in range(0, keys, batch_size):
+            rows = []
+            for i in range(offset, min(keys, offset + batch_size)):
+                service, region = rng.choice(SERVICES), rng.choice(REGIONS)
+                rows.append({
+                    "key": f"{service}.{region}.instance{i}",
+                    "value": {
+                        "host": f"{service}-{i}.{region}.example.com",
+                        "region": region,
+                        "flags": {f"feature_{rng.randint(1, 2000)}": rng.random() < 0.5},
+                        "replicas": rng.randint(1, 9),
+                    },
+                })
+            connection.execute(insert(KeyValue), rows)
+    print(f"inserted {keys} keys in {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    indexed = rebuild(engine)
+    print(f"indexed {indexed} keys in {time.perf_counter() - start:.1f} s")
+
+
+def time_query(store: KVStore, label: str, repeat: int, **kwargs):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = store.search(**kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(0.95 * len(timings)))]
+    print(
+        f"{label:>34}: p50 {statistics.median(timings):7.2f} ms  p95 {p95:7.2f} ms"
+        f"  ({len(result['data'])} results, has_more={result['has_more']})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    parser.add_argument("--db", default="search_bench.db")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    exists = os.path.exists(args.db)
+    engine = get_engine(f"sqlite:///{args.db}")
+    init_db(engine)
+    if not exists:
+        build(engine, args.keys)
+
+    store = KVStore(get_session(engine))
+    time_query(store, "rare exact (instance id)", args.repeat, query="instance123", prefix=False)
+    time_query(store, "rare flag", args.repeat, query="feature_1234")
+    time_query(store, "common term, first page", args.repeat, query="payments")
+    time_query(store, "common term, page 50", args.repeat, query="payments", offset=1000)
+    time_query(store, "prefix", args.repeat, query="inven")
+    time_query(store, "two terms", args.repeat, query="checkout ap")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure API import time and first-request latency in fresh interpreters.
+
+Usage (from the repository root):
+
+    python -m app.benchmarks.startup_time [--runs 5] [--llm]
+
+Each run starts a new Python process in a scratch directory (so a throwaway
+kv_store.db is used), imports app.api.main, and times the first and second
+requests through the ASGI test client. With --llm the first and second
+/llm/control-kv calls are timed as well (requires GEMINI_API_KEY).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+_PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import app.api.main as main
+import_ms = (time.perf_counter() - start) * 1000
+heavy = sorted(m for m in ("langchain", "langchain_core", "langchain_google_genai", "langchain_openai", "spacy") if m in sys.modules)
+
+from fastapi.testclient import TestClient
+timings = {"import_ms": import_ms, "heavy_modules_after_import": heavy}
+with TestClient(main.app) as client:
+    for label in ("first", "second"):
+        start = time.perf_counter()
+        client.get("/kv/get", params={"key": "startup.probe"})
+        timings[f"{label}_kv_get_ms"] = (time.perf_counter() - start) * 1000
+    if "--llm" in sys.argv:
+        for label in ("first", "second"):
+            start = time.perf_counter()
+            client.post("/llm/control-kv", json={"prompt": "get the key startup.probe"})
+            timings[f"{label}_control_kv_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(timings))
+"""
+
+
+def run_probe(with_llm: bool) -> dict:
+    """
+    Run the probe once in a fresh interpreter and return its timings.
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    args = [sys.executable, "-c", _PROBE] + (["--llm"] if with_llm else [])
+    with tempfile.TemporaryDirectory() as workdir:
+        output = subprocess.run(args, cwd=workdir, env=env, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm", action="store_true", help="Also time /llm/control-kv")
+    args = parser.parse_args()
+
+    results = [run_probe(args.llm) for _ in range(args.runs)]
+    print(f"runs: {args.runs}")
+    print(f"modules loaded by import: {results[0]['heavy_modules_after_import'] or 'none'}")
+    for metric in results[0]:
+        if metric.endswith("_ms"):
+            values = [result[metric] for result in results]
+            print(f"{metric:>24}: median {statistics.median(values):8.1f} ms  (min {min(values):.1f}, max {max(values):.1f})")
+
+
+if __name__ == "__main__":
+    main()
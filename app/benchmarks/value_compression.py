@@ -0,0 +1,90 @@
+"""
+Measure the size and latency trade-offs of compressing large values.
+
+Usage (from the repository root):
+
+    python -m app.benchmarks.value_compression [--keys 5000] [--value-kb 8] [--threshold 1024]
+
+For plain JSON and for every available codec (zlib, plus zstd if the zstandard
+package is installed) a fresh database is filled with `--keys` config documents of
+about `--value-kb` KiB, then the database file size and the p50 latency of
+KVStore.insert and (uncoalesced) KVStore.get are reported. msgpack is used for
+serialization when installed.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from ..backend import value_codec
+from ..backend.db_setup import get_engine, get_session, init_db
+from ..backend.kv_store import KVStore
+
+
+def document(rng: random.Random, size: int):
+    services = []
+    while sum(len(str(s)) for s in services) < size:
+        services.append({
+            "name": f"service-{rng.randint(1, 500)}",
+            "host": f"node-{rng.randint(1, 9999)}.{rng.choice(['eu', 'us', 'ap'])}.example.com",
+            "port": rng.choice([80, 443, 5432, 6379, 8080]),
+            "replicas": rng.randint(1, 9),
+            "tls": rng.random() < 0.5,
+        })
+    return {"version": 1, "services": services}
+
+
+def measure(label: str, keys: int, value_size: int, workdir: str):
+    path = os.path.join(workdir, f"{label}.db")
+    engine = get_engine(f"sqlite:///{path}")
+    init_db(engine)
+    store = KVStore(get_session(engine))
+    rng = random.Random(7)
+    values = [document(rng, value_size) for _ in range(keys)]
+
+    writes = []
+    for i, value in enumerate(values):
+        start = time.perf_counter()
+        store.insert(f"doc.{i}", value)
+        writes.append((time.perf_counter() - start) * 1000)
+
+    reads = []
+    for i in rng.sample(range(keys), min(keys, 2000)):
+        start = time.perf_counter()
+        store._get(f"doc.{i}")
+        reads.append((time.perf_counter() - start) * 1000)
+
+    store.session.close()
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        stored = connection.exec_driver_sql(
+            "SELECT SUM(LENGTH(CAST(value AS BLOB))) FROM key_value_store"
+        ).scalar()
+    engine.dispose()
+    print(
+        f"{label:>6}: file {os.path.getsize(path) / 2**20:7.1f} MiB  values {stored / 2**20:7.1f} MiB  "
+        f"insert p50 {statistics.median(writes):6.2f} ms  get p50 {statistics.median(reads):6.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=5000)
+    parser.add_argument("--value-kb", type=float, default=8)
+    parser.add_argument("--threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    codecs = ["zlib"] + (["zstd"] if value_codec.zstandard is not None else [])
+    print(f"serializer for compressed values: {value_codec.settings.serializer}")
+    with tempfile.TemporaryDirectory() as workdir:
+        value_codec.settings.configure(threshold=0)
+        measure("plain", args.keys, int(args.value_kb * 1024), workdir)
+        for codec in codecs:
+            value_codec.settings.configure(threshold=args.threshold, codec=codec)
+            measure(codec, args.keys, int(args.value_kb * 1024), workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Measure /kv/get throughput as the number of API worker processes grows.
+
+Usage (from the repository root):
+
+    python -m app.benchmarks.worker_scaling [--max-workers 4] [--clients 8] [--duration 10]
+
+For each worker count the API is started with `python -m app --workers N` in a
+scratch directory seeded with a few hundred keys, then `--clients` load-generating
+processes issue keep-alive GET requests for random keys for `--duration` seconds.
+Run it on a box with at least max-workers + clients cores for meaningful numbers.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+KEY_COUNT = 500
+
+
+def seed(workdir: str):
+    """
+    Create kv_store.db in the scratch directory with KEY_COUNT keys.
+    """
+    from ..backend.db_setup import get_engine, get_session, init_db
+    from ..backend.kv_store import KVStore
+
+    engine = get_engine(f"sqlite:///{os.path.join(workdir, 'kv_store.db')}")
+    init_db(engine)
+    store = KVStore(get_session(engine))
+    for i in range(KEY_COUNT):
+        store.insert(f"bench.key.{i}", {"value": i, "region": random.choice(["eu", "us", "ap"])})
+    store.session.close()
+    engine.dispose()
+
+
+def client_loop(base_url: str, duration: float, result_queue):
+    """
+    Issue GET requests on one keep-alive connection until the deadline.
+    """
+    rng = random.Random(os.getpid())
+    done = 0
+    deadline = time.monotonic() + duration
+    with httpx.Client(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            client.get("/kv/get", params={"key": f"bench.key.{rng.randrange(KEY_COUNT)}"})
+            done += 1
+    result_queue.put(done)
+
+
+def wait_until_ready(base_url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{base_url}/status").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API did not start in time")
+
+
+def measure(workers: int, clients: int, duration: float, port: int) -> float:
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        seed(workdir)
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "app", "--workers", str(workers), "--port", str(port)],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_until_ready(base_url)
+            # Let every worker finish starting before load begins
+            time.sleep(1.0)
+            results = multiprocessing.Queue()
+            processes = [
+                multiprocessing.Process(target=client_loop, args=(base_url, duration, results))
+                for _ in range(clients)
+            ]
+            for process in processes:
+                process.start()
+            total = sum(results.get() for _ in processes)
+            for process in processes:
+                process.join()
+            return total / duration
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}, clients: {args.clients}, duration: {args.duration}s")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        throughput = measure(workers, args.clients, args.duration, args.port)
+        baseline = baseline or throughput
+        print(f"workers={workers}: {throughput:8.0f} req/s  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from ._common import DEFAULT_BASE_URL, APIError, RetryPolicy
+from .sync_client import KVClient
+from .async_client import AsyncKVClient
@@ -0,0 +1,186 @@
+import base64
+import json
+import random
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+DEFAULT_BASE_URL = "http://127.0.0.1:8000"
+
+# Only reads are retried after the server has seen the request: /kv/update and
+# /kv/delete change revision history or report "does not exist" on a replay.
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class APIError(Exception):
+    """
+    Raised when the API answers with a non-success HTTP status.
+    """
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """
+    Read the `exp` claim (seconds since the epoch) from a JWT without verifying it.
+
+    :param token: The access token.
+    :return: The expiry timestamp, or None if the token has no readable expiry.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for transient failures.
+    """
+
+    def __init__(self, attempts: int = 3, backoff: float = 0.1, max_backoff: float = 2.0):
+        """
+        :param attempts: Total attempts per request (1 disables retries).
+        :param backoff: Delay before the first retry in seconds; doubled on each retry.
+        :param max_backoff: Upper bound for a single delay.
+        """
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(
+        self,
+        method: str,
+        attempt: int,
+        response: Optional[httpx.Response],
+        error: Optional[Exception],
+        idempotent: bool = False,
+    ) -> bool:
+        """
+        Decide whether a failed attempt may be retried.
+
+        Connection failures are always safe to retry because the request never reached
+        the server; everything else is only retried for idempotent methods, or for
+        requests the caller marks `idempotent` (e.g. ones carrying an Idempotency-Key).
+        """
+        if attempt + 1 >= self.attempts:
+            return False
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        if method not in IDEMPOTENT_METHODS and not idempotent:
+            return False
+        if error is not None:
+            return isinstance(error, httpx.TransportError)
+        return response is not None and response.status_code in RETRY_STATUSES
+
+    def delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Seconds to wait before the next attempt, honouring Retry-After when present.
+        """
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), self.max_backoff)
+            except ValueError:
+                pass
+        base = min(self.backoff * (2 ** attempt), self.max_backoff)
+        return base * (0.5 + random.random() / 2)
+
+
+class _ClientBase:
+    """
+    State and request building shared by the sync and async clients.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        token: Optional[str] = None,
+        email: Optional[str] = None,
+        password: Optional[str] = None,
+        retry: Optional[RetryPolicy] = None,
+        refresh_margin: float = 60.0,
+        max_connections: int = 32,
+        timeout: float = 30.0,
+        transport: Any = None,
+        primary_url: Optional[str] = None,
+    ):
+        """
+        :param base_url: The API base URL.
+        :param token: An existing access token.
+        :param email: Credentials kept in memory for automatic re-login before expiry.
+        :param password: See `email`.
+        :param retry: Retry policy (default: 3 attempts with exponential backoff).
+        :param refresh_margin: Re-login this many seconds before the token expires.
+        :param max_connections: Size of the keep-alive connection pool.
+        :param timeout: Per-request timeout in seconds.
+        :param transport: Optional httpx transport (e.g. httpx.MockTransport in tests).
+        :param primary_url: The primary's base URL, when `base_url` is a read replica. A read
+            replica redirects every other request there (307); the redirect is followed,
+            with the token, only to this URL. Without it, such requests raise APIError.
+        """
+        self.base_url = base_url
+        self.email = email
+        self.password = password
+        self.retry = retry or RetryPolicy()
+        self.refresh_margin = refresh_margin
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self.transport = transport
+        self.primary_url = primary_url.rstrip("/") if primary_url else None
+        self._set_token(token)
+
+    def _set_token(self, token: Optional[str]):
+        self.token = token
+        self.token_expires_at = token_expiry(token) if token else None
+
+    def _needs_login(self) -> bool:
+        if self.email is None or self.password is None:
+            return False
+        if self.token is None:
+            return True
+        return self.token_expires_at is not None and self.token_expires_at - time.time() < self.refresh_margin
+
+    def _headers(self, auth: bool, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = dict(extra or {})
+        if auth and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _redirect(self, response: Optional[httpx.Response], followed: bool) -> Optional[str]:
+        """
+        Return the URL to re-send a request to that a read replica redirected, or None
+        if the response is not a redirect.
+
+        The credentials are only sent along to `primary_url` (httpx itself would drop the
+        Authorization header on a redirect to another host).
+
+        :raises APIError: If the redirect does not lead to `primary_url`.
+        """
+        if response is None or response.status_code not in (307, 308):
+            return None
+        location = response.headers.get("Location", "")
+        if self.primary_url and not followed and location.startswith(self.primary_url + "/"):
+            return location
+        raise APIError(
+            response.status_code,
+            f"Redirected to {location or 'an unknown location'}: send writes to the primary, "
+            "or set primary_url to follow the redirect",
+        )
+
+    @staticmethod
+    def _parse(response: httpx.Response) -> Any:
+        try:
+            body = response.json()
+        except ValueError:
+            body = response.text
+        if response.is_error:
+            detail = body.get("detail", body) if isinstance(body, dict) else body
+            raise APIError(response.status_code, detail)
+        return body
@@ -0,0 +1,260 @@
+import asyncio
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from ._common import APIError, _ClientBase
+
+
+class AsyncKVClient(_ClientBase):
+    """
+    Asynchronous client for the LLM and KV Store API.
+
+    Same behaviour as KVClient (pooled keep-alive connections, in-memory token with
+    automatic re-login, retries of idempotent calls), built on httpx.AsyncClient.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url, limits=self.limits, timeout=self.timeout, transport=self.transport
+        )
+        self._login_lock = asyncio.Lock()
+
+    async def close(self):
+        await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncKVClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        json: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        auth: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        if auth and self._needs_login():
+            await self._relogin()
+
+        relogged = False
+        attempt = 0
+        url, followed = path, False
+        while True:
+            response, error = None, None
+            try:
+                response = await self.http.request(method, url, json=json, params=params, headers=self._headers(auth, headers))
+            except httpx.TransportError as e:
+                error = e
+
+            if response is not None and response.status_code == 401 and auth and not relogged and self.email:
+                # Token expired or was revoked server-side: log in again once
+                relogged = True
+                await self._relogin(force=True)
+                continue
+            if self.retry.should_retry(method, attempt, response, error, idempotent=bool(headers and "Idempotency-Key" in headers)):
+                await asyncio.sleep(self.retry.delay(attempt, response))
+                attempt += 1
+                continue
+            if error is not None:
+                raise error
+            redirect = self._redirect(response, followed)
+            if redirect is not None:
+                # The Location already carries the query string
+                url, params, followed = redirect, None, True
+                continue
+            return self._parse(response)
+
+    async def _relogin(self, force: bool = False):
+        async with self._login_lock:
+            if force or self._needs_login():
+                await self.login(self.email, self.password)
+
+    # Authentication
+
+    async def register(self, email: str, password: str, is_admin: bool = False) -> Dict[str, Any]:
+        return await self._request("POST", "/auth/register", json={"email": email, "password": password, "is_admin": is_admin}, auth=False)
+
+    async def login(self, email: str, password: str) -> Dict[str, Any]:
+        """
+        Log in and keep the token (and credentials, for automatic re-login) in memory.
+        """
+        response = await self._request("POST", "/auth/login", json={"email": email, "password": password}, auth=False)
+        self.email, self.password = email, password
+        self._set_token(response["access_token"])
+        return response
+
+    # KV store
+
+    async def insert(self, key: str, value: Any, ttl: Optional[float] = None) -> Dict[str, Any]:
+        return await self._request("POST", "/kv/insert", json={"key": key, "value": value, "ttl": ttl})
+
+    async def update(
+        self, key: str, value: Any, ttl: Optional[float] = None, expected_version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Update a key. With `expected_version`, raises APIError(409) if the key was changed since.
+        """
+        return await self._request(
+            "PUT", "/kv/update", json={"key": key, "value": value, "ttl": ttl, "expected_version": expected_version}
+        )
+
+    async def delete(self, key: str, expected_version: Optional[int] = None) -> Dict[str, Any]:
+        params = {"key": key}
+        if expected_version is not None:
+            params["expected_version"] = expected_version
+        return await self._request("DELETE", "/kv/delete", params=params)
+
+    async def get(self, key: str, lean: bool = False) -> Dict[str, Any]:
+        """
+        Get a key. With `lean`, the server returns only the data (key, value, version).
+        """
+        params = {"key": key, "lean": True} if lean else {"key": key}
+        return await self._request("GET", "/kv/get", params=params)
+
+    async def get_revisions(self, key: str) -> Dict[str, Any]:
+        return await self._request("GET", "/kv/get_revisions", params={"key": key})
+
+    async def get_all_pairs(self) -> Dict[str, Any]:
+        return await self._request("GET", "/kv/get_all_pairs")
+
+    async def search(self, query: str, prefix: bool = True, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        return await self._request("GET", "/kv/search", params={"q": query, "prefix": prefix, "limit": limit, "offset": offset})
+
+    async def list_indexes(self) -> Dict[str, Any]:
+        return await self._request("GET", "/kv/indexes")
+
+    async def create_index(self, path: str) -> Dict[str, Any]:
+        return await self._request("POST", "/kv/indexes", json={"path": path})
+
+    async def drop_index(self, path: str) -> Dict[str, Any]:
+        return await self._request("DELETE", "/kv/indexes", params={"path": path})
+
+    async def query(self, where: List[Dict[str, Any]], limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """
+        Find keys by predicates on indexed JSON paths,
+        e.g. where=[{"path": "region", "op": "eq", "value": "eu"}].
+        """
+        return await self._request("POST", "/kv/query", json={"where": where, "limit": limit, "offset": offset})
+
+    async def export_to(self, path: str) -> int:
+        """
+        Download an export of the whole store (gzip-compressed NDJSON) to a file.
+
+        :return: The number of bytes written.
+        """
+        if self._needs_login():
+            await self._relogin()
+        written = 0
+        async with self.http.stream("GET", "/kv/export", headers=self._headers(True), timeout=None) as response:
+            if response.is_error:
+                await response.aread()
+                self._parse(response)
+            with open(path, "wb") as output:
+                async for chunk in response.aiter_bytes():
+                    written += output.write(chunk)
+        return written
+
+    async def import_from(self, path: str, replace: bool = False) -> Dict[str, Any]:
+        """
+        Upload an export file. Existing keys are skipped unless `replace` is set.
+        """
+        if self._needs_login():
+            await self._relogin()
+
+        async def chunks():
+            with open(path, "rb") as upload:
+                while chunk := upload.read(64 * 1024):
+                    yield chunk
+
+        response = await self.http.post(
+            "/kv/import", content=chunks(), params={"replace": replace}, headers=self._headers(True), timeout=None
+        )
+        return self._parse(response)
+
+    async def kv_stats(self) -> Dict[str, Any]:
+        return await self._request("GET", "/kv/stats")
+
+    # LLM
+
+    async def control_kv(self, prompt: str) -> List[Dict[str, Any]]:
+        return await self._request("POST", "/llm/control-kv", json={"prompt": prompt})
+
+    async def submit_job(self, prompt: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a control-kv request to run in the background. A random idempotency key is
+        used if none is given, so retries of this call never start a second job.
+        """
+        headers = {"Idempotency-Key": idempotency_key or uuid.uuid4().hex}
+        return await self._request("POST", "/llm/jobs", json={"prompt": prompt}, headers=headers)
+
+    async def get_job(self, job_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/llm/jobs/{job_id}")
+
+    async def wait_for_job(self, job_id: str, poll_interval: float = 0.5, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Poll a job until it has succeeded or failed.
+
+        :raises TimeoutError: If the job is still unfinished after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = await self.get_job(job_id)
+            if job["data"]["status"] in ("succeeded", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} is still {job['data']['status']}.")
+            await asyncio.sleep(poll_interval)
+
+    async def raw_query(self, prompt: str) -> Dict[str, Any]:
+        return await self._request("POST", "/llm/raw/query", params={"prompt": prompt})
+
+    async def parse_commands(self, commands: List[str]) -> Dict[str, Any]:
+        return await self._request("POST", "/llm/parse-commands", json={"commands": commands})
+
+    async def llm_stats(self) -> Dict[str, Any]:
+        return await self._request("GET", "/llm/stats")
+
+    # Bulk operations
+
+    async def gather(self, calls: Iterable[Callable[[], Awaitable[Any]]], concurrency: int = 16, return_exceptions: bool = True) -> List[Any]:
+        """
+        Run many calls concurrently with at most `concurrency` in flight.
+
+        :param calls: Zero-argument coroutine factories, e.g. `lambda: client.get("a")`.
+        :param concurrency: Maximum number of calls in flight.
+        :param return_exceptions: If True, APIError/transport errors are returned in place
+            of results instead of raised.
+        :return: Results in the order of `calls`.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(call):
+            async with semaphore:
+                try:
+                    return await call()
+                except (APIError, httpx.HTTPError) as e:
+                    if return_exceptions:
+                        return e
+                    raise
+
+        return await asyncio.gather(*(run(call) for call in calls))
+
+    async def insert_many(self, pairs: Dict[str, Any], concurrency: int = 16) -> List[Any]:
+        return await self.gather([lambda k=k, v=v: self.insert(k, v) for k, v in pairs.items()], concurrency)
+
+    async def update_many(self, pairs: Dict[str, Any], concurrency: int = 16) -> List[Any]:
+        return await self.gather([lambda k=k, v=v: self.update(k, v) for k, v in pairs.items()], concurrency)
+
+    async def get_many(self, keys: Iterable[str], concurrency: int = 16) -> List[Any]:
+        return await self.gather([lambda k=k: self.get(k) for k in keys], concurrency)
+
+    async def delete_many(self, keys: Iterable[str], concurrency: int = 16) -> List[Any]:
+        return await self.gather([lambda k=k: self.delete(k) for k in keys], concurrency)
@@ -0,0 +1,260 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+from ._common import APIError, _ClientBase
+
+
+class KVClient(_ClientBase):
+    """
+    Synchronous client for the LLM and KV Store API.
+
+    Keeps a pool of keep-alive connections, holds the access token in memory
+    (re-logging in before it expires when credentials are known) and retries
+    transient failures of idempotent calls. Safe to share between threads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http = httpx.Client(
+            base_url=self.base_url, limits=self.limits, timeout=self.timeout, transport=self.transport
+        )
+        self._login_lock = threading.Lock()
+
+    def close(self):
+        self.http.close()
+
+    def __enter__(self) -> "KVClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        json: Any = None,
+        params: Optional[Dict[str, Any]] = None,
+        auth: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Any:
+        if auth and self._needs_login():
+            self._relogin()
+
+        relogged = False
+        attempt = 0
+        url, followed = path, False
+        while True:
+            response, error = None, None
+            try:
+                response = self.http.request(method, url, json=json, params=params, headers=self._headers(auth, headers))
+            except httpx.TransportError as e:
+                error = e
+
+            if response is not None and response.status_code == 401 and auth and not relogged and self.email:
+                # Token expired or was revoked server-side: log in again once
+                relogged = True
+                self._relogin(force=True)
+                continue
+            if self.retry.should_retry(method, attempt, response, error, idempotent=bool(headers and "Idempotency-Key" in headers)):
+                time.sleep(self.retry.delay(attempt, response))
+                attempt += 1
+                continue
+            if error is not None:
+                raise error
+            redirect = self._redirect(response, followed)
+            if redirect is not None:
+                # The Location already carries the query string
+                url, params, followed = redirect, None, True
+                continue
+            return self._parse(response)
+
+    def _relogin(self, force: bool = False):
+        with self._login_lock:
+            if force or self._needs_login():
+                self.login(self.email, self.password)
+
+    # Authentication
+
+    def register(self, email: str, password: str, is_admin: bool = False) -> Dict[str, Any]:
+        return self._request("POST", "/auth/register", json={"email": email, "password": password, "is_admin": is_admin}, auth=False)
+
+    def login(self, email: str, password: str) -> Dict[str, Any]:
+        """
+        Log in and keep the token (and credentials, for automatic re-login) in memory.
+        """
+        response = self._request("POST", "/auth/login", json={"email": email, "password": password}, auth=False)
+        self.email, self.password = email, password
+        self._set_token(response["access_token"])
+        return response
+
+    # KV store
+
+    def insert(self, key: str, value: Any, ttl: Optional[float] = None) -> Dict[str, Any]:
+        return self._request("POST", "/kv/insert", json={"key": key, "value": value, "ttl": ttl})
+
+    def update(
+        self, key: str, value: Any, ttl: Optional[float] = None, expected_version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Update a key. With `expected_version`, raises APIError(409) if the key was changed since.
+        """
+        return self._request(
+            "PUT", "/kv/update", json={"key": key, "value": value, "ttl": ttl, "expected_version": expected_version}
+        )
+
+    def delete(self, key: str, expected_version: Optional[int] = None) -> Dict[str, Any]:
+        params = {"key": key}
+        if expected_version is not None:
+            params["expected_version"] = expected_version
+        return self._request("DELETE", "/kv/delete", params=params)
+
+    def get(self, key: str, lean: bool = False) -> Dict[str, Any]:
+        """
+        Get a key. With `lean`, the server returns only the data (key, value, version).
+        """
+        params = {"key": key, "lean": True} if lean else {"key": key}
+        return self._request("GET", "/kv/get", params=params)
+
+    def get_revisions(self, key: str) -> Dict[str, Any]:
+        return self._request("GET", "/kv/get_revisions", params={"key": key})
+
+    def get_all_pairs(self) -> Dict[str, Any]:
+        return self._request("GET", "/kv/get_all_pairs")
+
+    def search(self, query: str, prefix: bool = True, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        return self._request("GET", "/kv/search", params={"q": query, "prefix": prefix, "limit": limit, "offset": offset})
+
+    def list_indexes(self) -> Dict[str, Any]:
+        return self._request("GET", "/kv/indexes")
+
+    def create_index(self, path: str) -> Dict[str, Any]:
+        return self._request("POST", "/kv/indexes", json={"path": path})
+
+    def drop_index(self, path: str) -> Dict[str, Any]:
+        return self._request("DELETE", "/kv/indexes", params={"path": path})
+
+    def query(self, where: List[Dict[str, Any]], limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """
+        Find keys by predicates on indexed JSON paths,
+        e.g. where=[{"path": "region", "op": "eq", "value": "eu"}].
+        """
+        return self._request("POST", "/kv/query", json={"where": where, "limit": limit, "offset": offset})
+
+    def export_to(self, path: str) -> int:
+        """
+        Download an export of the whole store (gzip-compressed NDJSON) to a file.
+
+        :return: The number of bytes written.
+        """
+        if self._needs_login():
+            self._relogin()
+        written = 0
+        with self.http.stream("GET", "/kv/export", headers=self._headers(True), timeout=None) as response:
+            if response.is_error:
+                response.read()
+                self._parse(response)
+            with open(path, "wb") as output:
+                for chunk in response.iter_bytes():
+                    written += output.write(chunk)
+        return written
+
+    def import_from(self, path: str, replace: bool = False) -> Dict[str, Any]:
+        """
+        Upload an export file. Existing keys are skipped unless `replace` is set.
+        """
+        if self._needs_login():
+            self._relogin()
+
+        def chunks():
+            with open(path, "rb") as upload:
+                while chunk := upload.read(64 * 1024):
+                    yield chunk
+
+        response = self.http.post(
+            "/kv/import", content=chunks(), params={"replace": replace}, headers=self._headers(True), timeout=None
+        )
+        return self._parse(response)
+
+    def kv_stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/kv/stats")
+
+    # LLM
+
+    def control_kv(self, prompt: str) -> List[Dict[str, Any]]:
+        return self._request("POST", "/llm/control-kv", json={"prompt": prompt})
+
+    def submit_job(self, prompt: str, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a control-kv request to run in the background. A random idempotency key is
+        used if none is given, so retries of this call never start a second job.
+        """
+        headers = {"Idempotency-Key": idempotency_key or uuid.uuid4().hex}
+        return self._request("POST", "/llm/jobs", json={"prompt": prompt}, headers=headers)
+
+    def get_job(self, job_id: str) -> Dict[str, Any]:
+        return self._request("GET", f"/llm/jobs/{job_id}")
+
+    def wait_for_job(self, job_id: str, poll_interval: float = 0.5, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Poll a job until it has succeeded or failed.
+
+        :raises TimeoutError: If the job is still unfinished after `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            job = self.get_job(job_id)
+            if job["data"]["status"] in ("succeeded", "failed"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Job {job_id} is still {job['data']['status']}.")
+            time.sleep(poll_interval)
+
+    def raw_query(self, prompt: str) -> Dict[str, Any]:
+        return self._request("POST", "/llm/raw/query", params={"prompt": prompt})
+
+    def parse_commands(self, commands: List[str]) -> Dict[str, Any]:
+        return self._request("POST", "/llm/parse-commands", json={"commands": commands})
+
+    def llm_stats(self) -> Dict[str, Any]:
+        return self._request("GET", "/llm/stats")
+
+    # Bulk operations
+
+    def gather(self, calls: Iterable[Callable[[], Any]], concurrency: int = 16, return_exceptions: bool = True) -> List[Any]:
+        """
+        Run many calls concurrently over the shared connection pool.
+
+        :param calls: Zero-argument callables, e.g. `lambda: client.get("a")`.
+        :param concurrency: Maximum number of calls in flight.
+        :param return_exceptions: If True, APIError/transport errors are returned in place
+            of results instead of raised.
+        :return: Results in the order of `calls`.
+        """
+        def run(call):
+            try:
+                return call()
+            except (APIError, httpx.HTTPError) as e:
+                if return_exceptions:
+                    return e
+                raise
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(run, calls))
+
+    def insert_many(self, pairs: Dict[str, Any], concurrency: int = 16) -> List[Any]:
+        return self.gather([lambda k=k, v=v: self.insert(k, v) for k, v in pairs.items()], concurrency)
+
+    def update_many(self, pairs: Dict[str, Any], concurrency: int = 16) -> List[Any]:
+        return self.gather([lambda k=k, v=v: self.update(k, v) for k, v in pairs.items()], concurrency)
+
+    def get_many(self, keys: Iterable[str], concurrency: int = 16) -> List[Any]:
+        return self.gather([lambda k=k: self.get(k) for k in keys], concurrency)
+
+    def delete_many(self, keys: Iterable[str], concurrency: int = 16) -> List[Any]:
+        return self.gather([lambda k=k: self.delete(k) for k in keys], concurrency)
@@ -1,45 +1,54 @@
+# Run from the repository root with: python -m app.frontend.app
+import os
 import gradio as gr
-from api_utils import register_user, login_user, call_api
+from app.client import DEFAULT_BASE_URL, APIError, KVClient
+
+# One client for the whole UI: pooled connections and the token are kept in memory
+client = KVClient(base_url=os.environ.get("KV_API_URL", DEFAULT_BASE_URL))
 
 # Register function
 def register(email, password, is_admin):
-    response = register_user(email, password, is_admin)
-    return response
+    try:
+        return client.register(email, password, is_admin)
+    except APIError as e:
+        return e.detail
 
 # Login function
 def login(email, password):
-    response = login_user(email, password)
-    return response
+    try:
+        return client.login(email, password)
+    except APIError as e:
+        return e.detail
 
 # KV store actions
 def perform_kv_action(action, key, value=None):
-    data = {"key": key, "value": value}
-    if action == "Insert":
-        endpoint = "/kv/insert"
-        method = "POST"
-    elif action == "Update":
-        endpoint = "/kv/update"
-        method = "PUT"
-    elif action == "Delete":
-        endpoint = "/kv/delete"
-        method = "DELETE"
-    elif action == "Get":
-        endpoint = "/kv/get"
-        method = "GET"
-    else:
-        return {"error": "Invalid action"}
-    
-    response = call_api(endpoint, method, data)
-    print(response)
-    return response.get("message", "Unknown error") if response.get("status") == "success" else response.get("detail", "Unknown error")
+    try:
+        if action == "Insert":
+            response = client.insert(key, value)
+        elif action == "Update":
+            response = client.update(key, value)
+        elif action == "Delete":
+            response = client.delete(key)
+        elif action == "Get":
+            # The value is only in the data; the message no longer repeats it
+            data = client.get(key, lean=True)
+            return f"Key: {data['key']} Value: {data['value']}"
+        else:
+            return "Invalid action"
+    except APIError as e:
+        return e.detail
+    return response.get("message", "Unknown error")
 
 # Fetch key revisions
 def get_revisions(key):
     """
     Fetch all revisions for a specific key and display as a table.
     """
-    response = call_api("/kv/get_revisions", method="GET", data={"key": key})
-    
+    try:
+        response = client.get_revisions(key)
+    except APIError as e:
+        return [["Error"], [e.detail]]
+
     if response.get("status") == "success":
         revisions = response["data"]
         table_data = [["Revision Number", "Value", "Created At"]]  # Table header
@@ -58,9 +67,11 @@ def get_all_pairs():
     """
     Fetch all key-value pairs from the KV store and display as a table.
     """
-    response = call_api("/kv/get_all_pairs", method="GET")
-    print(response)
-    
+    try:
+        response = client.get_all_pairs()
+    except APIError as e:
+        return [["Error"], [e.detail]]
+
     if response.get("status") == "success":
         pairs = response["data"]
         table_data = [["Key", "Value"]]  # Table header
@@ -73,14 +84,36 @@ def get_all_pairs():
     return [["Error"], [response.get("message", "Unknown error")]]
 
 
+def search_keys(query):
+    """
+    Full-text search over keys and values and display the matches as a table.
+    """
+    try:
+        response = client.search(query, limit=50)
+    except APIError as e:
+        return [["Error"], [e.detail]]
+
+    table_data = [["Key", "Value", "Match"]]  # Table header
+    for result in response["data"]:
+        table_data.append([
+            result["key"],
+            result["value"],
+            result["snippet"]
+        ])
+    return table_data
+
+
 # LLM control
 def control_kv(prompt):
-    response = call_api("/llm/control-kv", method="POST", data={"prompt": prompt})
+    try:
+        response = client.control_kv(prompt)
+    except APIError as e:
+        return e.detail
 
     output = ""
     for resp in response:
-        output += f"{resp["status"]}: {resp['message']}\n"
-        
+        output += f"{resp['status']}: {resp.get('message', '')}\n"
+
     return output
 
 # Gradio UI
@@ -128,6 +161,13 @@ with gr.Blocks() as app:
             all_pairs_output = gr.Dataframe(label="All Key-Value Pairs Table", col_count=2)
             all_pairs_button.click(get_all_pairs, inputs=[], outputs=all_pairs_output)
 
+        with gr.Accordion("Search Keys and Values", open=False):
+            search_input = gr.Textbox(label="Search (hostnames, flags, words; prefixes match)")
+            search_button = gr.Button("Search")
+            search_output = gr.Dataframe(label="Search Results", col_count=3)
+            search_button.click(search_keys, inputs=[search_input], outputs=search_output)
+            search_input.submit(search_keys, inputs=[search_input], outputs=search_output)
+
     # Control KV via LLM Tab
     with gr.Tab("LLM Control"):
         gr.Markdown("## Control KV Store via LLM")
@@ -16,3 +16,26 @@ Do not include any additional text outside the JSON object.
 User Request:
 {prompt}
 """
+
+# Like DEFAULT_TEMPLATE, but lists the existing keys the request most likely refers to
+KV_CONTEXT_TEMPLATE = """
+You are an AI assistant that interprets user requests to perform actions on a key-value store. 
+Analyze the user's natural language request below, which may contain multiple commands, and extract the intended actions, keys, and values for each command. 
+Respond only with a JSON array of objects, each representing a single action, in the following format:
+
+[
+  {{ "action": "insert" | "update" | "delete", "key": "key_name", "value": "value_content" }},
+  {{ "action": "insert" | "update" | "delete", "key": "key_name", "value": "value_content" }},
+  ...
+]
+
+The "action" field should be one of: "insert", "update", or "delete".
+If the action is "delete" and no value is provided, set "value" to null.
+Ensure all extracted values are strings.
+When a command refers to a key that already exists, use its exact name from the list below.
+Do not include any additional text outside the JSON object.
+Store:
+{context}
+User Request:
+{prompt}
+"""
@@ -0,0 +1,262 @@
+import json
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+
+ALLOWED_ACTIONS = {"insert", "update", "delete", "get", "get_revisions"}
+KEYLESS_VALUE_ACTIONS = {"delete", "get", "get_revisions"}
+
+_CODE_FENCE_RE = re.compile(r"```[a-zA-Z0-9_-]*\s*(.*?)(?:```|$)", re.DOTALL)
+_NUMBER_RE = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_BARE_WORD_DELIMITERS = set(",:]}\n\r")
+_ESCAPES = {
+    "n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f",
+    "/": "/", "\\": "\\", '"': '"', "'": "'",
+}
+_LITERALS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None,
+}
+
+
+class _Truncated(Exception):
+    """Raised when the input ends in the middle of a value."""
+
+
+class _LenientParser:
+    """
+    A small recursive-descent parser that accepts the JSON dialects LLMs tend to emit:
+    single-quoted strings, unquoted keys, trailing commas, Python literals and
+    output that was cut off before the closing brackets.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def _skip_whitespace(self):
+        while self.pos < len(self.text) and self.text[self.pos].isspace():
+            self.pos += 1
+
+    def _peek(self) -> str:
+        self._skip_whitespace()
+        if self.pos >= len(self.text):
+            raise _Truncated()
+        return self.text[self.pos]
+
+    def parse_value(self) -> Any:
+        char = self._peek()
+        if char == "{":
+            return self._parse_object()
+        if char == "[":
+            return self._parse_array()
+        if char in "\"'":
+            return self._parse_string()
+        match = _NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group(0)
+            if any(c in number for c in ".eE"):
+                return float(number)
+            return int(number)
+        return self._parse_bare_word()
+
+    def _parse_object(self) -> Dict[str, Any]:
+        self.pos += 1  # consume '{'
+        result = {}
+        while True:
+            char = self._peek()
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == ",":
+                self.pos += 1
+                continue
+            key = self._parse_string() if char in "\"'" else self._parse_bare_word(stop=":")
+            if self._peek() != ":":
+                raise ValueError(f"Expected ':' after key '{key}' at position {self.pos}")
+            self.pos += 1
+            result[str(key)] = self.parse_value()
+
+    def _parse_array(self) -> List[Any]:
+        self.pos += 1  # consume '['
+        result = []
+        while True:
+            try:
+                char = self._peek()
+            except _Truncated:
+                # Output was cut off between elements: keep what we have
+                return result
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == ",":
+                self.pos += 1
+                continue
+            try:
+                result.append(self.parse_value())
+            except _Truncated:
+                # Drop the incomplete trailing element
+                return result
+
+    def _parse_string(self) -> str:
+        quote = self.text[self.pos]
+        self.pos += 1
+        chars = []
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char == quote:
+                self.pos += 1
+                return "".join(chars)
+            if char == "\\" and self.pos + 1 < len(self.text):
+                escaped = self.text[self.pos + 1]
+                if escaped == "u" and self.pos + 6 <= len(self.text):
+                    chars.append(chr(int(self.text[self.pos + 2 : self.pos + 6], 16)))
+                    self.pos += 6
+                    continue
+                chars.append(_ESCAPES.get(escaped, escaped))
+                self.pos += 2
+                continue
+            chars.append(char)
+            self.pos += 1
+        raise _Truncated()
+
+    def _parse_bare_word(self, stop: str = "") -> Any:
+        start = self.pos
+        while (
+            self.pos < len(self.text)
+            and self.text[self.pos] not in _BARE_WORD_DELIMITERS
+            and self.text[self.pos] not in stop
+        ):
+            self.pos += 1
+        if self.pos >= len(self.text) and not stop:
+            raise _Truncated()
+        word = self.text[start : self.pos].strip()
+        if not word:
+            raise ValueError(f"Unexpected character at position {start}")
+        return _LITERALS.get(word, word)
+
+
+def strip_code_fences(text: str) -> str:
+    """
+    Return the body of the first Markdown code fence in the text, or the text itself.
+
+    :param text: The raw LLM output.
+    :return: The text with any surrounding code fence removed.
+    """
+    match = _CODE_FENCE_RE.search(text)
+    if match:
+        return match.group(1).strip()
+    return text.strip()
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse almost-JSON text produced by an LLM.
+
+    Handles code fences, leading/trailing prose, trailing commas, single quotes,
+    unquoted keys, Python literals and arrays truncated mid-element.
+
+    :param text: The raw LLM output.
+    :return: The parsed JSON value.
+    :raises ValueError: If no JSON value can be recovered.
+    """
+    body = strip_code_fences(text)
+    starts = [index for index in (body.find("["), body.find("{")) if index != -1]
+    if not starts:
+        raise ValueError("No JSON array or object found in the response.")
+
+    parser = _LenientParser(body)
+    parser.pos = min(starts)
+    try:
+        return parser.parse_value()
+    except _Truncated:
+        raise ValueError("Response was truncated before a complete JSON value.")
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"Could not repair JSON: {e}")
+
+
+def validate_actions(data: Any) -> List[Dict[str, Any]]:
+    """
+    Validate and normalise parsed LLM output against the KV action schema.
+
+    A single action object, or an object wrapping an "actions" list, is accepted
+    where an array was expected.
+
+    :param data: The parsed JSON value.
+    :return: A list of action dictionaries with "action", "key" and "value".
+    :raises ValueError: If the data does not match the schema.
+    """
+    if isinstance(data, dict):
+        data = data["actions"] if isinstance(data.get("actions"), list) else [data]
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of actions.")
+
+    actions = []
+    for index, item in enumerate(data):
+        if not isinstance(item, dict):
+            raise ValueError(f"Action {index} is not an object.")
+        action = item.get("action")
+        if isinstance(action, str):
+            action = action.strip().lower()
+        if action not in ALLOWED_ACTIONS:
+            raise ValueError(f"Action {index} has unsupported action type '{action}'.")
+        key = item.get("key")
+        if not isinstance(key, str) or not key.strip():
+            raise ValueError(f"Action {index} is missing a key.")
+        if "value" not in item and action not in KEYLESS_VALUE_ACTIONS:
+            raise ValueError(f"Action {index} ('{action}') is missing a value.")
+        actions.append({"action": action, "key": key.strip(), "value": item.get("value")})
+    return actions
+
+
+def parse_json_response(text: str) -> Tuple[Any, bool]:
+    """
+    Parse an LLM response strictly, falling back to local repair.
+
+    :param text: The raw LLM output.
+    :return: A tuple of (parsed value, whether repair was needed).
+    :raises ValueError: If the text cannot be parsed even after repair.
+    """
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        return repair_json(text), True
+
+
+class JSONRepairStats:
+    """
+    Thread-safe counters for how LLM JSON output was recovered.
+    """
+
+    OUTCOMES = ("clean", "repaired", "reprompted", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {outcome: 0 for outcome in self.OUTCOMES}
+
+    def record(self, outcome: str):
+        """
+        Count one response with the given outcome.
+        """
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the counters along with the repair and re-prompt rates.
+        """
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        return {
+            "total": total,
+            **counts,
+            "repair_rate": counts["repaired"] / total if total else 0.0,
+            "reprompt_rate": counts["reprompted"] / total if total else 0.0,
+        }
+
+
+# Shared across processors so the rates cover every request served by this process
+repair_stats = JSONRepairStats()
@@ -1,11 +1,16 @@
-from typing import Dict, Any
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_openai import ChatOpenAI
 
 
 class LLMConnector:
     """
     A unified interface for interacting with Gemini and OpenAI LLMs via LangChain.
+
+    Provider SDKs are imported lazily so only the configured provider is loaded.
+    Instances hold a long-lived client and are meant to be reused across requests.
     """
 
     def __init__(self, api_type: str, api_key: str, model_name: str):
@@ -27,16 +32,27 @@ class LLMConnector:
         else:
             raise ValueError(f"Unsupported API type: {self.api_type}")
 
-    def _initialize_openai_llm(self) -> ChatOpenAI:
+    @property
+    def name(self) -> str:
+        """
+        Provider and model identifier, e.g. "gemini:models/gemini-1.5-flash".
+        """
+        return f"{self.api_type}:{self.model_name}"
+
+    def _initialize_openai_llm(self) -> "ChatOpenAI":
         """
         Initialize the OpenAI LLM with the API key.
         """
+        from langchain_openai import ChatOpenAI
+
         return ChatOpenAI(model=self.model_name, openai_api_key=self.api_key)
 
-    def _initialize_gemini_llm(self) -> ChatGoogleGenerativeAI:
+    def _initialize_gemini_llm(self) -> "ChatGoogleGenerativeAI":
         """
         Initialize the Gemini LLM with the API key.
         """
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
         return ChatGoogleGenerativeAI(model=self.model_name, google_api_key=self.api_key)
 
     def query(self, prompt: str) -> Dict[str, Any]:
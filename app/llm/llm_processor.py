@@ -1,8 +1,10 @@
-import json
+from typing import Any, Callable, Optional
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from .llm_connector import LLMConnector
 from .prompt_manager import PromptManager
+from .json_repair import parse_json_response, repair_stats
+from ..backend.single_flight import SingleFlight
 
 
 class LLMProcessor:
@@ -12,7 +14,11 @@ class LLMProcessor:
     """
 
     def __init__(
-        self, api_type: str, api_key: str, model_name: str = "text-davinci-003"
+        self,
+        api_type: str = None,
+        api_key: str = None,
+        model_name: str = "text-davinci-003",
+        connector=None,
     ):
         """
         Initialize the LLMProcessor.
@@ -20,8 +26,10 @@ class LLMProcessor:
         :param api_type: "openai" or "gemini" for the respective API.
         :param api_key: The API key for the chosen LLM.
         :param model_name: The model name (default: "text-davinci-003").
+        :param connector: Optional pre-built connector (e.g. an LLMRouter) used instead
+            of creating an LLMConnector from the other arguments.
         """
-        self.connector = LLMConnector(api_type, api_key, model_name)
+        self.connector = connector or LLMConnector(api_type, api_key, model_name)
         self.prompt_manager = PromptManager()
 
         # Prompt for re-asking LLM to return JSON format
@@ -30,6 +38,9 @@ class LLMProcessor:
         )
         self.output_parser = StrOutputParser()
 
+        # Identical concurrent prompts share one LLM call
+        self.flights = SingleFlight()
+
     def process_prompt(
         self, template_name: str, raw_prompt: str, context: dict = None
     ) -> str:
@@ -43,47 +54,34 @@ class LLMProcessor:
         """
         return self.prompt_manager.format_prompt(template_name, raw_prompt, context)
 
-    def _extract_json_substring(self, text: str) -> str:
-        """
-        Extract the text between the first '{' and the last '}' if the whole text is not valid JSON.
-
-        :param text: The input text containing potential JSON content.
-        :return: The extracted JSON substring or the original text if '{' and '}' are not found.
-        """
-        start_index = text.find("[")
-        end_index = text.rfind("]")
-        if start_index != -1 and end_index != -1:
-            return text[start_index : end_index + 1]
-        return text
-
-    def _is_valid_json(self, text: str) -> bool:
+    def _parse_json(self, text: str, validator: Optional[Callable[[Any], Any]] = None):
         """
-        Check if a given text is valid JSON.
+        Parse and optionally validate a JSON response locally, repairing it if needed.
 
-        :param text: The text to validate.
-        :return: True if the text is valid JSON, otherwise False.
+        :param text: The LLM output.
+        :param validator: Optional callable that normalises the parsed data or raises ValueError.
+        :return: A tuple of (data, repaired) or None if the text could not be recovered.
         """
         try:
-            json.loads(text)
-            return True
-        except json.JSONDecodeError:
-            return False
-
-    def _force_json_response(self, initial_response: str) -> str:
+            data, repaired = parse_json_response(text)
+            if validator is not None:
+                data = validator(data)
+            return data, repaired
+        except ValueError:
+            return None
+
+    def _force_json_response(self, initial_response: str) -> dict:
         """
         Re-prompt the LLM to force a JSON response.
 
         :param initial_response: The initial response from the LLM.
-        :return: A JSON-formatted response as a string.
+        :return: The connector's response dictionary for the re-prompt.
         """
         # Format the re-prompt with the JSON directive
         formatted_prompt = self.json_prompt_template.format(response=initial_response)
 
-        # Pass the re-prompted query to the LLM
-        llm = self.connector.llm  # Get the underlying LangChain LLM
-        re_prompted_response = llm.invoke(formatted_prompt)
-
-        return re_prompted_response
+        # Pass the re-prompted query through the connector (and any routing/fallback it does)
+        return self.connector.query(formatted_prompt)
 
     def generate_response(
         self,
@@ -91,6 +89,7 @@ class LLMProcessor:
         raw_prompt: str,
         context: dict = None,
         force_json: bool = False,
+        validator: Optional[Callable[[Any], Any]] = None,
         **kwargs
     ) -> dict:
         """
@@ -100,9 +99,36 @@ class LLMProcessor:
         :param raw_prompt: The raw user input.
         :param context: Optional context dictionary.
         :param force_json: If True, ensures the response is JSON formatted.
+        :param validator: Optional schema check applied to the parsed JSON; it should
+            return the normalised data or raise ValueError.
         :param kwargs: Additional parameters for the LLM.
         :return: A dictionary containing the status and response data.
+
+        Concurrent calls with identical arguments are coalesced into one LLM call and
+        all receive its (shared, read-only) result.
         """
+        flight_key = (
+            template_name,
+            raw_prompt,
+            repr(sorted(context.items())) if context else None,
+            force_json,
+            validator,
+            repr(sorted(kwargs.items())),
+        )
+        return self.flights.do(
+            flight_key,
+            lambda: self._generate_response(template_name, raw_prompt, context, force_json, validator, **kwargs),
+        )
+
+    def _generate_response(
+        self,
+        template_name: str,
+        raw_prompt: str,
+        context: dict = None,
+        force_json: bool = False,
+        validator: Optional[Callable[[Any], Any]] = None,
+        **kwargs
+    ) -> dict:
         # Format the prompt
         formatted_prompt = self.process_prompt(template_name, raw_prompt, context)
 
@@ -113,28 +139,31 @@ class LLMProcessor:
 
         output = response["data"]
 
-        # If force_json is enabled, validate the JSON response
+        # If force_json is enabled, parse (and repair) the JSON locally before re-prompting
         if force_json:
             content = (
                 output.content.strip()
             )  # Ensure the content is stripped of any leading/trailing spaces
-            if not self._is_valid_json(content):
-                # Try extracting a valid JSON substring
-                json_candidate = self._extract_json_substring(content)
-                if self._is_valid_json(json_candidate):
-                    return {"status": "success", "data": json.loads(json_candidate)}
-
-                # Re-prompt to force JSON response
-                forced_output = self._force_json_response(content)
-                if self._is_valid_json(forced_output.content):
-                    return {"status": "success", "data": json.loads(forced_output.content)}
-                else:
-                    return {
-                        "status": "error",
-                        "message": "Failed to produce valid JSON after re-prompting.",
-                    }
-            else:
-                return {"status": "success", "data": json.loads(content)}
+            parsed = self._parse_json(content, validator)
+            if parsed is not None:
+                data, repaired = parsed
+                repair_stats.record("repaired" if repaired else "clean")
+                return {"status": "success", "data": data}
+
+            # Re-prompt to force JSON response as a last resort
+            forced_output = self._force_json_response(content)
+            parsed = None
+            if forced_output["status"] == "success":
+                parsed = self._parse_json(forced_output["data"].content.strip(), validator)
+            if parsed is not None:
+                repair_stats.record("reprompted")
+                return {"status": "success", "data": parsed[0]}
+
+            repair_stats.record("failed")
+            return {
+                "status": "error",
+                "message": "Failed to produce valid JSON after re-prompting.",
+            }
 
         # Return the raw response if JSON forcing is not required
         return {"status": "success", "data": output}
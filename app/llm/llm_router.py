@@ -0,0 +1,262 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+
+class CircuitBreaker:
+    """
+    Takes a provider out of rotation after consecutive failures.
+
+    After `reset_timeout` seconds the breaker goes half-open and lets a single
+    trial request through; success closes it, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """
+        Return True if a request may be sent to the provider (reserving the half-open trial).
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def release_trial(self):
+        """Give back a half-open trial reservation whose request was never sent."""
+        self.trial_in_flight = False
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ProviderState:
+    """
+    Latency history and circuit breaker for one connector.
+    """
+
+    def __init__(self, connector, breaker: CircuitBreaker, window: int = 200):
+        self.connector = connector
+        self.name = getattr(connector, "name", None) or f"{connector.api_type}:{connector.model_name}"
+        self.breaker = breaker
+        self.latencies = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.hedges_won = 0
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "hedges_won": self.hedges_won,
+            "ewma_ms": self.ewma * 1000 if self.ewma is not None else None,
+            "p50_ms": self._ms(self.percentile(0.5)),
+            "p95_ms": self._ms(self.percentile(0.95)),
+        }
+
+    @staticmethod
+    def _ms(seconds: Optional[float]) -> Optional[float]:
+        return seconds * 1000 if seconds is not None else None
+
+
+class LLMRouter:
+    """
+    Routes queries over several LLM connectors with latency-aware selection,
+    optional hedging and per-provider circuit breakers.
+
+    The router exposes the same `query(prompt)` interface as LLMConnector, so it can
+    be passed to LLMProcessor in place of a single connector. Any object with a
+    `query(prompt) -> {"status": ..., "data"|"message": ...}` method and a `name`
+    (or `api_type`/`model_name`) attribute can be routed, which keeps it testable
+    with local stand-in connectors.
+    """
+
+    def __init__(
+        self,
+        connectors: List[Any],
+        hedge: bool = False,
+        hedge_percentile: float = 0.95,
+        default_hedge_delay: float = 2.0,
+        min_samples: int = 20,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        ewma_alpha: float = 0.2,
+        max_workers: int = 16,
+    ):
+        """
+        Initialize the router.
+
+        :param connectors: Connectors in order of preference when no latency data is known.
+        :param hedge: If True, fire a second provider when the first misses its hedge deadline.
+        :param hedge_percentile: Latency percentile of the first provider used as the hedge deadline.
+        :param default_hedge_delay: Hedge deadline in seconds until `min_samples` latencies are known.
+        :param min_samples: Number of latency samples needed before the percentile is trusted.
+        :param failure_threshold: Consecutive failures that open a provider's circuit breaker.
+        :param reset_timeout: Seconds an open breaker waits before allowing a trial request.
+        :param ewma_alpha: Smoothing factor for the latency moving average used for ranking.
+        :param max_workers: Size of the thread pool used to run provider calls.
+        """
+        if not connectors:
+            raise ValueError("LLMRouter requires at least one connector.")
+        self.providers = [
+            ProviderState(connector, CircuitBreaker(failure_threshold, reset_timeout))
+            for connector in connectors
+        ]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.ewma_alpha = ewma_alpha
+        self.hedged_requests = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+
+    @property
+    def name(self) -> str:
+        return "router(" + ",".join(provider.name for provider in self.providers) + ")"
+
+    def _ranked_providers(self) -> List[ProviderState]:
+        """
+        Return providers that are not circuit-broken, fastest expected latency first.
+        Providers without latency data keep their configured order ahead of measured ones.
+        """
+        with self._lock:
+            available = [provider for provider in self.providers if provider.breaker.state != "open"]
+        return sorted(available, key=lambda provider: provider.ewma if provider.ewma is not None else -1.0)
+
+    def _hedge_delay(self, provider: ProviderState) -> float:
+        with self._lock:
+            if len(provider.latencies) < self.min_samples:
+                return self.default_hedge_delay
+            return provider.percentile(self.hedge_percentile) or self.default_hedge_delay
+
+    def _call(self, provider: ProviderState, prompt: str) -> Dict[str, Any]:
+        """
+        Query one provider and record its latency and outcome.
+        """
+        start = time.monotonic()
+        try:
+            response = provider.connector.query(prompt)
+        except Exception as e:
+            response = {"status": "error", "message": str(e)}
+        elapsed = time.monotonic() - start
+
+        with self._lock:
+            provider.calls += 1
+            if response.get("status") == "success":
+                provider.latencies.append(elapsed)
+                provider.ewma = (
+                    elapsed
+                    if provider.ewma is None
+                    else self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * provider.ewma
+                )
+                provider.breaker.record_success()
+            else:
+                provider.failures += 1
+                provider.breaker.record_failure()
+        return response
+
+    def query(self, prompt: str) -> Dict[str, Any]:
+        """
+        Query the best available provider, hedging and falling back as configured.
+
+        :param prompt: The input prompt.
+        :return: The winning provider's response, with its name under "provider".
+        """
+        candidates = iter(self._ranked_providers())
+        pending = {}
+        hedges = set()
+        last_error = "No LLM provider is available."
+
+        def launch():
+            for provider in candidates:
+                with self._lock:
+                    allowed = provider.breaker.allow()
+                if allowed:
+                    future = self._executor.submit(self._call, provider, prompt)
+                    pending[future] = provider
+                    return future
+            return None
+
+        launch()
+        while pending:
+            timeout = None
+            if self.hedge and len(pending) == 1:
+                timeout = self._hedge_delay(next(iter(pending.values())))
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            if not done:
+                # The first provider missed its deadline: fire a hedge if one is available
+                hedge = launch()
+                if hedge is not None:
+                    hedges.add(hedge)
+                    with self._lock:
+                        self.hedged_requests += 1
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = pending.pop(future)
+                response = future.result()
+                if response.get("status") == "success":
+                    for loser, loser_provider in pending.items():
+                        # Running calls cannot be interrupted; their results are discarded
+                        if loser.cancel():
+                            # Never started, so it must not keep holding a half-open trial
+                            with self._lock:
+                                loser_provider.breaker.release_trial()
+                    if future in hedges:
+                        with self._lock:
+                            provider.hedges_won += 1
+                    return {**response, "provider": provider.name}
+                last_error = f"{provider.name}: {response.get('message')}"
+
+            # Fall back to the next provider when nothing else is in flight
+            if not pending:
+                launch()
+
+        return {"status": "error", "message": last_error}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return per-provider latency, failure and breaker state.
+        """
+        with self._lock:
+            return {
+                "hedged_requests": self.hedged_requests,
+                "providers": {provider.name: provider.snapshot() for provider in self.providers},
+            }
@@ -1,5 +1,26 @@
-import spacy
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Pipeline components extract_action_key_value never reads (it only uses POS tags,
+# lemmas and named entities), so they are disabled to save time per document.
+UNUSED_COMPONENTS = ("parser", "senter")
+
+KEY_WORDS = {"key", "identifier", "field"}
+VALUE_WORDS = {"value", "data", "entry"}
+
+
+@lru_cache(maxsize=None)
+def load_pipeline(model: str, disable: Tuple[str, ...] = UNUSED_COMPONENTS):
+    """
+    Load a spaCy pipeline once per process.
+
+    :param model: The spaCy model name.
+    :param disable: Pipeline components to disable.
+    :return: The loaded spaCy Language object.
+    """
+    import spacy
+
+    return spacy.load(model, disable=list(disable))
 
 
 class NLPProcessor:
@@ -7,11 +28,27 @@ class NLPProcessor:
     A class for processing natural language inputs to extract action, key, and value using NLP.
     """
 
-    def __init__(self, model: str = "en_core_web_sm"):
+    def __init__(self, model: str = "en_core_web_sm", batch_size: int = 256, n_process: int = 1):
         """
         Initialize the NLPProcessor with a spaCy model.
+
+        spaCy and the model are loaded on first use rather than at construction time,
+        and shared by every NLPProcessor in the process.
+
+        :param model: The spaCy model name.
+        :param batch_size: Default number of texts per batch in extract_many.
+        :param n_process: Default number of worker processes in extract_many.
         """
-        self.nlp = spacy.load(model)
+        self.model = model
+        self.batch_size = batch_size
+        self.n_process = n_process
+
+    @property
+    def nlp(self):
+        """
+        The loaded spaCy pipeline.
+        """
+        return load_pipeline(self.model)
 
     def extract_action_key_value(self, text: str) -> Dict[str, Optional[str]]:
         """
@@ -20,8 +57,30 @@ class NLPProcessor:
         :param text: The input string to process.
         :return: A dictionary containing 'action', 'key', and 'value'.
         """
-        doc = self.nlp(text)
+        return self._extract_from_doc(self.nlp(text))
+
+    def extract_many(
+        self, texts: Iterable[str], batch_size: int = None, n_process: int = None
+    ) -> List[Dict[str, Optional[str]]]:
+        """
+        Extract the action, key, and value from many inputs using spaCy's batched nlp.pipe.
 
+        :param texts: The input strings to process.
+        :param batch_size: Number of texts per batch (default: the processor's batch_size).
+        :param n_process: Number of worker processes (default: the processor's n_process).
+        :return: One dictionary per input, in input order.
+        """
+        docs = self.nlp.pipe(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            n_process=n_process or self.n_process,
+        )
+        return [self._extract_from_doc(doc) for doc in docs]
+
+    def _extract_from_doc(self, doc) -> Dict[str, Optional[str]]:
+        """
+        Extract the action, key, and value from a processed spaCy Doc.
+        """
         action = None
         key = None
         value = None
@@ -32,15 +91,18 @@ class NLPProcessor:
                 action = token.lemma_  # Use the lemma (base form)
                 break
 
-        # Extract potential key-value pairs based on dependency parsing
+        # Extract potential key-value pairs from the token following a marker word
         for token in doc:
+            if token.i + 1 >= len(doc):  # No token to the right
+                break
+            word = token.text.lower()
             # Look for "key" or synonyms in the text
-            if token.text.lower() in {"key", "identifier", "field"}:
+            if word in KEY_WORDS:
                 if token.nbor(1).text:  # Check the token to the right
                     key = token.nbor(1).text.strip("'\"")  # Handle quoted strings
 
             # Look for "value" or synonyms in the text
-            elif token.text.lower() in {"value", "data", "entry"}:
+            elif word in VALUE_WORDS:
                 if token.nbor(1).text:  # Check the token to the right
                     value = token.nbor(1).text.strip("'\"")  # Handle quoted strings
 
@@ -1,6 +1,6 @@
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 from typing import Dict
-from .constants import DEFAULT_TEMPLATE
+from .constants import DEFAULT_TEMPLATE, KV_CONTEXT_TEMPLATE
 
 class PromptManager:
     """
@@ -13,6 +13,7 @@ class PromptManager:
         """
         self.templates = {
             "default": PromptTemplate.from_template(DEFAULT_TEMPLATE),
+            "kv_context": PromptTemplate.from_template(KV_CONTEXT_TEMPLATE),
         }
 
     def format_prompt(
@@ -28,3 +28,32 @@ def db_session(db_engine):
 def kv_store(db_session):
     """Provides a KVStore instance for testing."""
     return KVStore(db_session)
+
+def _clear_dependency_caches(dependencies):
+    for name in dir(dependencies):
+        cached = getattr(dependencies, name)
+        if callable(cached) and hasattr(cached, "cache_clear"):
+            cached.cache_clear()
+
+@pytest.fixture
+def api_client(tmp_path, monkeypatch):
+    """
+    A TestClient for the full API (imported as the `app` package) with its
+    databases in tmp_path, admission control off and an admin user signed in.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ADMISSION", "0")
+    monkeypatch.syspath_prepend(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    from fastapi.testclient import TestClient
+    from app.api import dependencies
+    from app.api.auth import get_current_user
+    from app.api.main import app
+
+    _clear_dependency_caches(dependencies)
+    app.dependency_overrides[get_current_user] = lambda: {"email": "admin@example.com", "is_admin": True}
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        _clear_dependency_caches(dependencies)
@@ -0,0 +1,50 @@
+import asyncio
+from api.admission import AdmissionController, RoutePolicy
+
+
+def test_rate_limits_are_per_principal_and_class():
+    """Test that one user's bucket does not throttle other users or other route classes."""
+    controller = AdmissionController({
+        "kv_read": RoutePolicy(rate=1, burst=2, concurrency=1),
+        "llm": RoutePolicy(rate=1, burst=1, concurrency=1),
+    })
+    assert controller.check_rate("llm", "user:a") == 0
+    retry_after = controller.check_rate("llm", "user:a")
+    assert 0 < retry_after <= 1
+    assert controller.check_rate("llm", "user:b") == 0
+    assert controller.check_rate("kv_read", "user:a") == 0
+    assert controller.check_rate("kv_read", "user:a") == 0
+    assert controller.check_rate("kv_read", "user:a") > 0
+    assert controller.stats()["llm"]["throttled"] == 1
+
+def test_bucket_count_is_bounded():
+    """Test that buckets of inactive principals are dropped."""
+    controller = AdmissionController({"kv_read": RoutePolicy(rate=1, burst=1, concurrency=1)}, max_principals=3)
+    for i in range(10):
+        controller.check_rate("kv_read", f"ip:{i}")
+    assert len(controller._buckets["kv_read"]) == 3
+
+def test_full_pool_sheds_instead_of_queueing():
+    """Test that a full pool queues briefly, then sheds, without touching other classes."""
+    controller = AdmissionController({
+        "llm": RoutePolicy(rate=100, burst=100, concurrency=1, max_queue=1, queue_timeout=0.05),
+        "kv_read": RoutePolicy(rate=100, burst=100, concurrency=1),
+    })
+
+    async def scenario():
+        assert await controller.acquire("llm")
+        # One request may wait (and times out), the next is shed immediately
+        waiter = asyncio.ensure_future(controller.acquire("llm"))
+        await asyncio.sleep(0)
+        assert await controller.acquire("llm") is False
+        assert await waiter is False
+        # Reads have their own pool
+        assert await controller.acquire("kv_read")
+        controller.release("kv_read")
+        controller.release("llm")
+        assert await controller.acquire("llm")
+        controller.release("llm")
+
+    asyncio.run(scenario())
+    stats = controller.stats()["llm"]
+    assert (stats["admitted"], stats["shed"], stats["running"]) == (2, 2, 0)
@@ -0,0 +1,162 @@
+"""End-to-end tests through the HTTP API (see the api_client fixture)."""
+import os
+import time
+
+
+def test_parse_commands_rejects_oversized_batches(api_client):
+    """Test that more commands than MAX_PARSE_COMMANDS are rejected before reaching spaCy."""
+    from app.api.routes import MAX_PARSE_COMMANDS
+
+    response = api_client.post("/llm/parse-commands", json={"commands": ["set key a value b"] * (MAX_PARSE_COMMANDS + 1)})
+    assert response.status_code == 422
+
+def test_json_values_written_through_the_api_are_queryable(api_client):
+    """Test that object values posted to /kv/insert and /kv/update are indexed and matched by /kv/query."""
+    for i in range(6):
+        response = api_client.post("/kv/insert", json={"key": f"host.{i}", "value": {"region": "eu" if i % 2 else "us", "port": 8000 + i}})
+        assert response.status_code == 200
+    api_client.post("/kv/insert", json={"key": "plain", "value": "just a string"})
+
+    created = api_client.post("/kv/indexes", json={"path": "region"}).json()
+    assert created["status"] == "success"
+    assert api_client.put("/kv/update", json={"key": "host.0", "value": {"region": "eu", "port": 9000}}).status_code == 200
+
+    response = api_client.post("/kv/query", json={"where": [{"path": "region", "value": "eu"}]})
+    assert sorted(item["key"] for item in response.json()["data"]) == ["host.0", "host.1", "host.3", "host.5"]
+    assert api_client.get("/kv/get", params={"key": "plain"}).json()["data"]["value"] == "just a string"
+
+def test_gzip_export_posted_to_import(api_client):
+    """Test that a gzip export uploaded to /kv/import is loaded, and that a malformed one is a 400."""
+    from app.backend.bulk import export_stream
+    from app.backend.db_setup import get_engine, get_session, init_db
+    from app.backend.kv_store import KVStore
+
+    source_engine = get_engine("sqlite:///source.db")
+    init_db(source_engine)
+    KVStore(get_session(source_engine)).insert("imported.a", {"n": 1})
+    exported = b"".join(export_stream(source_engine))
+
+    response = api_client.post("/kv/import", content=exported)
+    assert response.status_code == 200
+    assert response.json()["data"]["keys"] == 1
+    assert api_client.get("/kv/get", params={"key": "imported.a"}).json()["data"]["value"] == {"n": 1}
+
+    malformed = b'{"format": "kv-export", "version": 1}\n{"key": "imported.b", "value": 2}\nnot json\n'
+    response = api_client.post("/kv/import", content=malformed)
+    assert response.status_code == 400
+
+def test_get_returns_the_value_once(api_client):
+    """Test that /kv/get serializes the value only in `data`, not again in the message."""
+    api_client.post("/kv/insert", json={"key": "big", "value": {"blob": "x" * 1000}})
+    response = api_client.get("/kv/get", params={"key": "big"})
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["data"]["value"] == {"blob": "x" * 1000}
+    assert response.content.count(b"x" * 1000) == 1
+
+def test_replica_has_no_key_index(tmp_path, monkeypatch):
+    """Test that key context is disabled on a read replica, whose copy the index would not follow."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("KV_FOLLOW", f"sqlite:///{tmp_path / 'primary.db'}")
+    monkeypatch.syspath_prepend(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+    from app.api import dependencies
+
+    for cached in (dependencies.get_follower, dependencies.get_kv_engine, dependencies.get_key_index):
+        cached.cache_clear()
+    try:
+        assert dependencies.get_follower() is not None
+        assert dependencies.get_key_index() is None
+    finally:
+        for cached in (dependencies.get_follower, dependencies.get_kv_engine, dependencies.get_key_index):
+            cached.cache_clear()
+
+def test_background_job_reading_revisions(api_client, monkeypatch):
+    """Test that a job whose results hold revision timestamps is stored and succeeds."""
+    from app.api import llm_control
+
+    class StandInLLM:
+        def generate_response(self, **kwargs):
+            return {"status": "success", "data": [{"action": "get_revisions", "key": "job.k"}]}
+
+    monkeypatch.setattr(llm_control, "get_llm_processor", StandInLLM)
+    api_client.post("/kv/insert", json={"key": "job.k", "value": 1})
+    api_client.put("/kv/update", json={"key": "job.k", "value": 2})
+
+    job = api_client.post("/llm/jobs", json={"prompt": "show the history of job.k"}).json()["data"]
+    for _ in range(500):
+        job = api_client.get(f"/llm/jobs/{job['id']}").json()["data"]
+        if job["status"] in ("succeeded", "failed"):
+            break
+        time.sleep(0.01)
+    assert job["status"] == "succeeded", job["error"]
+    revision = job["result"][0]["data"][0]
+    assert revision["value"] == 1 and isinstance(revision["created_at"], str)
+
+def test_control_kv_does_not_act_on_a_similar_key(api_client):
+    """Test that a delete and a get of a missing key leave its sibling alone and only suggest it."""
+    from app.api.dependencies import get_llm_processor
+    from app.api.main import app
+
+    class StandInLLM:
+        def generate_response(self, **kwargs):
+            return {"status": "success", "data": [{"action": "delete", "key": "user_profile_2"}, {"action": "get", "key": "user_profile_2"}]}
+
+    app.dependency_overrides[get_llm_processor] = StandInLLM
+    api_client.post("/kv/insert", json={"key": "user_profile_3", "value": "keep me"})
+
+    results = api_client.post("/llm/control-kv", json={"prompt": "delete user profile 2"}).json()
+    assert [(result["status"], result["suggested_key"]) for result in results] == [("error", "user_profile_3")] * 2
+    assert api_client.get("/kv/get", params={"key": "user_profile_3"}).json()["data"]["value"] == "keep me"
+
+def _replica(monkeypatch, tmp_path, caught_up_at):
+    """Make the app act as a read replica whose copy matched the primary at `caught_up_at`."""
+    from app.api import main
+    from app.backend.db_setup import get_engine
+    from app.backend.replication import Follower, LocalPrimarySource
+
+    follower = Follower(LocalPrimarySource(get_engine(f"sqlite:///{tmp_path / 'primary.db'}")), None, max_lag=5.0)
+    follower.caught_up_at = caught_up_at
+    monkeypatch.setattr(main, "get_follower", lambda: follower)
+    return follower
+
+def test_replica_serves_reads_within_max_lag(api_client, monkeypatch, tmp_path):
+    """Test that a replica answers reads with X-Replication-Lag while fresh, and 503s once behind."""
+    api_client.post("/kv/insert", json={"key": "replicated", "value": 1})
+    follower = _replica(monkeypatch, tmp_path, time.monotonic())
+
+    response = api_client.get("/kv/get", params={"key": "replicated"})
+    assert response.status_code == 200
+    assert 0 <= float(response.headers["X-Replication-Lag"]) < follower.max_lag
+
+    follower.caught_up_at = time.monotonic() - 2 * follower.max_lag
+    response = api_client.get("/kv/get", params={"key": "replicated"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "1"
+    follower.caught_up_at = None
+    assert api_client.get("/kv/get_all_pairs").status_code == 503
+
+def test_replica_redirects_writes_to_the_primary(api_client, monkeypatch, tmp_path):
+    """Test that a replica redirects writes to KV_PRIMARY_URL with a 307, and 503s without one."""
+    _replica(monkeypatch, tmp_path, time.monotonic())
+    response = api_client.delete("/kv/delete", params={"key": "a"}, follow_redirects=False)
+    assert response.status_code == 503
+
+    monkeypatch.setenv("KV_PRIMARY_URL", "http://primary:8000/")
+    response = api_client.delete("/kv/delete", params={"key": "a"}, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["Location"] == "http://primary:8000/kv/delete?key=a"
+
+def test_jobs_require_a_signed_in_owner(api_client):
+    """Test that anonymous clients cannot submit or read jobs, and users do not share jobs or idempotency keys."""
+    from app.api.auth import get_current_user
+    from app.api.main import app
+
+    submitted = api_client.post("/llm/jobs", json={"prompt": "noop"}, headers={"Idempotency-Key": "k1"}).json()["data"]
+
+    app.dependency_overrides.pop(get_current_user)
+    # A missing Authorization header fails validation, like on every signed-in route
+    assert api_client.post("/llm/jobs", json={"prompt": "noop"}, headers={"Idempotency-Key": "k1"}).status_code == 422
+    assert api_client.get(f"/llm/jobs/{submitted['id']}", headers={"Authorization": "Basic x"}).status_code == 401
+
+    app.dependency_overrides[get_current_user] = lambda: {"email": "other@example.com", "is_admin": False}
+    assert api_client.get(f"/llm/jobs/{submitted['id']}").status_code == 404
+    other = api_client.post("/llm/jobs", json={"prompt": "noop"}, headers={"Idempotency-Key": "k1"}).json()["data"]
+    assert other["id"] != submitted["id"]
@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+import tempfile
+import pytest
+from backend.bulk import export_stream, import_file, import_records, read_records
+from backend.db_setup import KeyValueEvent, get_engine, get_session, init_db
+from backend.kv_store import KVStore
+
+
+def _store(tmp_path, name):
+    engine = get_engine(f"sqlite:///{tmp_path / name}")
+    init_db(engine)
+    return engine, KVStore(get_session(engine))
+
+def test_export_and_import_round_trip(tmp_path):
+    """Test that keys, revisions, versions and indexes survive an export/import round trip."""
+    source_engine, source = _store(tmp_path, "source.db")
+    for i in range(25):
+        source.insert(f"bulk.{i}", {"n": i, "region": "eu" if i % 2 else "us"})
+    source.update("bulk.3", {"n": 30, "region": "ap"})
+    source.update("bulk.3", {"n": 31, "region": "ap"})
+    source.insert("bulk.lease", "v", ttl=600)
+
+    exported = b"".join(export_stream(source_engine, batch_size=10))
+    lines = gzip.decompress(exported).splitlines()
+    assert json.loads(lines[0])["format"] == "kv-export"
+    assert len(lines) == 27
+
+    target_engine, target = _store(tmp_path, "target.db")
+    target.create_index("region")
+    counts = import_file(target_engine, io.BytesIO(exported), batch_size=7)
+    assert counts == {"keys": 26, "revisions": 2, "skipped": 0, "replaced": 0}
+
+    assert target.get("bulk.3")["data"]["value"] == {"n": 31, "region": "ap"}
+    assert target.get("bulk.3")["data"]["version"] == 3
+    assert [rev["value"]["n"] for rev in target.get_revisions("bulk.3")["data"]] == [3, 30]
+    assert "expires_at" in target.get("bulk.lease")["data"]
+    assert target.update("bulk.3", {"n": 32, "region": "ap"}, expected_version=3)["version"] == 4
+    assert [item["key"] for item in target.query([{"path": "region", "value": "ap"}])["data"]] == ["bulk.3"]
+    assert [item["key"] for item in target.search("bulk.24", prefix=False)["data"]] == ["bulk.24"]
+
+def test_import_skips_or_replaces_existing_keys(tmp_path):
+    """Test conflict handling for keys that already exist in the target."""
+    source_engine, source = _store(tmp_path, "source.db")
+    source.insert("shared", "from export")
+    source.insert("only.exported", "new")
+    exported = b"".join(export_stream(source_engine))
+
+    target_engine, target = _store(tmp_path, "target.db")
+    target.insert("shared", "local")
+    counts = import_file(target_engine, io.BytesIO(exported))
+    assert (counts["keys"], counts["skipped"]) == (1, 1)
+    assert target.get("shared")["data"]["value"] == "local"
+
+    counts = import_file(target_engine, io.BytesIO(exported), replace=True)
+    assert (counts["keys"], counts["replaced"]) == (2, 2)
+    assert target.get("shared")["data"]["value"] == "from export"
+
+def test_read_records_rejects_other_files():
+    """Test that arbitrary files are not imported."""
+    with pytest.raises(ValueError):
+        list(read_records(io.BytesIO(b'{"key": "a"}\n')))
+    plain = b'{"format": "kv-export", "version": 1}\n{"key": "a", "value": 1}\n'
+    assert list(read_records(io.BytesIO(plain))) == [{"key": "a", "value": 1}]
+
+def test_import_reads_gzip_from_a_spooled_temporary_file(tmp_path):
+    """Test that a gzip export is read from a w+b temporary file, as POST /kv/import spools uploads."""
+    source_engine, source = _store(tmp_path, "source.db")
+    source.insert("spooled", {"n": 1})
+    target_engine, target = _store(tmp_path, "target.db")
+    with tempfile.SpooledTemporaryFile(max_size=1024) as upload:
+        upload.write(b"".join(export_stream(source_engine)))
+        upload.seek(0)
+        assert import_file(target_engine, upload)["keys"] == 1
+    assert target.get("spooled")["data"]["value"] == {"n": 1}
+
+def test_import_indexes_batches_committed_before_a_bad_record(tmp_path):
+    """Test that a malformed record fails the import with ValueError, but the keys already imported are indexed."""
+    engine, store = _store(tmp_path, "target.db")
+    store.create_index("region")
+    records = [{"key": f"ok.{i}", "value": {"region": "eu"}} for i in range(3)] + [{"value": "no key"}]
+    with pytest.raises(ValueError, match="Record 4"):
+        import_records(engine, records, batch_size=2)
+    assert store.get("ok.1")["data"]["value"] == {"region": "eu"}
+    assert [item["key"] for item in store.query([{"path": "region", "value": "eu"}])["data"]] == ["ok.0", "ok.1"]
+    with get_session(engine) as session:
+        assert session.query(KeyValueEvent).filter_by(action="import").count() == 1
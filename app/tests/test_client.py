@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import json
+import time
+import httpx
+import pytest
+from client import APIError, AsyncKVClient, KVClient, RetryPolicy
+from client._common import token_expiry
+
+
+def make_token(expires_in):
+    """Build an unsigned JWT-shaped token with the given lifetime."""
+    payload = json.dumps({"sub": "admin@example.com", "exp": int(time.time() + expires_in)}).encode()
+    return "header." + base64.urlsafe_b64encode(payload).decode().rstrip("=") + ".signature"
+
+
+class FakeAPI:
+    """Records requests and answers from a queue of (status, body) per path."""
+
+    def __init__(self, token_lifetime=1800):
+        self.token_lifetime = token_lifetime
+        self.requests = []
+        self.responses = {}
+        self.logins = 0
+
+    def __call__(self, request):
+        self.requests.append(request)
+        if request.url.path == "/auth/login":
+            self.logins += 1
+            return httpx.Response(200, json={"access_token": make_token(self.token_lifetime), "token_type": "bearer"})
+        queue = self.responses.get(request.url.path)
+        status, body = queue.pop(0) if queue else (200, {"status": "success"})
+        return httpx.Response(status, json=body)
+
+def make_client(api, **kwargs):
+    return KVClient(transport=httpx.MockTransport(api), retry=RetryPolicy(attempts=3, backoff=0), **kwargs)
+
+
+def test_token_expiry_is_read_from_jwt():
+    """Test decoding the exp claim without verification."""
+    assert abs(token_expiry(make_token(60)) - (time.time() + 60)) < 2
+    assert token_expiry("not-a-jwt") is None
+
+def test_login_keeps_token_in_memory():
+    """Test that calls after login carry the bearer token."""
+    api = FakeAPI()
+    client = make_client(api)
+    client.login("admin@example.com", "secret")
+    client.get("a")
+    assert api.requests[-1].headers["Authorization"].startswith("Bearer ")
+
+def test_relogin_before_expiry():
+    """Test automatic re-login when the token is about to expire."""
+    api = FakeAPI(token_lifetime=30)
+    client = make_client(api, refresh_margin=60)
+    client.login("admin@example.com", "secret")
+    client.get("a")
+    assert api.logins == 2
+
+def test_get_is_retried_on_503():
+    """Test that idempotent reads are retried on transient statuses."""
+    api = FakeAPI()
+    api.responses["/kv/get"] = [(503, {"detail": "busy"}), (200, {"status": "success", "data": {"key": "a"}})]
+    assert make_client(api).get("a")["data"] == {"key": "a"}
+    assert len(api.requests) == 2
+
+def test_insert_is_not_retried_on_503():
+    """Test that non-idempotent writes surface the error instead of replaying."""
+    api = FakeAPI()
+    api.responses["/kv/insert"] = [(503, {"detail": "busy"})]
+    with pytest.raises(APIError) as error:
+        make_client(api).insert("a", "1")
+    assert error.value.status_code == 503
+    assert len(api.requests) == 1
+
+def test_gather_bounds_and_collects_errors():
+    """Test bulk fan-out returning errors in place."""
+    api = FakeAPI()
+    api.responses["/kv/get"] = [(404, {"detail": "missing"})]
+    results = make_client(api).get_many(["a", "b", "c"], concurrency=2)
+    assert sum(isinstance(result, APIError) for result in results) == 1
+    assert len(results) == 3
+
+def test_async_client_routes_and_retries():
+    """Test the async client against the same fake API."""
+    api = FakeAPI()
+    api.responses["/kv/get_revisions"] = [(502, {"detail": "bad gateway"}), (200, {"status": "success", "data": []})]
+
+    async def run():
+        async with AsyncKVClient(transport=httpx.MockTransport(api), retry=RetryPolicy(backoff=0)) as client:
+            await client.login("admin@example.com", "secret")
+            revisions = await client.get_revisions("a")
+            inserted = await client.insert_many({"a": "1", "b": "2"})
+            return revisions, inserted
+
+    revisions, inserted = asyncio.run(run())
+    assert revisions["data"] == []
+    assert len(inserted) == 2
+    assert [r.url.path for r in api.requests].count("/kv/get_revisions") == 2
+
+def test_submit_job_is_retried_with_the_same_idempotency_key():
+    """Test that job submissions carry an Idempotency-Key, which makes retrying the POST safe."""
+    api = FakeAPI()
+    api.responses["/llm/jobs"] = [(503, {"detail": "busy"}), (202, {"status": "success", "data": {"id": "j1", "status": "queued"}})]
+    client = make_client(api)
+    assert client.submit_job("set a to 1")["data"]["id"] == "j1"
+    keys = [request.headers["Idempotency-Key"] for request in api.requests]
+    assert len(keys) == 2 and keys[0] == keys[1]
+
+def test_writes_redirected_by_a_replica_follow_only_to_the_primary():
+    """Test that a replica's 307 is followed with the token to primary_url, and refused otherwise."""
+    api = FakeAPI()
+
+    def replica_then_primary(request):
+        if request.url.host == "replica" and request.method != "GET":
+            location = f"http://primary:8000{request.url.path}" + (f"?{request.url.query.decode()}" if request.url.query else "")
+            return httpx.Response(307, headers={"Location": location})
+        return api(request)
+
+    client = KVClient(base_url="http://replica:8000", token=make_token(600), primary_url="http://primary:8000/",
+                      transport=httpx.MockTransport(replica_then_primary))
+    assert client.delete("a")["status"] == "success"
+    forwarded = api.requests[-1]
+    assert (forwarded.url.host, str(forwarded.url.params)) == ("primary", "key=a")
+    assert forwarded.headers["Authorization"].startswith("Bearer ")
+
+    client = KVClient(base_url="http://replica:8000", token=make_token(600), transport=httpx.MockTransport(replica_then_primary))
+    with pytest.raises(APIError) as error:
+        client.insert("a", 1)
+    assert error.value.status_code == 307 and "primary" in error.value.detail
@@ -0,0 +1,55 @@
+import pytest
+from backend.db_setup import KeyValueEvent, get_engine, get_session, init_db
+from backend.event_bus import EventBus
+from backend.kv_store import KVStore
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """A file-backed database shared by several sessions, like separate workers."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    return engine
+
+def test_poll_delivers_mutations_from_other_sessions(file_engine):
+    """Test that mutations made through another session reach the bus in order."""
+    bus = EventBus(file_engine)
+    received = []
+    bus.subscribe(received.extend)
+
+    writer = KVStore(get_session(file_engine))
+    writer.insert("bus.key", {"value": "v1"})
+    writer.update("bus.key", {"value": "v2"})
+    writer.delete("bus.key")
+
+    events = bus.poll()
+    assert [(e["key"], e["action"]) for e in events] == [
+        ("bus.key", "insert"),
+        ("bus.key", "update"),
+        ("bus.key", "delete"),
+    ]
+    assert received == events
+    assert bus.poll() == []
+
+def test_bus_starts_at_end_of_log(file_engine):
+    """Test that a new bus does not replay events from before it started."""
+    KVStore(get_session(file_engine)).insert("old.key", {"value": "v"})
+    bus = EventBus(file_engine)
+    assert bus.poll() == []
+
+def test_failed_mutation_records_no_event(file_engine):
+    """Test that events are written in the same transaction as the change."""
+    store = KVStore(get_session(file_engine))
+    store.insert("dup.key", {"value": "v"})
+    bus = EventBus(file_engine)
+    assert store.insert("dup.key", {"value": "v"})["status"] == "error"
+    assert store.update("missing.key", {"value": "v"})["status"] == "error"
+    assert bus.poll() == []
+
+def test_prune_removes_old_events(file_engine):
+    """Test that pruning deletes events outside the retention window."""
+    KVStore(get_session(file_engine)).insert("prune.key", {"value": "v"})
+    bus = EventBus(file_engine, retention_seconds=-60)
+    assert bus.prune() == 1
+    session = get_session(file_engine)
+    assert session.query(KeyValueEvent).count() == 0
@@ -0,0 +1,82 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from backend.db_setup import KeyValue, KeyValueRevision, get_engine, get_session, init_db
+from backend.expiry import ExpirySweeper
+from backend.kv_store import KVStore, expiry_stats
+
+
+def _expire(kv_store, key):
+    """Move a key's expiry into the past instead of sleeping."""
+    entry = kv_store.session.query(KeyValue).filter(KeyValue.key == key).first()
+    entry.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    kv_store.session.commit()
+
+def test_expired_keys_read_as_missing(kv_store):
+    """Test that expired keys disappear from every read path before they are swept."""
+    kv_store.insert("ttl.session", {"user": "alice"}, ttl=60)
+    kv_store.insert("ttl.forever", {"user": "bob"})
+    assert "expires_at" in kv_store.get("ttl.session")["data"]
+    assert "expires_at" not in kv_store.get("ttl.forever")["data"]
+
+    reads = expiry_stats.snapshot()["expired_reads"]
+    _expire(kv_store, "ttl.session")
+    assert kv_store.get("ttl.session")["status"] == "error"
+    assert kv_store.update("ttl.session", {"user": "carol"})["status"] == "error"
+    assert "ttl.session" not in {item["key"] for item in kv_store.get_all_key_values()["data"]}
+    assert expiry_stats.snapshot()["expired_reads"] > reads
+
+    # Inserting over an expired key replaces it
+    assert kv_store.insert("ttl.session", {"user": "dave"})["status"] == "success"
+    assert kv_store.get("ttl.session")["data"]["value"] == {"user": "dave"}
+
+def test_update_keeps_or_resets_expiry(kv_store):
+    """Test that update keeps the expiry unless a new ttl is given."""
+    kv_store.insert("ttl.lease", {"owner": "a"}, ttl=60)
+    expires_at = kv_store.get("ttl.lease")["data"]["expires_at"]
+    kv_store.update("ttl.lease", {"owner": "b"})
+    assert kv_store.get("ttl.lease")["data"]["expires_at"] == expires_at
+    time.sleep(0.01)
+    kv_store.update("ttl.lease", {"owner": "c"}, ttl=60)
+    assert kv_store.get("ttl.lease")["data"]["expires_at"] > expires_at
+
+def test_sweep_deletes_in_bounded_batches(tmp_path):
+    """Test that the sweeper deletes only expired keys, with their revisions, batch by batch."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    kv_store = KVStore(get_session(engine))
+    for i in range(5):
+        kv_store.insert(f"sweep.{i}", {"n": i}, ttl=60)
+        kv_store.update(f"sweep.{i}", {"n": i + 1})
+        _expire(kv_store, f"sweep.{i}")
+    kv_store.insert("sweep.live", {"n": 0}, ttl=60)
+
+    assert kv_store.sweep_expired(batch_size=2) == 2
+    swept = expiry_stats.snapshot()["swept"]
+    assert ExpirySweeper(engine, batch_size=2, max_batches=1).sweep() == 2
+    assert ExpirySweeper(engine, batch_size=2).sweep() == 1
+    assert ExpirySweeper(engine, batch_size=2).sweep() == 0
+    assert expiry_stats.snapshot()["swept"] == swept + 3
+
+    session = get_session(engine)
+    assert [entry.key for entry in session.query(KeyValue)] == ["sweep.live"]
+    assert session.query(KeyValueRevision).count() == 0
+    actions = [row.action for row in session.execute(text("SELECT action FROM key_value_events"))]
+    assert actions.count("expire") == 5
+
+def test_init_db_adds_expiry_column_to_old_databases(tmp_path):
+    """Test that databases created before TTL support are migrated in place."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE key_value_store (id INTEGER PRIMARY KEY, key VARCHAR UNIQUE NOT NULL, "
+            "value JSON NOT NULL, created_at DATETIME, updated_at DATETIME)"
+        )
+        connection.exec_driver_sql("INSERT INTO key_value_store (key, value) VALUES ('old.key', '\"v\"')")
+    init_db(engine)
+
+    kv_store = KVStore(get_session(engine))
+    assert kv_store.get("old.key")["data"]["value"] == "v"
+    assert kv_store.insert("new.key", "v", ttl=60)["status"] == "success"
+    indexes = [row[1] for row in engine.connect().exec_driver_sql("PRAGMA index_list(key_value_store)")]
+    assert "ix_key_value_store_expires_at" in indexes
@@ -0,0 +1,53 @@
+import threading
+import pytest
+from backend.db_setup import KeyValue, get_engine, get_session, init_db
+from backend.group_commit import GroupCommitWriter
+from backend.kv_store import KVStore
+
+
+@pytest.fixture
+def writer(tmp_path):
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    writer = GroupCommitWriter(engine, max_delay=0.01)
+    yield writer
+    writer.close()
+
+def test_concurrent_writes_share_commits(writer):
+    """Test that concurrent writers are acknowledged after being committed in groups."""
+    results = []
+
+    def worker(i):
+        results.append(writer.insert(f"group.{i}", {"n": i}))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(result["status"] == "success" for result in results)
+    assert writer.stats()["operations"] == 40
+    assert writer.stats()["groups"] < 40
+    store = KVStore(get_session(writer.bind))
+    assert store.session.query(KeyValue).count() == 40
+    assert store.get("group.7")["data"]["value"] == {"n": 7}
+
+def test_failed_write_does_not_affect_its_group(writer):
+    """Test that each write in a group succeeds or fails on its own."""
+    futures = [
+        writer.submit("insert", "dup", {"n": 1}),
+        writer.submit("insert", "dup", {"n": 2}),
+        writer.submit("update", "missing", {"n": 3}),
+        writer.submit("update", "dup", {"n": 4}, expected_version=1),
+        writer.submit("update", "dup", {"n": 5}, expected_version=1),
+    ]
+    results = [future.result() for future in futures]
+    assert [result["status"] for result in results] == ["success", "error", "error", "success", "conflict"]
+
+    store = KVStore(get_session(writer.bind))
+    assert store.get("dup")["data"] == {"key": "dup", "value": {"n": 4}, "version": 2}
+    assert [rev["value"] for rev in store.get_revisions("dup")["data"]] == [{"n": 1}]
+
+    assert writer.delete("dup", expected_version=2)["status"] == "success"
+    assert store.get("dup")["status"] == "error"
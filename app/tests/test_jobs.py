@@ -0,0 +1,117 @@
+import threading
+import pytest
+from backend.db_setup import LLMJob, get_engine, get_session, init_db
+from backend.jobs import JobRunner, QueueFull
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    return engine
+
+def wait_for(runner, job_id):
+    for _ in range(500):
+        job = runner.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        threading.Event().wait(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_jobs_run_in_background_and_store_results(file_engine):
+    """Test that results and errors are stored and finished jobs are pushed to subscribers."""
+    def handler(request):
+        if request["prompt"] == "fail":
+            raise RuntimeError("No actions found in the LLM response")
+        return [{"status": "success", "echo": request["prompt"]}]
+
+    runner = JobRunner(file_engine, handler, workers=2)
+    finished = []
+    runner.subscribe(finished.append)
+    ok, created = runner.submit({"prompt": "hello"}, owner="user:a@example.com")
+    assert created and ok["status"] == "queued"
+    failed, _ = runner.submit({"prompt": "fail"}, owner="user:a@example.com")
+
+    assert wait_for(runner, ok["id"])["result"] == [{"status": "success", "echo": "hello"}]
+    assert wait_for(runner, failed["id"])["error"] == "No actions found in the LLM response"
+    assert runner.get(ok["id"], owner="user:b@example.com") is None
+    runner.close()
+    assert sorted(job["status"] for job in finished) == ["failed", "succeeded"]
+    stats = runner.stats()
+    assert (stats["succeeded"], stats["failed"], stats["queued"], stats["running"]) == (1, 1, 0, 0)
+
+def test_idempotency_key_and_bounded_queue(file_engine):
+    """Test that a repeated idempotency key returns the first job and a full queue rejects submissions."""
+    release = threading.Event()
+    calls = []
+
+    def handler(request):
+        calls.append(request["prompt"])
+        release.wait(5)
+        return []
+
+    runner = JobRunner(file_engine, handler, workers=1, max_queue=2)
+    first, created = runner.submit({"prompt": "p1"}, owner="ip:1.2.3.4", idempotency_key="k1")
+    again, created_again = runner.submit({"prompt": "p1"}, owner="ip:1.2.3.4", idempotency_key="k1")
+    assert created and not created_again and again["id"] == first["id"]
+    # The same key from someone else is a different job
+    other, _ = runner.submit({"prompt": "p1"}, owner="ip:5.6.7.8", idempotency_key="k1")
+    assert other["id"] != first["id"]
+
+    for _ in range(100):
+        if runner.running:
+            break
+        threading.Event().wait(0.01)
+    third, _ = runner.submit({"prompt": "p3"}, owner="ip:1.2.3.4")
+    with pytest.raises(QueueFull):
+        runner.submit({"prompt": "p4"}, owner="ip:1.2.3.4")
+    assert runner.stats()["queued"] == 2
+
+    release.set()
+    wait_for(runner, third["id"])
+    runner.close()
+    assert sorted(calls) == ["p1", "p1", "p3"]
+    assert runner.stats()["deduplicated"] == 1 and runner.stats()["rejected"] == 1
+
+def test_unfinished_jobs_of_stopped_processes_are_failed(file_engine):
+    """Test that jobs left queued by a process that is gone are failed when a runner starts."""
+    with get_session(file_engine) as session:
+        session.add(LLMJob(id="orphan", owner="ip:x", status="running", request={"prompt": "p"}, worker_pid=2 ** 22 + 1))
+        session.commit()
+    runner = JobRunner(file_engine, lambda request: [], workers=1)
+    job = runner.get("orphan")
+    assert job["status"] == "failed" and "restart" in job["error"]
+    runner.close()
+
+def test_close_cancels_waiting_jobs(file_engine):
+    """Test that shutting down lets the running job finish and fails the ones still queued."""
+    release = threading.Event()
+    runner = JobRunner(file_engine, lambda request: release.wait(5) and [], workers=1)
+    running, _ = runner.submit({"prompt": "p1"}, owner="ip:x")
+    waiting, _ = runner.submit({"prompt": "p2"}, owner="ip:x")
+    for _ in range(100):
+        if runner.running:
+            break
+        threading.Event().wait(0.01)
+    threading.Timer(0.05, release.set).start()
+    runner.close()
+    assert runner.get(running["id"])["status"] == "succeeded"
+    assert runner.get(waiting["id"])["status"] == "failed"
+
+def test_worker_survives_database_errors(file_engine):
+    """Test that a job whose state cannot be stored does not stop its worker or leak counters."""
+    runner = JobRunner(file_engine, lambda request: [request["prompt"]], workers=1)
+    update = runner._update
+
+    def locked_for_first_job(job_id, **values):
+        if job_id == first["id"]:
+            raise RuntimeError("database is locked")
+        return update(job_id, **values)
+
+    runner._update = locked_for_first_job
+    first, _ = runner.submit({"prompt": "p1"}, owner="ip:x")
+    second, _ = runner.submit({"prompt": "p2"}, owner="ip:x")
+    assert wait_for(runner, second["id"])["result"] == ["p2"]
+    runner.close()
+    stats = runner.stats()
+    assert (stats["succeeded"], stats["failed"], stats["running"], stats["queued"]) == (1, 1, 0, 0)
@@ -0,0 +1,59 @@
+import pytest
+from backend.json_index import extract, normalize_path, parse_path, _MISSING
+
+
+def test_parse_and_extract_paths():
+    """Test path parsing and scalar extraction from nested values."""
+    assert parse_path("$.db.port") == ["db", "port"]
+    assert normalize_path("$.db.port") == "db.port"
+    with pytest.raises(ValueError):
+        parse_path("db..port")
+
+    value = {"db": {"port": 5432, "hosts": ["a", "b"]}, "region": "eu"}
+    assert extract(value, ["db", "port"]) == 5432
+    assert extract(value, ["db", "hosts", "1"]) == "b"
+    assert extract(value, ["db"]) is _MISSING
+    assert extract("plain", ["region"]) is _MISSING
+
+def test_query_requires_index(kv_store):
+    """Test that queries on undeclared paths are rejected instead of scanned."""
+    response = kv_store.query([{"path": "region", "op": "eq", "value": "eu"}])
+    assert response["status"] == "error"
+    assert "not indexed" in response["message"]
+
+def test_create_index_backfills_and_queries(kv_store):
+    """Test equality and range predicates on backfilled and newly written keys."""
+    kv_store.insert("index.a", {"region": "eu", "db": {"port": 5432}})
+    kv_store.insert("index.b", {"region": "us", "db": {"port": 6432}})
+
+    assert kv_store.create_index("region")["status"] == "success"
+    assert kv_store.create_index("$.db.port")["status"] == "success"
+    assert kv_store.create_index("region")["status"] == "error"
+    assert set(kv_store.list_indexes()["data"]) >= {"region", "db.port"}
+
+    kv_store.insert("index.c", {"region": "eu", "db": {"port": 7000}})
+
+    response = kv_store.query([{"path": "region", "op": "eq", "value": "eu"}])
+    assert [item["key"] for item in response["data"]] == ["index.a", "index.c"]
+
+    response = kv_store.query([
+        {"path": "region", "op": "eq", "value": "eu"},
+        {"path": "db.port", "op": "gt", "value": 6000},
+    ])
+    assert [item["key"] for item in response["data"]] == ["index.c"]
+
+    response = kv_store.query([{"path": "db.port", "op": "lte", "value": 6432}], limit=1)
+    assert [item["key"] for item in response["data"]] == ["index.a"]
+    assert response["has_more"] is True
+
+def test_index_follows_updates_and_deletes(kv_store):
+    """Test that index entries track the current value of each key."""
+    kv_store.update("index.a", {"region": "ap", "db": {"port": 5432}})
+    kv_store.delete("index.c")
+    response = kv_store.query([{"path": "region", "op": "eq", "value": "eu"}])
+    assert response["data"] == []
+    response = kv_store.query([{"path": "region", "op": "eq", "value": "ap"}])
+    assert [item["key"] for item in response["data"]] == ["index.a"]
+
+    assert kv_store.drop_index("region")["status"] == "success"
+    assert kv_store.query([{"path": "region", "value": "ap"}])["status"] == "error"
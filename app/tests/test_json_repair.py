@@ -0,0 +1,57 @@
+import pytest
+from llm.json_repair import JSONRepairStats, parse_json_response, repair_json, validate_actions
+
+
+def test_clean_json_is_not_repaired():
+    """Test that valid JSON is parsed strictly."""
+    data, repaired = parse_json_response('[{"action": "get", "key": "a"}]')
+    assert data == [{"action": "get", "key": "a"}]
+    assert repaired is False
+
+def test_repair_code_fence_and_trailing_comma():
+    """Test stripping a Markdown code fence and a trailing comma."""
+    text = '```json\n[{"action": "insert", "key": "a", "value": "1"},]\n```'
+    data, repaired = parse_json_response(text)
+    assert repaired is True
+    assert data == [{"action": "insert", "key": "a", "value": "1"}]
+
+def test_repair_single_quotes_and_unquoted_keys():
+    """Test single-quoted strings, unquoted keys and Python literals."""
+    text = "Here you go: [{'action': 'update', key: 'b', value: 'x'}, {action: delete, key: c, value: None}]"
+    assert repair_json(text) == [
+        {"action": "update", "key": "b", "value": "x"},
+        {"action": "delete", "key": "c", "value": None},
+    ]
+
+def test_repair_truncated_array_drops_incomplete_element():
+    """Test that a truncated array keeps only its complete elements."""
+    text = '[{"action": "insert", "key": "a", "value": "1"}, {"action": "insert", "key": "b", "val'
+    assert repair_json(text) == [{"action": "insert", "key": "a", "value": "1"}]
+
+def test_repair_without_json_fails():
+    """Test that text without any JSON raises ValueError."""
+    with pytest.raises(ValueError):
+        repair_json("I could not understand the request.")
+
+def test_validate_wraps_single_object():
+    """Test that a single action object is accepted where an array was expected."""
+    assert validate_actions({"action": "Get", "key": " a "}) == [{"action": "get", "key": "a", "value": None}]
+
+def test_validate_rejects_bad_actions():
+    """Test schema violations."""
+    with pytest.raises(ValueError):
+        validate_actions([{"action": "drop", "key": "a"}])
+    with pytest.raises(ValueError):
+        validate_actions([{"action": "insert", "key": "a"}])
+    with pytest.raises(ValueError):
+        validate_actions([{"action": "delete", "key": ""}])
+
+def test_repair_stats_rates():
+    """Test the repair and re-prompt rates."""
+    stats = JSONRepairStats()
+    for outcome in ("clean", "clean", "repaired", "reprompted"):
+        stats.record(outcome)
+    snapshot = stats.snapshot()
+    assert snapshot["total"] == 4
+    assert snapshot["repair_rate"] == 0.25
+    assert snapshot["reprompt_rate"] == 0.25
@@ -0,0 +1,83 @@
+from backend.db_setup import get_engine, get_session, init_db
+from backend.event_bus import EventBus
+from backend.key_index import KeyIndex, suggest_action_keys, trigrams
+from backend.kv_store import KVStore
+
+
+def test_candidates_and_nearest():
+    """Test that prompts find the keys they mention and near misses snap to existing keys."""
+    key_index = KeyIndex()
+    for key in ["user.profile.name", "user.profile.email", "order.42.status", "config.theme", "cache.ttl"]:
+        key_index.add(key)
+
+    assert trigrams("User profile") <= trigrams("user.profile.name")
+    assert key_index.candidates("set the user profile email to bob@example.com", k=2)[0] == "user.profile.email"
+    assert key_index.candidates("mark order 42 as shipped") == ["order.42.status"]
+    assert key_index.candidates("nothing relevant here") == []
+
+    assert key_index.nearest("user.profile.name") == "user.profile.name"
+    assert key_index.nearest("user_profile_emails") == "user.profile.email"
+    assert key_index.nearest("config_themes") == "config.theme"
+    assert key_index.nearest("completely.different") is None
+
+    key_index.remove("config.theme")
+    assert key_index.nearest("config_themes") is None
+    assert len(key_index) == 4
+
+def test_suggestions_never_change_the_action_key():
+    """Test that actions on missing keys keep their key and only carry the nearest key as a suggestion."""
+    key_index = KeyIndex()
+    key_index.add("order.42.status")
+    actions = suggest_action_keys(
+        [
+            {"action": "update", "key": "order_42_statuss", "value": "shipped"},
+            {"action": "insert", "key": "order_42_statuss", "value": "new"},
+            {"action": "delete", "key": "unrelated", "value": None},
+            {"action": "get", "key": "order.42.status"},
+        ],
+        key_index,
+    )
+    assert actions[0] == {"action": "update", "key": "order_42_statuss", "value": "shipped", "suggested_key": "order.42.status"}
+    assert actions[1] == {"action": "insert", "key": "order_42_statuss", "value": "new"}
+    assert actions[2] == {"action": "delete", "key": "unrelated", "value": None}
+    assert actions[3] == {"action": "get", "key": "order.42.status"}
+
+def test_index_follows_event_log(tmp_path):
+    """Test that the index loads live keys and applies inserts and deletes from the event log."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    store = KVStore(get_session(engine))
+    store.insert("alpha.one", "1")
+    store.insert("beta.two", "2")
+
+    key_index = KeyIndex()
+    bus = EventBus(engine)
+    bus.subscribe(lambda events: key_index.apply_events(engine, events))
+    assert key_index.load(engine) == 2
+
+    store.insert("gamma.three", "3")
+    store.update("alpha.one", "10")
+    store.delete("beta.two")
+    bus.poll()
+    assert "gamma.three" in key_index
+    assert "alpha.one" in key_index
+    assert "beta.two" not in key_index
+
+def test_single_close_sibling_is_only_suggested():
+    """Test that a delete, update or get of a missing key is not moved onto its one similar sibling."""
+    key_index = KeyIndex()
+    for key in ["user_profile_3", "orders.2024.archive"]:
+        key_index.add(key)
+    actions = suggest_action_keys(
+        [
+            {"action": "delete", "key": "user_profile_2"},
+            {"action": "update", "key": "orders.2023.archive", "value": []},
+            {"action": "get", "key": "User.Profile.3"},
+        ],
+        key_index,
+    )
+    assert [(action["key"], action["suggested_key"]) for action in actions] == [
+        ("user_profile_2", "user_profile_3"),
+        ("orders.2023.archive", "orders.2024.archive"),
+        ("User.Profile.3", "user_profile_3"),
+    ]
@@ -0,0 +1,127 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+import pytest
+from llm.llm_router import LLMRouter
+
+
+class StandInConnector:
+    """A local connector that answers after a fixed delay, or fails."""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def query(self, prompt):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            return {"status": "error", "message": f"{self.name} is down"}
+        return {"status": "success", "data": f"{self.name}: {prompt}"}
+
+
+def test_router_requires_connectors():
+    """Test that an empty router is rejected."""
+    with pytest.raises(ValueError):
+        LLMRouter([])
+
+def test_router_falls_back_on_failure():
+    """Test falling back to the next provider when the first fails."""
+    primary = StandInConnector("primary", fail=True)
+    secondary = StandInConnector("secondary")
+    router = LLMRouter([primary, secondary])
+
+    response = router.query("hello")
+    assert response["status"] == "success"
+    assert response["provider"] == "secondary"
+    assert primary.calls == 1
+
+def test_router_prefers_faster_provider():
+    """Test that measured latency decides which provider is tried first."""
+    slow = StandInConnector("slow", delay=0.05)
+    fast = StandInConnector("fast")
+    router = LLMRouter([slow, fast])
+
+    # Unmeasured providers are tried first, so these establish latency for both
+    assert router.query("warm-up")["provider"] == "slow"
+    assert router.query("warm-up")["provider"] == "fast"
+
+    assert router.query("hello")["provider"] == "fast"
+
+def test_circuit_breaker_opens_after_failures():
+    """Test that a repeatedly failing provider is taken out of rotation."""
+    flaky = StandInConnector("flaky", fail=True)
+    healthy = StandInConnector("healthy")
+    router = LLMRouter([flaky, healthy], failure_threshold=2, reset_timeout=60)
+
+    for _ in range(2):
+        router.query("hello")
+    assert router.stats()["providers"]["flaky"]["state"] == "open"
+
+    calls_before = flaky.calls
+    assert router.query("hello")["provider"] == "healthy"
+    assert flaky.calls == calls_before
+
+def test_circuit_breaker_half_open_trial():
+    """Test that an open breaker allows a trial request after the reset timeout."""
+    flaky = StandInConnector("flaky", fail=True)
+    router = LLMRouter([flaky], failure_threshold=1, reset_timeout=0.05)
+
+    assert router.query("hello")["status"] == "error"
+    assert router.query("hello")["status"] == "error"  # Open: not even tried
+    assert flaky.calls == 1
+
+    time.sleep(0.06)
+    flaky.fail = False
+    assert router.query("hello")["status"] == "success"
+    assert router.stats()["providers"]["flaky"]["state"] == "closed"
+
+def test_hedged_request_beats_slow_provider():
+    """Test that a hedge fires when the first provider misses its deadline."""
+    slow = StandInConnector("slow", delay=0.5)
+    fast = StandInConnector("fast", delay=0.01)
+    router = LLMRouter([slow, fast], hedge=True, default_hedge_delay=0.05)
+
+    start = time.monotonic()
+    response = router.query("hello")
+    assert time.monotonic() - start < 0.4
+    assert response["provider"] == "fast"
+    stats = router.stats()
+    assert stats["hedged_requests"] == 1
+    assert stats["providers"]["fast"]["hedges_won"] == 1
+
+def test_all_providers_failing_returns_error():
+    """Test the error response when every provider fails."""
+    router = LLMRouter([StandInConnector("a", fail=True), StandInConnector("b", fail=True)])
+    response = router.query("hello")
+    assert response["status"] == "error"
+    assert "b is down" in response["message"]
+
+class FirstCallOnlyExecutor:
+    """Runs the first submitted call; later ones stay pending, like calls queued behind a busy pool."""
+
+    def __init__(self):
+        self.pool = ThreadPoolExecutor(max_workers=1)
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        if self.submitted == 1:
+            return self.pool.submit(fn, *args)
+        return Future()
+
+def test_cancelled_hedge_releases_half_open_trial():
+    """Test that a hedge cancelled before it started gives back its breaker's half-open trial."""
+    slow = StandInConnector("slow", delay=0.05)
+    recovering = StandInConnector("recovering")
+    router = LLMRouter([slow, recovering], hedge=True, default_hedge_delay=0.01, reset_timeout=30)
+    router._executor = FirstCallOnlyExecutor()
+    breaker = router.providers[1].breaker
+    breaker.opened_at = time.monotonic() - 60  # half-open
+
+    assert router.query("hello")["provider"] == "slow"
+    assert router.stats()["hedged_requests"] == 1
+    assert recovering.calls == 0
+    assert not breaker.trial_in_flight
+    assert breaker.allow()
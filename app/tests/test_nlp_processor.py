@@ -0,0 +1,47 @@
+from llm.nlp_processor import NLPProcessor
+
+
+class StandInToken:
+    """The parts of a spaCy Token that _extract_from_doc reads."""
+
+    def __init__(self, doc, i, text, pos="NOUN"):
+        self.doc = doc
+        self.i = i
+        self.text = text
+        self.pos_ = pos
+        self.lemma_ = text.lower()
+
+    def nbor(self, offset=1):
+        index = self.i + offset
+        if not 0 <= index < len(self.doc):
+            raise IndexError("[E040] Attempt to access token at %d, max length %d." % (index, len(self.doc)))
+        return self.doc[index]
+
+
+class StandInDoc(list):
+    """A tagged document built from (text, pos) pairs, without entities."""
+
+    def __init__(self, words):
+        super().__init__()
+        self.ents = []
+        for i, (text, pos) in enumerate(words):
+            self.append(StandInToken(self, i, text, pos))
+
+
+def extract(words):
+    return NLPProcessor()._extract_from_doc(StandInDoc(words))
+
+def test_extract_key_and_value():
+    """Test that the words after the key and value markers are extracted."""
+    words = [("set", "VERB"), ("key", "NOUN"), ("'color'", "NOUN"), ("value", "NOUN"), ("blue", "ADJ")]
+    assert extract(words) == {"action": "set", "key": "color", "value": "blue"}
+
+def test_command_ending_in_a_marker_word():
+    """Test that a command ending in "key" or "value" (no right neighbour) does not raise."""
+    assert extract([("delete", "VERB"), ("the", "DET"), ("key", "NOUN")]) == {"action": "delete", "key": None, "value": None}
+    assert extract([("update", "VERB"), ("key", "NOUN"), ("a", "NOUN"), ("value", "NOUN")]) == {
+        "action": "update",
+        "key": "a",
+        "value": None,
+    }
+    assert extract([("delete", "VERB")]) == {"action": "delete", "key": None, "value": None}
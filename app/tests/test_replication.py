@@ -0,0 +1,115 @@
+from sqlalchemy import func, select
+from backend.db_setup import KeyValue, KeyValueEvent, get_engine, get_session, init_db
+from backend.event_bus import EventBus
+from backend.kv_store import KVStore
+from backend.replication import Follower, LocalPrimarySource
+
+
+def _store(tmp_path, name):
+    engine = get_engine(f"sqlite:///{tmp_path / name}")
+    init_db(engine)
+    return engine, KVStore(get_session(engine))
+
+def test_follower_bootstraps_and_tails_primary(tmp_path):
+    """Test that a follower copies a snapshot, then applies inserts, updates, deletes and expiry."""
+    primary_engine, primary = _store(tmp_path, "primary.db")
+    replica_engine, replica = _store(tmp_path, "replica.db")
+    for i in range(10):
+        primary.insert(f"rep.{i}", {"n": i})
+    primary.update("rep.1", {"n": 10})
+
+    follower = Follower(LocalPrimarySource(primary_engine), replica_engine, batch_size=4)
+    assert follower.lag() == float("inf")
+    follower.bootstrap()
+    assert len(replica.get_all_key_values()["data"]) == 10
+    assert replica.get("rep.1")["data"] == {"key": "rep.1", "value": {"n": 10}, "version": 2}
+
+    primary.update("rep.1", {"n": 11})
+    primary.delete("rep.2")
+    primary.insert("rep.new", "v")
+    primary.insert("rep.lease", "v", ttl=0.001)
+    primary.update("rep.3", {"n": 30})
+    while follower.poll():
+        pass
+
+    assert replica.get("rep.1")["data"]["version"] == 3
+    assert [rev["value"]["n"] for rev in replica.get_revisions("rep.1")["data"]] == [1, 10]
+    assert replica.get("rep.2")["status"] == "error"
+    assert replica.get("rep.new")["data"]["value"] == "v"
+    assert replica.get("rep.lease")["status"] == "error"
+    assert replica.get("rep.3")["data"]["value"] == {"n": 30}
+    assert follower.position == LocalPrimarySource(primary_engine).head()
+    assert follower.lag() < follower.max_lag
+    assert follower.stats()["applied"] == 5
+
+def test_follower_rebootstraps_after_log_truncation(tmp_path):
+    """Test that a follower that missed pruned events takes a fresh snapshot."""
+    primary_engine, primary = _store(tmp_path, "primary.db")
+    replica_engine, replica = _store(tmp_path, "replica.db")
+    primary.insert("rep.a", "1")
+    follower = Follower(LocalPrimarySource(primary_engine), replica_engine)
+    follower.bootstrap()
+
+    primary.update("rep.a", "2")
+    primary.insert("rep.b", "3")
+    bus = EventBus(primary_engine, retention_seconds=-1)
+    bus.prune()
+    with get_session(primary_engine) as session:
+        assert session.query(KeyValueEvent).count() == 0
+
+    follower.poll()
+    assert follower.bootstraps == 2
+    assert replica.get("rep.a")["data"]["value"] == "2"
+    assert replica.get("rep.b")["data"]["value"] == "3"
+
+    primary.insert("rep.c", "4")
+    assert follower.poll() == 1
+    assert replica.get("rep.c")["data"]["value"] == "4"
+
+def test_rebootstrap_keeps_serving_the_previous_copy(tmp_path):
+    """Test that readers see the old copy, not a half-loaded one, while a new snapshot is loaded."""
+    primary_engine, primary = _store(tmp_path, "primary.db")
+    replica_engine, replica = _store(tmp_path, "replica.db")
+    for i in range(5):
+        primary.insert(f"rep.{i}", i)
+    source = LocalPrimarySource(primary_engine)
+    follower = Follower(source, replica_engine, batch_size=2)
+    follower.bootstrap()
+    primary.insert("rep.5", 5)
+
+    seen = []
+
+    class ObservedSource:
+        head, changes, records = source.head, source.changes, source.records
+
+        def snapshot(self):
+            for record in source.snapshot():
+                with replica_engine.connect() as connection:
+                    seen.append(connection.execute(select(func.count()).select_from(KeyValue)).scalar())
+                yield record
+
+    follower.source = ObservedSource()
+    follower.bootstrap()
+    assert seen == [5] * 6
+    assert len(replica.get_all_key_values()["data"]) == 6
+
+def test_applied_changes_keep_replica_indexes_current(tmp_path):
+    """Test that search and JSON path index entries follow updates and deletes applied by a follower."""
+    primary_engine, primary = _store(tmp_path, "primary.db")
+    replica_engine, replica = _store(tmp_path, "replica.db")
+    primary.insert("host.a", {"region": "eu", "name": "alpha"})
+    primary.insert("host.b", {"region": "us", "name": "bravo"})
+    follower = Follower(LocalPrimarySource(primary_engine), replica_engine)
+    follower.bootstrap()
+    replica.create_index("region")
+
+    primary.update("host.a", {"region": "us", "name": "charlie"})
+    primary.delete("host.b")
+    primary.insert("host.c", {"region": "eu", "name": "delta"})
+    while follower.poll():
+        pass
+
+    assert [item["key"] for item in replica.query([{"path": "region", "value": "us"}])["data"]] == ["host.a"]
+    assert [item["key"] for item in replica.query([{"path": "region", "value": "eu"}])["data"]] == ["host.c"]
+    assert [item["key"] for item in replica.search("charlie")["data"]] == ["host.a"]
+    assert replica.search("alpha")["data"] == [] and replica.search("bravo")["data"] == []
@@ -0,0 +1,58 @@
+from backend.search_index import build_match_query, flatten_value, rebuild, SEARCH_TABLE
+from sqlalchemy import text
+
+
+def test_flatten_value():
+    """Test flattening nested JSON into searchable text."""
+    value = {"host": "db.eu.example.com", "ports": [5432, 6432], "tls": True, "owner": None}
+    assert flatten_value(value) == "host db.eu.example.com ports 5432 6432 tls true owner"
+    assert flatten_value("plain text") == "plain text"
+
+def test_build_match_query_quotes_terms():
+    """Test that user text is quoted so FTS5 syntax characters are literal."""
+    assert build_match_query("db.eu feature-x") == '"db.eu"* "feature-x"*'
+    assert build_match_query('say "hi"', prefix=False) == '"say" """hi"""'
+    assert build_match_query("   ") == ""
+
+def test_search_finds_keys_and_values(kv_store):
+    """Test ranking, prefix matching and value matches."""
+    kv_store.insert("search.payments.host", {"host": "payments.eu.example.com", "region": "eu"})
+    kv_store.insert("search.flags", {"new_checkout": True, "host": "checkout.us.example.com"})
+    kv_store.insert("search.unrelated", "nothing to see")
+
+    response = kv_store.search("payments")
+    assert response["status"] == "success"
+    assert [item["key"] for item in response["data"]] == ["search.payments.host"]
+
+    response = kv_store.search("example.com")
+    assert {item["key"] for item in response["data"]} == {"search.payments.host", "search.flags"}
+
+    response = kv_store.search("checko")
+    assert [item["key"] for item in response["data"]] == ["search.flags"]
+    assert kv_store.search("checko", prefix=False)["data"] == []
+
+def test_search_pagination(kv_store):
+    """Test limit, offset and has_more."""
+    first = kv_store.search("example", limit=1)
+    assert len(first["data"]) == 1 and first["has_more"] is True
+    second = kv_store.search("example", limit=1, offset=1)
+    assert len(second["data"]) == 1 and second["has_more"] is False
+    assert first["data"][0]["key"] != second["data"][0]["key"]
+
+def test_search_follows_updates_and_deletes(kv_store):
+    """Test that the index is maintained with the key's current value."""
+    kv_store.update("search.unrelated", {"host": "ledger.ap.example.com"})
+    assert [item["key"] for item in kv_store.search("ledger")["data"]] == ["search.unrelated"]
+    assert kv_store.search("nothing")["data"] == []
+
+    kv_store.delete("search.unrelated")
+    assert kv_store.search("ledger")["data"] == []
+
+def test_rebuild_indexes_existing_rows(kv_store, db_engine):
+    """Test rebuilding the index for rows that were never indexed."""
+    kv_store.session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    kv_store.session.commit()
+    assert kv_store.search("payments")["data"] == []
+
+    assert rebuild(db_engine) >= 2
+    assert [item["key"] for item in kv_store.search("payments")["data"]] == ["search.payments.host"]
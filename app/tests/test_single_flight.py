@@ -0,0 +1,82 @@
+import threading
+import time
+from backend.single_flight import SingleFlight
+from backend.kv_store import invalidate_reads
+
+
+def run_concurrently(count, fn):
+    """Run fn from `count` threads released together and return their results."""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def worker(index):
+        barrier.wait()
+        results[index] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    """Test that concurrent calls with the same key share one execution."""
+    flights = SingleFlight()
+    calls = []
+
+    def slow_read():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"value": 42}
+
+    results = run_concurrently(8, lambda: flights.do("key", slow_read))
+    assert len(calls) == 1
+    assert all(result == {"value": 42} for result in results)
+    stats = flights.stats()
+    assert stats["executed"] == 1
+    assert stats["coalesced"] == 7
+    assert stats["in_flight"] == 0
+
+def test_different_keys_are_not_coalesced():
+    """Test that calls with different keys run independently."""
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == 1
+    assert flights.do("b", lambda: 2) == 2
+    assert flights.stats()["executed"] == 2
+
+def test_errors_are_shared_and_not_cached():
+    """Test that a failing call raises for every waiter and the next call runs again."""
+    flights = SingleFlight()
+
+    def failing():
+        time.sleep(0.05)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            return flights.do("key", failing)
+        except RuntimeError as e:
+            return str(e)
+
+    assert run_concurrently(4, call) == ["boom"] * 4
+    assert flights.do("key", lambda: "ok") == "ok"
+
+def test_kv_get_after_mutation_starts_new_flight(kv_store):
+    """Test that reads issued after a write never reuse a flight started before it."""
+    kv_store.insert("flight.key", {"value": "v1"})
+    assert kv_store.get("flight.key")["data"]["value"] == {"value": "v1"}
+
+    kv_store.update("flight.key", {"value": "v2"})
+    assert kv_store.get("flight.key")["data"]["value"] == {"value": "v2"}
+    kv_store.delete("flight.key")
+
+def test_invalidate_reads_changes_flight_key(kv_store):
+    """Test that invalidation moves reads to a new generation."""
+    bind = kv_store.session.get_bind()
+    seen = []
+    kv_store._coalesced("get", "k", lambda: seen.append(1))
+    invalidate_reads(bind)
+    kv_store._coalesced("get", "k", lambda: seen.append(1))
+    assert len(seen) == 2
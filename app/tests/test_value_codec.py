@@ -0,0 +1,72 @@
+import json
+import pytest
+from backend import value_codec
+from backend.db_setup import get_engine, get_session, init_db
+from backend.kv_store import KVStore
+from backend.value_codec import MAGIC, decode, encode, recompress, settings
+
+LARGE = {"hosts": [f"node-{i}.eu.example.com" for i in range(200)], "region": "eu"}
+
+
+@pytest.fixture
+def compression():
+    """Enable compression for one test."""
+    settings.configure(threshold=256, codec="zlib")
+    yield settings
+    settings.configure(threshold=0)
+
+def test_encode_only_compresses_large_values(compression):
+    """Test the size threshold and round trips of both encodings."""
+    assert encode({"a": 1}) == '{"a":1}'
+    encoded = encode(LARGE)
+    assert isinstance(encoded, bytes) and encoded.startswith(MAGIC)
+    assert len(encoded) < len(json.dumps(LARGE)) / 4
+    assert decode(encoded) == LARGE
+    assert decode('{"a":1}') == {"a": 1}
+    assert decode(3) == 3
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        value_codec.CodecSettings(threshold=1, codec="lz4")
+
+def test_store_reads_compressed_and_plain_rows(tmp_path, compression):
+    """Test that the store writes compressed values and still reads rows written without compression."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    store = KVStore(get_session(engine))
+
+    settings.configure(threshold=0)
+    store.insert("plain", LARGE)
+    settings.configure(threshold=256)
+    store.insert("packed", LARGE)
+    store.update("packed", dict(LARGE, region="us"))
+
+    raw = dict(engine.connect().exec_driver_sql("SELECT key, typeof(value) FROM key_value_store").all())
+    assert raw == {"plain": "text", "packed": "blob"}
+    assert store.get("plain")["data"]["value"] == LARGE
+    assert store.get("packed")["data"]["value"]["region"] == "us"
+    assert store.get_revisions("packed")["data"][0]["value"] == LARGE
+    assert {item["key"] for item in store.search("node-199")["data"]} == {"plain", "packed"}
+
+def test_recompress_rewrites_existing_rows(tmp_path, compression):
+    """Test that recompress shrinks old plain rows and can undo compression."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    store = KVStore(get_session(engine))
+    settings.configure(threshold=0)
+    for i in range(10):
+        store.insert(f"doc.{i}", dict(LARGE, n=i))
+    store.update("doc.0", {"small": True})
+
+    settings.configure(threshold=256)
+    report = recompress(engine, batch_size=3)
+    assert report["key_value_store"]["rows"] == 10
+    assert report["key_value_store"]["bytes_after"] < report["key_value_store"]["bytes_before"] / 4
+    assert report["key_value_revisions"]["rows"] == 1
+    assert store.get("doc.5")["data"]["value"] == dict(LARGE, n=5)
+
+    settings.configure(threshold=0)
+    recompress(engine)
+    types = {row[0] for row in engine.connect().exec_driver_sql("SELECT typeof(value) FROM key_value_store")}
+    assert types == {"text"}
+    assert store.get("doc.5")["data"]["value"] == dict(LARGE, n=5)
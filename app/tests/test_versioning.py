@@ -0,0 +1,115 @@
+import threading
+from backend.db_setup import KeyValueRevision, get_engine, get_session, init_db
+from backend.kv_store import KVStore
+
+
+def test_versions_and_conditional_updates(kv_store):
+    """Test version numbers, ETags and compare-and-set updates and deletes."""
+    assert kv_store.insert("cas.key", {"n": 0})["version"] == 1
+    result = kv_store.get("cas.key")
+    assert result["data"]["version"] == 1
+    etag = result["etag"]
+
+    assert kv_store.update("cas.key", {"n": 1}, expected_version=1)["version"] == 2
+    conflict = kv_store.update("cas.key", {"n": 99}, expected_version=1)
+    assert conflict["status"] == "conflict" and conflict["version"] == 2
+    assert kv_store.get("cas.key")["data"]["value"] == {"n": 1}
+    assert kv_store.get("cas.key")["etag"] != etag
+
+    # Unconditional updates still bump the version
+    assert kv_store.update("cas.key", {"n": 2})["version"] == 3
+    revisions = kv_store.get_revisions("cas.key")["data"]
+    assert [(rev["revision_number"], rev["value"]) for rev in revisions] == [(1, {"n": 0}), (2, {"n": 1})]
+
+    assert kv_store.delete("cas.key", expected_version=2)["status"] == "conflict"
+    assert kv_store.delete("cas.key", expected_version=3)["status"] == "success"
+    assert kv_store.update("cas.key", {"n": 3}, expected_version=3)["status"] == "error"
+
+def test_concurrent_cas_increments_lose_no_updates(tmp_path):
+    """Test that many threads doing read/compare-and-set increments never lose an update."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    KVStore(get_session(engine)).insert("counter", {"n": 0})
+    threads, increments = 8, 25
+    conflicts = []
+
+    def worker():
+        store = KVStore(get_session(engine))
+        done = 0
+        while done < increments:
+            current = store.get("counter")["data"]
+            result = store.update("counter", {"n": current["value"]["n"] + 1}, expected_version=current["version"])
+            if result["status"] == "conflict":
+                conflicts.append(1)
+            else:
+                assert result["status"] == "success"
+                done += 1
+        store.session.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    store = KVStore(get_session(engine))
+    result = store.get("counter")["data"]
+    assert result["value"] == {"n": threads * increments}
+    assert result["version"] == threads * increments + 1
+    numbers = [rev.revision_number for rev in store.session.query(KeyValueRevision)]
+    assert sorted(numbers) == list(range(1, threads * increments + 1))
+
+def test_concurrent_unconditional_updates_keep_revisions_unique(tmp_path):
+    """Test that racing plain updates are serialized into distinct revisions."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'kv_store.db'}")
+    init_db(engine)
+    KVStore(get_session(engine)).insert("plain", {"n": 0})
+
+    def worker(i):
+        store = KVStore(get_session(engine))
+        for j in range(10):
+            assert store.update("plain", {"writer": i, "n": j})["status"] == "success"
+        store.session.close()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(6)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    store = KVStore(get_session(engine))
+    assert store.get("plain")["data"]["version"] == 61
+    numbers = [rev.revision_number for rev in store.session.query(KeyValueRevision)]
+    assert sorted(numbers) == list(range(1, 61))
+
+def test_init_db_numbers_versions_after_existing_revisions(tmp_path):
+    """Test that migrated keys continue the revision numbering they already had."""
+    engine = get_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE key_value_store (id INTEGER PRIMARY KEY, key VARCHAR UNIQUE NOT NULL, "
+            "value JSON NOT NULL, created_at DATETIME, updated_at DATETIME)"
+        )
+        connection.exec_driver_sql(
+            "CREATE TABLE key_value_revisions (id INTEGER PRIMARY KEY, key_value_id INTEGER NOT NULL, "
+            "revision_number INTEGER NOT NULL, value JSON NOT NULL, created_at DATETIME)"
+        )
+        connection.exec_driver_sql("INSERT INTO key_value_store (id, key, value) VALUES (1, 'old', '3')")
+        connection.exec_driver_sql(
+            "INSERT INTO key_value_revisions (key_value_id, revision_number, value) VALUES (1, 1, '1'), (1, 2, '2')"
+        )
+    init_db(engine)
+
+    store = KVStore(get_session(engine))
+    assert store.get("old")["data"]["version"] == 3
+    assert store.update("old", 4)["version"] == 4
+    assert [rev["revision_number"] for rev in store.get_revisions("old")["data"]] == [1, 2, 3]
+
+def test_etag_tracks_value_without_loading_it(kv_store):
+    """Test that etag() matches get() and changes with every update."""
+    kv_store.insert("etag.key", {"n": 1})
+    assert kv_store.etag("etag.key") == kv_store.get("etag.key")["etag"]
+    before = kv_store.etag("etag.key")
+    kv_store.update("etag.key", {"n": 2})
+    assert kv_store.etag("etag.key") != before
+    assert kv_store.etag("etag.missing") is None